@@ -0,0 +1,403 @@
+"""Benchmarks of the FTP M3U Playlist Generator against a generated local directory server (benchmark)."""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import threading
+import contextlib
+import statistics
+import tracemalloc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import quote, unquote, urlparse
+
+from ftp_m3u_generator import (
+    EXIT_OK, EXIT_ERROR, CrawlFrontier, CrawlSession, HostHealth, HostLimiter, create_m3u, get_app_data_dir,
+    get_file_links, get_folders_recursive, get_matcher,
+)
+
+# Shape of the generated trees: top-level folders (shows, or movies per letter/year/genre
+# folder), folder levels below them, file entries per listing page, and server delay
+BENCHMARK_FANOUT = 12
+BENCHMARK_DEPTH = 2
+BENCHMARK_ENTRIES = 40
+BENCHMARK_LATENCY_MS = 2
+BENCHMARK_JITTER_MS = 3
+BENCHMARK_REPEAT = 3
+BENCHMARK_PLAYLIST_FILES = 20000
+BENCHMARK_SEED = 1234
+
+# A result is flagged when a metric grows past the baseline by more than (fraction,
+# absolute amount), whichever is larger; the absolute part keeps short benchmarks from
+# tripping on timer noise. Request and byte counts are deterministic, so any growth counts.
+BENCHMARK_TOLERANCE = {'wall_seconds': (0.25, 0.05), 'peak_kib': (0.25, 256), 'requests': (0, 0), 'bytes': (0, 0)}
+
+SHOW_WORDS = ["Silent", "Broken", "Golden", "Hidden", "Last", "Crimson", "Northern", "Wild", "Lost", "Iron"]
+SHOW_NOUNS = ["River", "Empire", "Signal", "Harbor", "Kingdom", "Frontier", "Garden", "Code", "Line", "Tide"]
+MOVIE_GENRES = ["Action", "Drama", "Comedy", "Horror", "Thriller", "Animation", "Documentary"]
+MOVIE_YEARS = range(1995, 2025)
+LISTING_DATE = "17-Oct-2026 10:00"
+
+class SyntheticTree:
+    """A generated FTP-style directory tree; listings are computed from the path, not stored.
+
+    "series" mirrors a TV category: fanout show folders, each with fanout "Season N"
+    folders holding entries episode files. "movies" mirrors a movie category: A-Z,
+    year and genre folders at the top, each holding entries movie files. Every depth
+    level beyond those adds fanout "Part N" subfolders with entries files each.
+    target is a show or movie that is guaranteed to be in the tree.
+    """
+
+    def __init__(self, layout="series", fanout=BENCHMARK_FANOUT, depth=BENCHMARK_DEPTH,
+                 entries=BENCHMARK_ENTRIES, seed=BENCHMARK_SEED):
+        if layout not in ("series", "movies"):
+            raise ValueError(f"unknown layout {layout!r}")
+        self.layout = layout
+        self.fanout = max(1, fanout)
+        self.depth = max(2 if layout == "series" else 1, depth)
+        self.entries = max(1, entries)
+        self.seed = seed
+        self.target_year = random.Random(seed).choice(MOVIE_YEARS)
+        if layout == "series":
+            self.target = self._show_name(self.fanout // 2)
+        else:
+            self.target = f"The Quiet Benchmark {self.target_year}"
+
+    def _show_name(self, i):
+        # Every ten shows reuse the words in a new pairing, so some names share a word
+        word = SHOW_WORDS[i % len(SHOW_WORDS)]
+        noun = SHOW_NOUNS[(i * 7 + i // len(SHOW_WORDS)) % len(SHOW_NOUNS)]
+        return f"{word} {noun}" if i < len(SHOW_WORDS) * len(SHOW_NOUNS) else f"{word} {noun} {i}"
+
+    def top_folders(self):
+        if self.layout == "series":
+            return [self._show_name(i) for i in range(self.fanout)]
+        letters = [chr(c) for c in range(ord("A"), ord("Z") + 1)]
+        return letters + [str(year) for year in MOVIE_YEARS] + MOVIE_GENRES
+
+    def listing(self, segments):
+        """Return (folder names, [(file name, size)]) of the folder at segments, or None if there is none."""
+        level = len(segments)
+        if level == 0:
+            return self.top_folders(), []
+        if segments[0] not in self.top_folders() or level > self.depth:
+            return None
+        for segment in segments[self._fixed_levels():]:
+            if not segment.startswith("Part "):
+                return None
+
+        parts = [f"Part {n}" for n in range(1, self.fanout + 1)] if level < self.depth else []
+        if self.layout == "series":
+            if level == 1:
+                return [f"Season {n}" for n in range(1, self.fanout + 1)], []
+            return parts, self._episode_files(segments)
+        return parts, self._movie_files(segments)
+
+    def _fixed_levels(self):
+        return 2 if self.layout == "series" else 1
+
+    def _size(self, name):
+        return random.Random(f"{self.seed}:{name}").randint(200, 4000) * 1024 * 1024
+
+    def _episode_files(self, segments):
+        show = segments[0].replace(" ", ".")
+        season = int(segments[1].split()[-1]) if segments[1].startswith("Season ") else 1
+        suffix = "".join(f".{segment.split()[-1]}" for segment in segments[2:])
+        names = [f"{show}.S{season:02d}E{episode:02d}{suffix}.1080p.mkv" for episode in range(1, self.entries + 1)]
+        return [(name, self._size(name)) for name in names]
+
+    def _movie_files(self, segments):
+        rng = random.Random(f"{self.seed}:{'/'.join(segments)}")
+        folder = segments[0]
+        names = []
+        for i in range(self.entries):
+            title = f"{rng.choice(SHOW_WORDS)} {rng.choice(SHOW_NOUNS)} {i}"
+            if len(folder) == 1:
+                title = f"{folder} {title}"
+            year = int(folder) if folder.isdigit() else rng.choice(MOVIE_YEARS)
+            names.append(f"{title.replace(' ', '.')}.{year}.1080p.{rng.choice(['mkv', 'mp4', 'srt'])}")
+        # The target movie sits in its letter, year and first genre folder, like on real servers
+        if len(segments) == 1 and folder in ("T", str(self.target_year), MOVIE_GENRES[0]):
+            names.append(f"{self.target.replace(' ', '.')}.1080p.mkv")
+        return [(name, self._size(name)) for name in names]
+
+    def render(self, path, segments):
+        """Return the nginx-style autoindex page of a folder, or None if it does not exist."""
+        listing = self.listing(segments)
+        if listing is None:
+            return None
+        folders, files = listing
+        lines = [f"<html><head><title>Index of {path}</title></head><body>",
+                 f"<h1>Index of {path}</h1><hr><pre><a href=\"../\">../</a>"]
+        for name in folders:
+            lines.append(f"<a href=\"{quote(name)}/\">{name}/</a>{' ' * max(1, 50 - len(name))}"
+                         f"{LISTING_DATE}       -")
+        for name, size in files:
+            lines.append(f"<a href=\"{quote(name)}\">{name}</a>{' ' * max(1, 51 - len(name))}"
+                         f"{LISTING_DATE} {size:>12}")
+        lines.append("</pre><hr></body></html>")
+        return "\n".join(lines).encode("utf-8")
+
+class BenchmarkHandler(BaseHTTPRequestHandler):
+    """Serves the server's SyntheticTree under /<root>/, after the configured delay."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this each response waits for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        server.wait()
+        path = unquote(urlparse(self.path).path)
+        segments = [segment for segment in path.split("/") if segment]
+        body = None
+        if segments and segments[0] == server.root and path.endswith("/"):
+            body = server.tree.render(path, segments[1:])
+        status = 200 if body is not None else 404
+        body = body if body is not None else b"not found"
+        server.count(len(body))
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class BenchmarkServer(ThreadingHTTPServer):
+    """Local HTTP server for one SyntheticTree that counts requests and body bytes."""
+
+    daemon_threads = True
+
+    def __init__(self, tree, latency_ms=BENCHMARK_LATENCY_MS, jitter_ms=BENCHMARK_JITTER_MS):
+        super().__init__(("127.0.0.1", 0), BenchmarkHandler)
+        self.tree = tree
+        # The URL has to say "movie" for the folder search to use its movie heuristics
+        self.root = "Movies" if tree.layout == "movies" else "TV"
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.requests = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(tree.seed)
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/{self.root}/"
+
+    def wait(self):
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def count(self, size):
+        with self._lock:
+            self.requests += 1
+            self.bytes += size
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes = 0
+            self._random = random.Random(self.tree.seed)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+def measure(run, server=None, repeat=BENCHMARK_REPEAT):
+    """Run a benchmark repeat times and once more under tracemalloc.
+
+    run() returns (session or None, number of folders or files found). Wall time is the median of the
+    untraced runs; requests, bytes and parse time come from the last one.
+    """
+    timings = []
+    for _ in range(max(1, repeat)):
+        if server:
+            server.reset()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            started = time.perf_counter()
+            session, files = run()
+            timings.append(time.perf_counter() - started)
+        if session:
+            session.close()
+    result = {
+        'wall_seconds': statistics.median(timings),
+        'requests': server.requests if server else 0,
+        'bytes': server.bytes if server else 0,
+        'parse_seconds': session.parse_seconds if session else 0.0,
+        'found': files,
+    }
+
+    # Memory is measured separately because tracing slows everything down. The server
+    # runs in this process, so its page rendering is included.
+    if server:
+        server.reset()
+    tracemalloc.start()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            session, _ = run()
+        result['peak_kib'] = tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+    if session:
+        session.close()
+    return result
+
+def new_session():
+    # A private HostHealth and HostLimiter so one benchmark's latency record and
+    # widened slots do not affect the next
+    return CrawlSession(health=HostHealth(), limiter=HostLimiter())
+
+def run_benchmarks(layouts=("series", "movies"), fanout=BENCHMARK_FANOUT, depth=BENCHMARK_DEPTH,
+                   entries=BENCHMARK_ENTRIES, latency_ms=BENCHMARK_LATENCY_MS, jitter_ms=BENCHMARK_JITTER_MS,
+                   repeat=BENCHMARK_REPEAT, playlist_files=BENCHMARK_PLAYLIST_FILES, progress=print):
+    """Run every benchmark and return {name: metrics}.
+
+    For each layout: get_folders_recursive for the tree's target, get_file_links over the
+    folders it found, and the whole search from folders to playlist. create_m3u is timed
+    on its own with playlist_files generated entries.
+    """
+    results = {}
+    for layout in layouts:
+        tree = SyntheticTree(layout, fanout, depth, entries)
+        with BenchmarkServer(tree, latency_ms, jitter_ms) as server:
+            folders = []
+
+            def find_folders():
+                session = new_session()
+                folders[:] = get_folders_recursive(server.url, tree.target, session, CrawlFrontier())
+                return session, len(folders)
+
+            def find_files():
+                session = new_session()
+                matcher = get_matcher(tree.target)
+                urls = set()
+                for folder in folders:
+                    urls.update(f['url'] for f in get_file_links(folder, tree.target, None, session, matcher))
+                return session, len(urls)
+
+            def search():
+                session = new_session()
+                frontier = CrawlFrontier()
+                found = get_folders_recursive(server.url, tree.target, session, frontier)
+                matcher = get_matcher(tree.target)
+                file_info = {}
+                for folder in found:
+                    for f in get_file_links(folder, tree.target, None, session, matcher, frontier):
+                        file_info.setdefault(f['url'], f)
+                with tempfile.TemporaryDirectory() as save_dir:
+                    create_m3u(tree.target.replace(" ", "_"), list(file_info.values()), save_dir)
+                return session, len(file_info)
+
+            for name, run in ((f"{layout}_folders", find_folders), (f"{layout}_file_links", find_files),
+                              (f"{layout}_search", search)):
+                results[name] = measure(run, server, repeat)
+                progress(format_result(name, results[name]))
+
+    rng = random.Random(BENCHMARK_SEED)
+    playlist = [{'url': f"http://127.0.0.1/TV/Show/Season%20{i % 10 + 1}/Show.S{i % 10 + 1:02d}E{i:04d}.mkv",
+                 'name': f"Show.S{i % 10 + 1:02d}E{i:04d}.mkv", 'season': i % 10 + 1, 'episode': i,
+                 'size': rng.randint(1, 4000) * 1024 * 1024, 'mtime': None}
+                for i in range(playlist_files)]
+    rng.shuffle(playlist)
+
+    def write_playlist():
+        with tempfile.TemporaryDirectory() as save_dir:
+            create_m3u("benchmark", playlist, save_dir)
+        return None, len(playlist)
+
+    results['create_m3u'] = measure(write_playlist, repeat=repeat)
+    progress(format_result('create_m3u', results['create_m3u']))
+    return results
+
+def format_result(name, result):
+    return (f"{name:<20} {result['wall_seconds'] * 1000:9.1f} ms  {result['requests']:6d} requests  "
+            f"{result['bytes'] / 1024:9.1f} KiB  parse {result['parse_seconds'] * 1000:7.1f} ms  "
+            f"peak {result['peak_kib']:7d} KiB  {result['found']} found")
+
+def compare(results, baseline, tolerance=BENCHMARK_TOLERANCE):
+    """Return a message for every metric that grew past its tolerance over the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, (fraction, absolute) in tolerance.items():
+            old, new = base.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if new - old > max(old * fraction, absolute):
+                change = f"+{(new - old) / old:.0%}" if old else "new"
+                regressions.append(f"{name}: {metric} {old:g} -> {new:g} ({change})")
+        if base.get('found') is not None and base['found'] != result['found']:
+            regressions.append(f"{name}: found {result['found']}, baseline {base['found']}")
+    return regressions
+
+def get_baseline_file():
+    return os.path.join(get_app_data_dir(), "benchmark_baseline.json")
+
+def build_benchmark_parser():
+    """Return the argument parser of the benchmark command."""
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="FTP_m3u_Generator benchmark",
+        description="Time folder search, file listing and playlist writing against a generated local "
+                    "directory server, and compare with a saved baseline. "
+                    f"Exit codes: {EXIT_OK} no regressions, {EXIT_ERROR} regressions found.",
+    )
+    parser.add_argument("--layout", choices=["series", "movies", "all"], default="all", help="tree layout")
+    parser.add_argument("--fanout", type=int, default=BENCHMARK_FANOUT, help="subfolders per folder")
+    parser.add_argument("--depth", type=int, default=BENCHMARK_DEPTH, help="folder levels below the category")
+    parser.add_argument("--entries", type=int, default=BENCHMARK_ENTRIES, help="file entries per listing page")
+    parser.add_argument("--latency", type=float, default=BENCHMARK_LATENCY_MS, help="server delay per request (ms)")
+    parser.add_argument("--jitter", type=float, default=BENCHMARK_JITTER_MS, help="random extra delay (ms)")
+    parser.add_argument("--repeat", type=int, default=BENCHMARK_REPEAT, help="timed runs per benchmark")
+    parser.add_argument("--playlist-files", type=int, default=BENCHMARK_PLAYLIST_FILES,
+                        help="entries in the create_m3u benchmark")
+    parser.add_argument("--baseline", help="baseline file (default: benchmark_baseline.json in the app data folder)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    return parser
+
+def run_benchmark_cli(argv):
+    """Run the benchmark command; returns the process exit code."""
+    args = build_benchmark_parser().parse_args(argv)
+    layouts = ("series", "movies") if args.layout == "all" else (args.layout,)
+    config = {'layouts': list(layouts), 'fanout': args.fanout, 'depth': args.depth, 'entries': args.entries,
+              'latency_ms': args.latency, 'jitter_ms': args.jitter, 'playlist_files': args.playlist_files}
+    results = run_benchmarks(layouts, args.fanout, args.depth, args.entries, args.latency, args.jitter,
+                             args.repeat, args.playlist_files)
+
+    baseline_file = args.baseline or get_baseline_file()
+    if args.save_baseline:
+        with open(baseline_file, "w", encoding="utf-8") as f:
+            json.dump({'config': config, 'python': sys.version.split()[0], 'saved_at': time.time(),
+                       'results': results}, f, indent=2)
+        print(f"Baseline saved to {baseline_file}")
+        return EXIT_OK
+
+    try:
+        with open(baseline_file, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {baseline_file}; run with --save-baseline to create one.")
+        return EXIT_OK
+    if baseline.get('config') != config:
+        print("The baseline was recorded with different settings; not comparing.")
+        return EXIT_OK
+
+    regressions = compare(results, baseline['results'])
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print("No regressions against the baseline.")
+    return EXIT_ERROR if regressions else EXIT_OK
@@ -0,0 +1,4249 @@
+"""Crawling, matching and playlist writing behind the FTP M3U Playlist Generator.
+
+The Tk GUI lives in ftp_m3u_gui and the job service in ftp_m3u_service; both are
+imported only when used, as are requests, asyncio, sqlite3, ssl, tkinter and bs4,
+so command-line runs start quickly.
+"""
+import os
+import re
+import sys
+import contextlib
+import json
+import time
+import calendar
+import math
+import hashlib
+import functools
+import itertools
+import bisect
+import codecs
+import socket
+import zlib
+import heapq
+import tempfile
+import unicodedata
+from urllib.parse import urljoin, unquote, urlparse, quote
+from html.parser import HTMLParser
+from collections import Counter, defaultdict, deque, namedtuple
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, Future
+
+# Default number of folders scanned in parallel and the number of requests a host
+# may have in flight at once until the HostLimiter has seen how it copes
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_HOST_LIMIT = 4
+
+# Retry policy for transient listing fetch failures
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Crawl engines selectable from the GUI and --cli
+CRAWL_ENGINES = ["threads", "asyncio"]
+ASYNC_MAX_REDIRECTS = 5
+ASYNC_USER_AGENT = "FTPPlaylistGenerator"
+
+# Crawl budgets: how deep a folder scan may recurse below a searched folder, and
+# how many distinct listings one search may fetch (0 = unlimited)
+DEFAULT_MAX_DEPTH = 8
+DEFAULT_MAX_FOLDERS = 5000
+
+# Streaming playlists: entries sorted in memory before being spilled to a temporary
+# run file when the playlist is finalized
+PLAYLIST_RUN_SIZE = 10000
+
+# Host health: rolling averages weight new samples by HEALTH_SMOOTHING. A host that
+# fails HEALTH_MAX_FAILURES times in a row is skipped for HEALTH_COOLDOWN seconds,
+# then given one trial request. Mirror probes download MIRROR_SAMPLE_BYTES.
+HEALTH_SMOOTHING = 0.3
+HEALTH_MAX_FAILURES = 3
+HEALTH_COOLDOWN = 60
+MIRROR_SAMPLE_BYTES = 256 * 1024
+MIRROR_PROBE_TIMEOUT = 5
+
+# Adaptive per-host flow control (HostLimiter). A host starts with DEFAULT_PER_HOST_LIMIT
+# requests at a time; while its answers stay within ADAPTIVE_LATENCY_FACTOR times its
+# usual fast answer (the 10th percentile of the last ADAPTIVE_WINDOW) and the slots are
+# all in use, it gains about one slot per round trip, up to ADAPTIVE_MAX_LIMIT. A
+# timeout, connection error or THROTTLE_STATUSES response multiplies the slots and the
+# request rate by ADAPTIVE_DECREASE (at most once per ADAPTIVE_DECREASE_INTERVAL
+# seconds) and a Retry-After pauses the host. A rate limit, once set, grows by
+# ADAPTIVE_RATE_STEP requests/second every second and is lifted at ADAPTIVE_MAX_RATE.
+# After ADAPTIVE_MIN_SAMPLES answers, listing timeouts are ADAPTIVE_TIMEOUT_FACTOR
+# times the host's 95th percentile latency, kept within the timeout bounds.
+THROTTLE_STATUSES = (429, 503)
+ADAPTIVE_MAX_LIMIT = 16
+ADAPTIVE_LATENCY_FACTOR = 2.0
+ADAPTIVE_DECREASE = 0.5
+ADAPTIVE_DECREASE_INTERVAL = 1.0
+ADAPTIVE_MIN_RATE = 0.5
+ADAPTIVE_MAX_RATE = 200.0
+ADAPTIVE_RATE_STEP = 2.0
+ADAPTIVE_BURST = 4
+ADAPTIVE_MAX_RETRY_AFTER = 300
+ADAPTIVE_WINDOW = 100
+ADAPTIVE_MIN_SAMPLES = 20
+ADAPTIVE_TIMEOUT_FACTOR = 4
+ADAPTIVE_MIN_TIMEOUT = 3.0
+ADAPTIVE_MAX_TIMEOUT = 60.0
+# Waiting requests recheck their host this often in case a wakeup was missed
+ADAPTIVE_WAIT_CHECK = 0.5
+
+# Exit codes of the search command (argparse exits with 2 on bad arguments)
+EXIT_OK = 0
+EXIT_NO_RESULTS = 1
+EXIT_ERROR = 3
+EXIT_INTERRUPTED = 130
+
+# Interrupted searches are saved to a checkpoint at most every CHECKPOINT_INTERVAL
+# seconds while they run, and once more when they stop
+CHECKPOINT_INTERVAL = 30
+CHECKPOINT_VERSION = 1
+
+# --check-startup: import time budget for this module and the packages it must
+# not import on its own (they are loaded only by the code paths that need them)
+STARTUP_BUDGET_MS = 200
+STARTUP_LAZY_MODULES = ("tkinter", "bs4", "requests", "urllib3", "http.server", "asyncio", "ssl", "sqlite3")
+
+# Run reports: upper bounds (seconds) of the per-host latency histogram buckets, how
+# many reports are kept in the reports folder, and how many functions a profile lists
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RUN_REPORT_VERSION = 1
+RUN_REPORT_KEEP = 20
+RUN_PROFILE_TOP = 30
+
+# Prometheus metrics: name prefix, listing parse time buckets (seconds) and the
+# process-lifetime counters and histograms, labelled by host except playlists_written
+METRICS_PREFIX = "ftp_m3u"
+PARSE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+METRIC_COUNTERS = {
+    'requests_total': "HTTP requests sent",
+    'request_errors_total': "HTTP requests that failed or got a 5xx response",
+    'listings_fetched_total': "Directory listings downloaded and parsed",
+    'listing_bytes_total': "Bytes received for listings, before decompression",
+    'listing_cache_total': "Listing cache lookups by result (hit, revalidated, miss)",
+    'matched_files_total': "Media files that matched a search",
+    'playlists_written_total': "Playlists written",
+    'playlist_entries_total': "Entries written to playlists",
+    'throttled_responses_total': "429 and 503 responses, which slow the host's request rate down",
+}
+METRIC_HISTOGRAMS = {
+    'listing_fetch_seconds': ("Time from request to response headers", LATENCY_BUCKETS),
+    'listing_parse_seconds': ("Time spent parsing one listing", PARSE_BUCKETS),
+}
+
+# Directory listing cache: entries older than the TTL are revalidated with the
+# server, and the least recently used listings are dropped past the size limit
+DEFAULT_CACHE_TTL = 6 * 60 * 60
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Session/crawler attribute counting each listing cache lookup result
+CACHE_RESULT_COUNTERS = {'hit': "cache_hits", 'revalidated': "cache_revalidated", 'miss': "cache_misses"}
+
+# One link found on a directory listing page; size (bytes) and mtime (epoch
+# seconds) are None when the listing does not show them
+ListingEntry = namedtuple("ListingEntry", ["href", "is_dir", "size", "mtime"], defaults=(None, None))
+
+# Year in a search term or folder name, and season folder names
+YEAR_PATTERN = re.compile(r'(19\d\d|20\d\d)')
+SEASON_FOLDER_PATTERN = re.compile(r'season|s\d+')
+
+# File types stored when a whole category is indexed
+MEDIA_EXTENSIONS = [".mp4", ".mkv", ".avi", ".m4v", ".mov", ".wmv", ".mpg", ".mpeg", ".ts", ".webm", ".flv"]
+
+# Episode markers, years and release tags; a title ends at the first of them
+# (one at the very start, as in "2001 A Space Odyssey", belongs to the title)
+RELEASE_TAG_PATTERN = re.compile(
+    r'\b(?:s\d{1,2}(?:e\d{1,3})?|\d{1,2}x\d{2,3}|season \d+|episode \d+|(?:19|20)\d\d|\d{3,4}[pi]|4k|uhd|'
+    r'hdr\d*|web ?dl|web ?rip|blu ?ray|[bh]d ?rip|br ?rip|dvd ?rip|dvd ?scr|hdtv|hd ?cam|remux|[xh] ?26[45]|'
+    r'hevc|xvid|divx|aac\d*|ac3|dts|ddp?\d|10 ?bit|repack)\b'
+)
+BRACKETED_PATTERN = re.compile(r'\[[^\]]*\]|\{[^}]*\}')
+
+# Smallest trigram similarity (Dice coefficient, 0-1) of a fuzzy index match
+FUZZY_MIN_SCORE = 0.5
+
+# Date formats used by Apache, nginx and h5ai listings, and size unit multipliers
+LISTING_DATE_FORMATS = [
+    (re.compile(r'(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2})'), "%Y-%m-%d %H:%M"),
+    (re.compile(r'(\d{2}-[A-Za-z]{3}-\d{4}) (\d{2}:\d{2})'), "%d-%b-%Y %H:%M"),
+]
+LISTING_SIZE_PATTERN = re.compile(r'(?<![\w.:-])(\d+(?:\.\d+)?)\s*([KMGT]i?B?|B|bytes)?(?![\w.:-])', re.IGNORECASE)
+SIZE_UNITS = {'B': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# Markers of server-generated listings the streaming parser understands; anything
+# else is parsed with BeautifulSoup. The first LISTING_SNIFF_SIZE characters decide.
+LISTING_SIGNATURES = re.compile(r'index of|directory listing for|parent directory|_h5ai|autoindex', re.IGNORECASE)
+LISTING_SNIFF_SIZE = 2048
+LISTING_CHUNK_SIZE = 64 * 1024
+
+# requests is imported by load_requests() when the first CrawlSession is created,
+# so runs that never use it (asyncio engine, index searches) do not pay for it
+requests = HTTPAdapter = Retry = None
+
+def load_requests():
+    """Import requests and its retry helpers into the module globals used by CrawlSession."""
+    global requests, HTTPAdapter, Retry
+    if requests is None:
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        import requests
+
+# asyncio is imported by load_asyncio() when a crawl object is created (CrawlSession,
+# CrawlFrontier, AsyncCrawler), since cancelling a crawl raises asyncio.CancelledError
+asyncio = None
+
+def load_asyncio():
+    """Import asyncio into the module global used by the crawl classes."""
+    global asyncio
+    if asyncio is None:
+        import asyncio
+
+def get_app_data_dir():
+    """Return the per-user data folder holding the categories file and caches."""
+    # Use AppData folder for Windows which is always writable by the user
+    appdata_path = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'FTPPlaylistGenerator')
+    
+    # Ensure the directory exists
+    os.makedirs(appdata_path, exist_ok=True)
+    return appdata_path
+
+def parse_listing_details(text):
+    """Return (size, mtime) from the text that follows a link on a listing page."""
+    for pattern, date_format in LISTING_DATE_FORMATS:
+        date_match = pattern.search(text)
+        if not date_match:
+            continue
+        try:
+            mtime = calendar.timegm(time.strptime(f"{date_match.group(1)} {date_match.group(2)}", date_format))
+        except ValueError:
+            continue
+        
+        # The size column always comes after the date; directories show "-"
+        size = None
+        size_match = LISTING_SIZE_PATTERN.search(text, date_match.end())
+        if size_match:
+            unit = (size_match.group(2) or 'B')[0].upper()
+            size = int(float(size_match.group(1)) * SIZE_UNITS.get(unit, 1))
+        return size, mtime
+    
+    return None, None
+
+class StreamingListingParser(HTMLParser):
+    """Incremental directory listing parser that emits entries without building a DOM.
+    
+    Text is fed as it is downloaded. Pages that do not look like an Apache, nginx, h5ai or
+    similar autoindex are collected and handed to BeautifulSoup when the parser is closed.
+    """
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parse_seconds = 0.0
+        self.fallback = False
+        self._head = []
+        self._head_size = 0
+        self._sniffed = False
+        self._entries = []
+        self._href = None
+        self._in_link = False
+        self._details = []
+    
+    def feed_chunk(self, chunk):
+        """Parse the next piece of page text and return the entries completed so far."""
+        started = time.perf_counter()
+        if not self._sniffed:
+            self._head.append(chunk)
+            self._head_size += len(chunk)
+            if self._head_size < LISTING_SNIFF_SIZE:
+                return []
+            chunk = self._sniff()
+        
+        if self.fallback:
+            self._head.append(chunk)
+        elif chunk:
+            self.feed(chunk)
+        self.parse_seconds += time.perf_counter() - started
+        return self._drain()
+    
+    def finish(self):
+        """Parse whatever is left of the page and return the remaining entries."""
+        started = time.perf_counter()
+        if not self._sniffed:
+            chunk = self._sniff()
+            if not self.fallback:
+                self.feed(chunk)
+        
+        if self.fallback:
+            self._entries.extend(_parse_listing_soup("".join(self._head)))
+            self._head = []
+        else:
+            self.close()
+            self._flush()
+        self.parse_seconds += time.perf_counter() - started
+        return self._drain()
+    
+    def _sniff(self):
+        text = "".join(self._head)
+        self._sniffed = True
+        self.fallback = not LISTING_SIGNATURES.search(text)
+        self._head = [text] if self.fallback else []
+        return "" if self.fallback else text
+    
+    def _drain(self):
+        entries, self._entries = self._entries, []
+        return entries
+    
+    def _flush(self):
+        # The text between a link and the next link (or end of row) holds its date and size
+        if self._href:
+            size, mtime = parse_listing_details("".join(self._details))
+            self._entries.append(ListingEntry(self._href, self._href.endswith("/"), size, mtime))
+        self._href = None
+        self._details = []
+    
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self._flush()
+            self._href = dict(attrs).get("href")
+            self._in_link = True
+        elif self._href:
+            # Keep table cells apart so a date and the following size do not run together
+            self._details.append(" ")
+    
+    def handle_endtag(self, tag):
+        if tag == "a":
+            self._in_link = False
+        elif tag == "tr":
+            self._flush()
+    
+    def handle_data(self, data):
+        if self._href and not self._in_link:
+            self._details.append(data)
+
+def iter_listing_entries(chunks, parser=None):
+    """Yield ListingEntry tuples from the text chunks of a listing page as they arrive."""
+    if parser is None:
+        parser = StreamingListingParser()
+    for chunk in chunks:
+        if chunk:
+            yield from parser.feed_chunk(chunk)
+    yield from parser.finish()
+
+def _parse_listing_soup(html):
+    """Extract the links of an unrecognised page with BeautifulSoup."""
+    # Only pages the streaming parser does not recognise need bs4, so it is loaded here
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    entries = []
+    for link in soup.find_all("a"):
+        href = link.get("href")
+        if not href:
+            continue
+        
+        # Table listings keep date/size in the same row, plain ones right after the link
+        row = link.find_parent("tr")
+        if row is not None:
+            details = row.get_text(" ").split(link.get_text(), 1)[-1]
+        else:
+            details = link.next_sibling if isinstance(link.next_sibling, str) else ""
+        
+        size, mtime = parse_listing_details(details)
+        entries.append(ListingEntry(href, href.endswith("/"), size, mtime))
+    return entries
+
+def parse_listing(html):
+    """Extract the links of a directory listing page."""
+    return list(iter_listing_entries([html]))
+
+class ListingCache:
+    """On-disk cache of parsed directory listings keyed by folder URL."""
+    
+    def __init__(self, path=None, ttl=DEFAULT_CACHE_TTL, max_bytes=DEFAULT_CACHE_MAX_BYTES, offline=False):
+        self.path = path or os.path.join(get_app_data_dir(), "listing_cache.sqlite3")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        
+        import sqlite3
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS listings ("
+            "url TEXT PRIMARY KEY, entries TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+            "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS listings_accessed ON listings (accessed_at)")
+        self._conn.commit()
+    
+    def get(self, url):
+        """Return the cached listing for a URL as a dict, or None if it is not cached."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT entries, etag, last_modified, fetched_at FROM listings WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE listings SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+        
+        entries, etag, last_modified, fetched_at = row
+        return {
+            'entries': [ListingEntry(*entry) for entry in json.loads(entries)],
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': time.time() - fetched_at < self.ttl,
+        }
+    
+    def put(self, url, entries, etag=None, last_modified=None):
+        """Store a freshly fetched listing and evict old ones if over the size limit."""
+        data = json.dumps([list(entry) for entry in entries])
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, data, etag, last_modified, now, now, len(data)),
+            )
+            self._evict()
+            self._conn.commit()
+    
+    def mark_revalidated(self, url):
+        """Restart the TTL of a listing the server reported as unchanged."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE listings SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._conn.commit()
+    
+    def _evict(self):
+        # Drop least recently used listings until the cache fits in max_bytes
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM listings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute("SELECT url, size FROM listings ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM listings WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class HostUnavailable(Exception):
+    """Raised instead of sending a request to a host that keeps failing or timing out."""
+
+class HostHealth:
+    """Rolling latency, throughput and failure record of every host the crawler talks to.
+    
+    Requests report their outcome with record(). After HEALTH_MAX_FAILURES failures in a
+    row a host is considered down for HEALTH_COOLDOWN seconds, so crawls skip it instead
+    of waiting out a timeout per folder; after that one request is let through to see if
+    it is back. score() ranks hosts for mirror selection (lower is better).
+    """
+    
+    def __init__(self, smoothing=HEALTH_SMOOTHING, max_failures=HEALTH_MAX_FAILURES, cooldown=HEALTH_COOLDOWN):
+        self.smoothing = smoothing
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._hosts = {}
+    
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {
+                'latency': None, 'throughput': None, 'error_rate': 0.0,
+                'failures': 0, 'down_until': 0.0, 'requests': 0, 'timeouts': 0, 'probed_at': None,
+            }
+        return state
+    
+    def _average(self, old, new):
+        return new if old is None else old + self.smoothing * (new - old)
+    
+    def record(self, host, seconds=None, ok=True, timeout=False):
+        """Record the outcome of one request to a host, with its time to first byte."""
+        with self._lock:
+            state = self._state(host)
+            state['requests'] += 1
+            state['error_rate'] = self._average(state['error_rate'], 0.0 if ok else 1.0)
+            if ok:
+                state['failures'] = 0
+                state['down_until'] = 0.0
+                if seconds is not None:
+                    state['latency'] = self._average(state['latency'], seconds)
+                return
+            
+            state['failures'] += 1
+            if timeout:
+                state['timeouts'] += 1
+            if state['failures'] >= self.max_failures:
+                state['down_until'] = time.time() + self.cooldown
+    
+    def record_throughput(self, host, bytes_per_second):
+        with self._lock:
+            state = self._state(host)
+            state['throughput'] = self._average(state['throughput'], bytes_per_second)
+            state['probed_at'] = time.time()
+    
+    def is_down(self, host):
+        """Return True if requests to the host should be skipped for now."""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or not state['down_until']:
+                return False
+            if time.time() < state['down_until']:
+                return True
+            # Cooldown over: let one trial request through, and count it as a failure
+            # in advance so only one caller gets to try
+            state['down_until'] = time.time() + self.cooldown
+            return False
+    
+    def probed_at(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            return state['probed_at'] if state else None
+    
+    def score(self, host):
+        """Return the expected seconds to start and sample a file from the host (lower is better)."""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                return float('inf')
+            if state['down_until'] and time.time() < state['down_until']:
+                return float('inf')
+            latency = state['latency'] if state['latency'] is not None else MIRROR_PROBE_TIMEOUT
+            transfer = MIRROR_SAMPLE_BYTES / state['throughput'] if state['throughput'] else 0.0
+            return (latency + transfer) * (1 + 4 * state['error_rate'])
+    
+    def report(self):
+        """Return a one-line summary of every host's latency and failures."""
+        with self._lock:
+            parts = []
+            for host, state in sorted(self._hosts.items()):
+                latency = f"{state['latency'] * 1000:.0f} ms" if state['latency'] is not None else "n/a"
+                part = f"{host} {latency}, {state['error_rate']:.0%} errors"
+                if state['down_until'] and time.time() < state['down_until']:
+                    part += " (down)"
+                parts.append(part)
+        return "; ".join(parts) or "no requests"
+
+_host_health = HostHealth()
+
+def get_host_health():
+    """Return the process-wide host health record shared by sessions and crawlers."""
+    return _host_health
+
+def parse_retry_after(value):
+    """Return the seconds a Retry-After header (a delay or an HTTP date) asks to wait, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def _resolve_waiter(future):
+    if not future.done():
+        future.set_result(None)
+
+class HostLimiter:
+    """Adaptive request slots, request rate and listing timeouts of every host crawled.
+    
+    A request takes one of its host's slots with acquire() (acquire_async() on an event
+    loop), reports the answer with record() or record_failure() and gives the slot back
+    with release(). Slots follow AIMD like TCP congestion control: they widen while the
+    host answers fast and halve on timeouts and 429/503 responses, which also put the
+    host under a token-bucket rate limit; Retry-After pauses the host. timeout_for()
+    turns the host's latency percentiles into a listing timeout. With adaptive=False
+    every host keeps initial_limit slots and the callers' timeouts.
+    """
+    
+    def __init__(self, initial_limit=DEFAULT_PER_HOST_LIMIT, max_limit=ADAPTIVE_MAX_LIMIT, adaptive=True):
+        self.adaptive = adaptive
+        self.initial_limit = max(1, initial_limit)
+        self.max_limit = max(self.initial_limit, max_limit) if adaptive else self.initial_limit
+        self._lock = threading.Lock()
+        self._hosts = {}
+    
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {
+                'limit': float(self.initial_limit), 'inflight': 0, 'waiters': deque(),
+                'rate': None, 'next_at': 0.0, 'paused_until': 0.0, 'decreased_at': 0.0,
+                'latencies': deque(maxlen=ADAPTIVE_WINDOW), 'throttled': 0,
+            }
+        return state
+    
+    @staticmethod
+    def _percentile(state, q):
+        samples = sorted(state['latencies'])
+        return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else None
+    
+    def _take_slot(self, state):
+        # Returns the seconds to wait before sending, or None if every slot is taken
+        if state['inflight'] >= int(state['limit']):
+            return None
+        state['inflight'] += 1
+        now = time.monotonic()
+        delay = max(0.0, state['paused_until'] - now)
+        if state['rate']:
+            # GCRA token bucket: up to ADAPTIVE_BURST requests may go back to back
+            interval = 1.0 / state['rate']
+            delay = max(delay, state['next_at'] - now - (ADAPTIVE_BURST - 1) * interval)
+            state['next_at'] = max(state['next_at'], now + delay) + interval
+        return delay
+    
+    def _take_waiters(self, state):
+        woken = []
+        free = int(state['limit']) - state['inflight']
+        while free > 0 and state['waiters']:
+            woken.append(state['waiters'].popleft())
+            free -= 1
+        return woken
+    
+    @staticmethod
+    def _wake(woken):
+        for wake in woken:
+            # The event loop of an async waiter may be gone already
+            with contextlib.suppress(RuntimeError):
+                wake()
+    
+    def _forget(self, host, wake):
+        with self._lock:
+            with contextlib.suppress(ValueError):
+                self._hosts[host]['waiters'].remove(wake)
+    
+    def acquire(self, host):
+        """Block until the host has a free slot, its rate limit allows a request and it is not paused."""
+        while True:
+            with self._lock:
+                delay = self._take_slot(self._state(host))
+                if delay is None:
+                    ready = threading.Event()
+                    self._hosts[host]['waiters'].append(ready.set)
+            if delay is not None:
+                break
+            if not ready.wait(ADAPTIVE_WAIT_CHECK):
+                self._forget(host, ready.set)
+        if delay > 0:
+            try:
+                time.sleep(delay)
+            except BaseException:
+                self.release(host)
+                raise
+    
+    async def acquire_async(self, host):
+        """acquire() for coroutines: waits on the running event loop instead of blocking it."""
+        load_asyncio()
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                delay = self._take_slot(self._state(host))
+                if delay is None:
+                    ready = loop.create_future()
+                    wake = functools.partial(loop.call_soon_threadsafe, _resolve_waiter, ready)
+                    self._hosts[host]['waiters'].append(wake)
+            if delay is not None:
+                break
+            try:
+                await asyncio.wait_for(ready, ADAPTIVE_WAIT_CHECK)
+            except asyncio.TimeoutError:
+                self._forget(host, wake)
+            except asyncio.CancelledError:
+                self._forget(host, wake)
+                raise
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except BaseException:
+                self.release(host)
+                raise
+    
+    def release(self, host):
+        """Give back a slot taken by acquire()."""
+        with self._lock:
+            state = self._hosts[host]
+            state['inflight'] -= 1
+            woken = self._take_waiters(state)
+        self._wake(woken)
+    
+    def _decrease(self, state, seconds=None):
+        now = time.monotonic()
+        # Requests in flight when the host pushed back fail together; count that once
+        if now - state['decreased_at'] < ADAPTIVE_DECREASE_INTERVAL:
+            return
+        state['decreased_at'] = now
+        rate = state['rate']
+        if rate is None:
+            # Start from the rate the host was serving: busy slots over the median latency
+            # (or the latency of this answer, if it is the host's first)
+            median = self._percentile(state, 0.5) or seconds
+            busy = max(1, min(state['inflight'], int(state['limit'])))
+            rate = busy / median if median else float(busy)
+        state['rate'] = max(ADAPTIVE_MIN_RATE, rate * ADAPTIVE_DECREASE)
+        state['limit'] = max(1.0, state['limit'] * ADAPTIVE_DECREASE)
+    
+    def record(self, host, seconds, status=200, retry_after=None):
+        """Record an answer (time to the response headers and status) before releasing its slot."""
+        if not self.adaptive:
+            return
+        woken = []
+        with self._lock:
+            state = self._state(host)
+            if status in THROTTLE_STATUSES:
+                state['throttled'] += 1
+                self._decrease(state, seconds)
+                if retry_after is not None:
+                    state['paused_until'] = max(state['paused_until'],
+                                                time.monotonic() + min(retry_after, ADAPTIVE_MAX_RETRY_AFTER))
+                return
+            fast = self._percentile(state, 0.1)
+            state['latencies'].append(seconds)
+            if status >= 500 or (fast is not None and seconds > ADAPTIVE_LATENCY_FACTOR * fast):
+                return
+            if state['rate'] is not None:
+                # Additive increase: ADAPTIVE_RATE_STEP more requests/second every second
+                state['rate'] += ADAPTIVE_RATE_STEP / state['rate']
+                if state['rate'] >= ADAPTIVE_MAX_RATE:
+                    state['rate'] = None
+            # Only a host using all its slots is short of them
+            if state['inflight'] >= int(state['limit']):
+                state['limit'] = min(self.max_limit, state['limit'] + 1 / state['limit'])
+                woken = self._take_waiters(state)
+        self._wake(woken)
+    
+    def record_failure(self, host, timeout=None):
+        """Record a request that got no answer; timeout is the limit it ran into, if it timed out."""
+        if not self.adaptive:
+            return
+        with self._lock:
+            state = self._state(host)
+            self._decrease(state)
+            if timeout:
+                # Counted as an answer that took the whole timeout, so the next timeouts grow
+                state['latencies'].append(timeout)
+    
+    def timeout_for(self, host, default):
+        """Return the listing timeout for the host, or default until enough answers were seen."""
+        if not self.adaptive:
+            return default
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or len(state['latencies']) < ADAPTIVE_MIN_SAMPLES:
+                return default
+            p95 = self._percentile(state, 0.95)
+        return min(ADAPTIVE_MAX_TIMEOUT, max(ADAPTIVE_MIN_TIMEOUT, p95 * ADAPTIVE_TIMEOUT_FACTOR))
+    
+    def snapshot(self):
+        """Return every host's slots, rate limit, pause and latency percentiles as a JSON-ready dict."""
+        now = time.monotonic()
+        with self._lock:
+            hosts = {}
+            for host, state in sorted(self._hosts.items()):
+                p50, p95 = self._percentile(state, 0.5), self._percentile(state, 0.95)
+                hosts[host] = {
+                    'limit': round(state['limit'], 2),
+                    'in_flight': state['inflight'],
+                    'rate': round(state['rate'], 2) if state['rate'] is not None else None,
+                    'paused_seconds': round(max(0.0, state['paused_until'] - now), 3),
+                    'throttled': state['throttled'],
+                    'p50': round(p50, 6) if p50 is not None else None,
+                    'p95': round(p95, 6) if p95 is not None else None,
+                }
+        for host, state in hosts.items():
+            state['timeout'] = self.timeout_for(host, None)
+        return hosts
+    
+    def report(self):
+        """Return a one-line summary of every host's slots, rate limit and timeout."""
+        parts = []
+        for host, state in self.snapshot().items():
+            part = f"{host} {state['limit']:g} slots"
+            if state['rate'] is not None:
+                part += f", {state['rate']:g} req/s"
+            if state['timeout'] is not None:
+                part += f", timeout {state['timeout']:.1f}s"
+            if state['throttled']:
+                part += f", {state['throttled']} throttled"
+            parts.append(part)
+        return "; ".join(parts) or "no requests"
+
+_host_limiter = HostLimiter()
+
+def get_host_limiter():
+    """Return the process-wide per-host limiter shared by sessions and crawlers."""
+    return _host_limiter
+
+class MetricsRegistry:
+    """Process-lifetime counters and histograms, exported in the Prometheus text format.
+    
+    Unlike RunMetrics these are never reset, so a scraper can compute rates from them.
+    The metric names come from METRIC_COUNTERS and METRIC_HISTOGRAMS.
+    """
+    
+    def __init__(self, prefix=METRICS_PREFIX, counters=None, histograms=None):
+        self.prefix = prefix
+        self.counters = dict(METRIC_COUNTERS if counters is None else counters)
+        self.histograms = dict(METRIC_HISTOGRAMS if histograms is None else histograms)
+        self._lock = threading.Lock()
+        self._counts = defaultdict(float)
+        self._observed = {}
+    
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counts[key] += value
+    
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        buckets = self.histograms[name][1]
+        with self._lock:
+            state = self._observed.get(key)
+            if state is None:
+                state = self._observed[key] = [[0] * (len(buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(buckets, value)] += 1
+            state[1] += value
+    
+    @staticmethod
+    def _labels(labels, **extra):
+        pairs = list(labels) + list(extra.items())
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+    
+    @staticmethod
+    def _number(value):
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+    
+    def exposition(self):
+        """Return every metric in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            counts = dict(self._counts)
+            observed = {key: ([*buckets], total) for key, (buckets, total) in self._observed.items()}
+        lines = []
+        for name, help_text in self.counters.items():
+            full_name = f"{self.prefix}_{name}"
+            lines += [f"# HELP {full_name} {help_text}", f"# TYPE {full_name} counter"]
+            for (metric, labels), value in sorted(counts.items()):
+                if metric == name:
+                    lines.append(f"{full_name}{self._labels(labels)} {self._number(value)}")
+        for name, (help_text, bounds) in self.histograms.items():
+            full_name = f"{self.prefix}_{name}"
+            lines += [f"# HELP {full_name} {help_text}", f"# TYPE {full_name} histogram"]
+            for (metric, labels), (buckets, total) in sorted(observed.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip([*bounds, "+Inf"], itertools.accumulate(buckets)):
+                    lines.append(f"{full_name}_bucket{self._labels(labels, le=bound)} {count}")
+                lines.append(f"{full_name}_sum{self._labels(labels)} {self._number(total)}")
+                lines.append(f"{full_name}_count{self._labels(labels)} {sum(buckets)}")
+        return "\n".join(lines) + "\n"
+
+_metrics_registry = MetricsRegistry()
+
+def get_metrics_registry():
+    """Return the process-wide Prometheus metrics that RunMetrics and the playlist writers feed."""
+    return _metrics_registry
+
+def write_metrics_file(path, registry=None):
+    """Write the metrics in the text format for a node_exporter textfile collector."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write((registry or get_metrics_registry()).exposition())
+    # Replaced in one step so the collector never reads a half-written file
+    os.replace(temp_path, path)
+
+class RunMetrics:
+    """Time per stage and per-host request counts, bytes and latency of a run.
+    
+    Stages are the hot paths a search spends its time in:
+    - dns, connect, tls: connection setup (asyncio engine; requests does not expose it)
+    - fetch: request sent until the response headers arrived
+    - download: reading listing bodies, parse time excluded
+    - parse, cache: listing parsing and listing cache lookups
+    - match, episodes: file name matching and season/episode parsing
+    - write: playlist writing; ui: applying queued updates to the Tk widgets
+    Phases (folder search, file scan, ...) are wall time around whole parts of a run
+    and include the stages that ran inside them.
+    """
+    
+    def __init__(self, registry=None):
+        self.registry = registry if registry is not None else get_metrics_registry()
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Start a new run (the Prometheus counters keep counting)."""
+        with self._lock:
+            self.started_at = time.time()
+            self._started = time.perf_counter()
+            self._stages = defaultdict(lambda: [0, 0.0])
+            self._phases = defaultdict(float)
+            self._hosts = {}
+    
+    def add(self, stage, seconds, count=1):
+        with self._lock:
+            totals = self._stages[stage]
+            totals[0] += count
+            totals[1] += seconds
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+    
+    @contextlib.contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._phases[name] += time.perf_counter() - started
+    
+    def _host(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {
+                'requests': 0, 'errors': 0, 'bytes': 0, 'latency_sum': 0.0, 'latency_max': 0.0,
+                'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        return state
+    
+    def record_request(self, host, seconds=None, ok=True):
+        """Count a request and, if it got a response, its time to the response headers."""
+        self.registry.inc('requests_total', host=host)
+        if not ok:
+            self.registry.inc('request_errors_total', host=host)
+        if seconds is not None:
+            self.registry.observe('listing_fetch_seconds', seconds, host=host)
+        with self._lock:
+            state = self._host(host)
+            state['requests'] += 1
+            if not ok:
+                state['errors'] += 1
+            if seconds is not None:
+                state['latency_sum'] += seconds
+                state['latency_max'] = max(state['latency_max'], seconds)
+                state['buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    
+    def record_bytes(self, host, count):
+        self.registry.inc('listing_bytes_total', count, host=host)
+        with self._lock:
+            self._host(host)['bytes'] += count
+    
+    def record_listing(self, host, download_seconds, parse_seconds):
+        """Count a downloaded listing with its download and parse time."""
+        self.add("download", download_seconds)
+        self.add("parse", parse_seconds)
+        self.registry.inc('listings_fetched_total', host=host)
+        self.registry.observe('listing_parse_seconds', parse_seconds, host=host)
+    
+    def count(self, name, value=1, **labels):
+        """Add to one of the Prometheus counters only (cache lookups, matches, playlists)."""
+        self.registry.inc(name, value, **labels)
+    
+    def snapshot(self):
+        """Return the run's numbers as a JSON-ready dict."""
+        with self._lock:
+            stages = {name: {'count': count, 'seconds': round(seconds, 6)}
+                      for name, (count, seconds) in sorted(self._stages.items())}
+            phases = {name: round(seconds, 6) for name, seconds in self._phases.items()}
+            hosts = {}
+            for host, state in sorted(self._hosts.items()):
+                answered = sum(state['buckets'])
+                hosts[host] = {
+                    'requests': state['requests'],
+                    'errors': state['errors'],
+                    'bytes': state['bytes'],
+                    'latency': {
+                        'count': answered,
+                        'sum': round(state['latency_sum'], 6),
+                        'max': round(state['latency_max'], 6),
+                        'p50': self._quantile(state['buckets'], 0.5),
+                        'p95': self._quantile(state['buckets'], 0.95),
+                        # Cumulative counts per upper bound, like a Prometheus histogram
+                        'buckets': [[bound, count] for bound, count in
+                                    zip(list(LATENCY_BUCKETS) + ["+Inf"], itertools.accumulate(state['buckets']))],
+                    },
+                }
+            return {
+                'started_at': self.started_at,
+                'wall_seconds': round(time.perf_counter() - self._started, 6),
+                'phases': phases,
+                'stages': stages,
+                'hosts': hosts,
+            }
+    
+    @staticmethod
+    def _quantile(buckets, q):
+        # Upper bound of the bucket holding the q-th request (None past the last bound)
+        total = sum(buckets)
+        if not total:
+            return None
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, buckets):
+            seen += count
+            if seen >= q * total:
+                return bound
+        return None
+    
+    def report(self):
+        """Return a one-line summary of where the time went, slowest stage first."""
+        with self._lock:
+            stages = sorted(self._stages.items(), key=lambda item: -item[1][1])
+        return ", ".join(f"{name} {seconds:.2f}s" for name, (_, seconds) in stages) or "nothing recorded"
+
+_run_metrics = RunMetrics()
+
+def get_run_metrics():
+    """Return the process-wide run metrics the crawl, match and playlist code records into."""
+    return _run_metrics
+
+class RunProfiler:
+    """cProfile and tracemalloc over a run, including the threads it starts.
+    
+    Threads started between start() and stop() get their own profiler, merged into
+    the result; threads already running (the GUI's) are not profiled.
+    """
+    
+    def __init__(self, top=RUN_PROFILE_TOP):
+        self.top = top
+        self._lock = threading.Lock()
+        self._profiles = []
+    
+    def start(self):
+        import cProfile
+        import tracemalloc
+        self._profiles = [cProfile.Profile()]
+        threading.setprofile(self._profile_thread)
+        tracemalloc.start()
+        self._profiles[0].enable()
+    
+    def _profile_thread(self, frame, event, arg):
+        # Called once in each new thread; enabling a profiler replaces this hook
+        import cProfile
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+    
+    def stop(self, stats_path=None):
+        """Stop profiling and return the top functions and allocations as a dict.
+        
+        With stats_path the full profile is saved there for pstats or snakeviz.
+        """
+        import pstats
+        import tracemalloc
+        self._profiles[0].disable()
+        threading.setprofile(None)
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        with self._lock:
+            profiles = list(self._profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        if stats_path:
+            stats.dump_stats(stats_path)
+        
+        functions = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:self.top]
+        allocations = snapshot.statistics("lineno")[:self.top]
+        return {
+            'stats_file': stats_path,
+            'threads': len(profiles),
+            'functions': [{
+                'function': f"{filename}:{line}({name})",
+                'calls': calls,
+                'own_seconds': round(own, 6),
+                'cumulative_seconds': round(cumulative, 6),
+            } for (filename, line, name), (_, calls, own, cumulative, _) in functions],
+            'memory': {
+                'current_kib': current // 1024,
+                'peak_kib': peak // 1024,
+                'top': [{'line': str(stat.traceback[0]), 'kib': stat.size // 1024, 'blocks': stat.count}
+                        for stat in allocations],
+            },
+        }
+
+def new_run_report_path():
+    """Return a fresh report path in the reports folder, dropping all but the newest reports.
+    
+    A profile saved next to a report (same name, .prof) is dropped with it.
+    """
+    reports_dir = os.path.join(get_app_data_dir(), "reports")
+    os.makedirs(reports_dir, exist_ok=True)
+    old = sorted(name for name in os.listdir(reports_dir) if name.startswith("run-") and name.endswith(".json"))
+    for name in old[:max(0, len(old) - RUN_REPORT_KEEP + 1)]:
+        for stale in (name, name[:-len(".json")] + ".prof"):
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(reports_dir, stale))
+    now = time.time()
+    return os.path.join(reports_dir, f"run-{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}"
+                                     f"-{int(now * 1000) % 1000:03d}.json")
+
+def write_run_report(run, path=None, metrics=None, profile=None):
+    """Write the JSON report of a finished run and return its path.
+    
+    run describes the run (mode, term, engine, results, ...); profile is the result
+    of RunProfiler.stop(). The host limiter's state is included under 'limits'.
+    Without a path, new_run_report_path() picks one.
+    """
+    report = {'version': RUN_REPORT_VERSION, 'finished_at': time.time(), 'run': run}
+    report.update((metrics or get_run_metrics()).snapshot())
+    report['limits'] = get_host_limiter().snapshot()
+    if profile is not None:
+        report['profile'] = profile
+    
+    path = path or new_run_report_path()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+class CrawlSession:
+    """HTTP session shared by every listing fetch of a crawl, with pooled keep-alive connections."""
+    
+    def __init__(self, pool_size=DEFAULT_PER_HOST_LIMIT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 cache=None, health=None, timeout=None, metrics=None, limiter=None):
+        load_requests()
+        load_asyncio()
+        self.cache = cache
+        # Overrides the per-call listing timeouts (5 s folder search, 15 s folder scan, or
+        # the limiter's once it has seen enough answers from a host) when set
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.health = health if health is not None else get_host_health()
+        self.limiter = limiter if limiter is not None else get_host_limiter()
+        self.metrics = metrics if metrics is not None else get_run_metrics()
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+        
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            # 429 and 503 are retried by get(), so the limiter sees them and their Retry-After
+            status_forcelist=[status for status in RETRY_STATUSES if status not in THROTTLE_STATUSES],
+            respect_retry_after_header=False,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False,
+        )
+        # pool_maxsize is per host; the limiter decides how many of those connections are
+        # in use, and pool_block makes extra threads wait instead of opening throwaway ones
+        self.adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max(1, pool_size, self.limiter.max_limit),
+                                   max_retries=retry, pool_block=True)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.error_count = 0
+        self.cache_hits = 0
+        self.cache_revalidated = 0
+        self.cache_misses = 0
+        self.parse_count = 0
+        self.parse_seconds = 0.0
+        self.coalesced = 0
+        self._inflight = {}
+        self._cancelled = threading.Event()
+    
+    def cancel(self):
+        """Abort the session's requests (thread-safe).
+        
+        New requests and listings still being downloaded raise asyncio.CancelledError,
+        which the crawl step generators do not catch, so the whole search unwinds.
+        """
+        self._cancelled.set()
+    
+    def get(self, url, timeout, headers=None, stream=False, method="GET"):
+        """Fetch a URL through the shared connection pool, skipping hosts that are down.
+        
+        The request waits for a slot from the host limiter. A streamed response holds it
+        until it is closed, so callers must close it (with a with block). 429 and 503
+        answers are retried after their Retry-After or the usual backoff.
+        """
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            if self._cancelled.is_set():
+                raise asyncio.CancelledError()
+            if self.health.is_down(host):
+                with self._lock:
+                    self.error_count += 1
+                raise HostUnavailable(f"{host} is not responding, skipping {url}")
+            
+            self.limiter.acquire(host)
+            try:
+                response = self._send(host, method, url, timeout, headers, stream)
+            except BaseException:
+                self.limiter.release(host)
+                raise
+            if response.status_code not in THROTTLE_STATUSES or attempt >= self.retries:
+                if stream:
+                    self._release_on_close(response, host)
+                else:
+                    self.limiter.release(host)
+                return response
+            
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            response.close()
+            self.limiter.release(host)
+            delay = (min(retry_after, ADAPTIVE_MAX_RETRY_AFTER) if retry_after is not None
+                     else self.backoff * (2 ** attempt))
+            # A long Retry-After must not keep a stopped search waiting
+            if self._cancelled.wait(delay):
+                raise asyncio.CancelledError()
+            attempt += 1
+    
+    def _send(self, host, method, url, timeout, headers, stream):
+        with self._lock:
+            self.request_count += 1
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=timeout, headers=headers, stream=stream)
+        except Exception as e:
+            with self._lock:
+                self.error_count += 1
+            timed_out = isinstance(e, requests.exceptions.Timeout)
+            self.health.record(host, ok=False, timeout=timed_out)
+            self.limiter.record_failure(host, timeout if timed_out else None)
+            self.metrics.add("fetch", time.perf_counter() - started)
+            self.metrics.record_request(host, ok=False)
+            raise
+        # With stream=True this is the time to the response headers
+        elapsed = time.perf_counter() - started
+        status = response.status_code
+        # A host asking us to slow down is up; throttling is left to the limiter
+        if status not in THROTTLE_STATUSES:
+            self.health.record(host, elapsed, ok=status < 500)
+        self.limiter.record(host, elapsed, status, parse_retry_after(response.headers.get('Retry-After')))
+        if status in THROTTLE_STATUSES:
+            self.metrics.count('throttled_responses_total', host=host)
+        self.metrics.add("fetch", elapsed)
+        self.metrics.record_request(host, elapsed, ok=status < 500)
+        return response
+    
+    def _release_on_close(self, response, host):
+        # The body is still to be read, so the host's slot is given back when the
+        # response is closed (a with block calls close())
+        close = response.close
+        released = []
+        
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released:
+                    released.append(True)
+                    self.limiter.release(host)
+        response.close = close_and_release
+    
+    def read_listing(self, response):
+        """Parse a streamed listing response chunk by chunk and return its entries."""
+        if response.encoding is None:
+            response.encoding = "utf-8"
+        parser = StreamingListingParser()
+        started = time.perf_counter()
+        entries = list(iter_listing_entries(
+            self._until_cancelled(response.iter_content(LISTING_CHUNK_SIZE, decode_unicode=True)), parser
+        ))
+        with self._lock:
+            self.parse_count += 1
+            self.parse_seconds += parser.parse_seconds
+        host = urlparse(response.url).netloc
+        self.metrics.record_listing(host, time.perf_counter() - started - parser.parse_seconds, parser.parse_seconds)
+        # Bytes as received, before gzip decoding
+        self.metrics.record_bytes(host, response.raw.tell())
+        return entries
+    
+    def _until_cancelled(self, chunks):
+        # Checked between chunks so cancel() stops a large listing mid-download
+        for chunk in chunks:
+            if self._cancelled.is_set():
+                raise asyncio.CancelledError()
+            yield chunk
+    
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+    
+    def _count_cache(self, url, result):
+        self._count(CACHE_RESULT_COUNTERS[result])
+        self.metrics.count('listing_cache_total', host=urlparse(url).netloc, result=result)
+    
+    def get_listing(self, url, timeout):
+        """Return (status_code, entries) for a directory URL, using the listing cache when set.
+        
+        Threads asking for a listing that is already being fetched wait for that fetch
+        instead of starting their own.
+        """
+        with self._lock:
+            future = self._inflight.get(url)
+            owner = future is None
+            if owner:
+                future = self._inflight[url] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+        
+        try:
+            result = self._get_listing(url, self.timeout or self.limiter.timeout_for(urlparse(url).netloc, timeout))
+        except BaseException as e:
+            # Including cancellation, so threads waiting on this fetch are released too
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[url]
+    
+    def _get_listing(self, url, timeout):
+        with self.metrics.stage("cache"):
+            cached = self.cache.get(url) if self.cache else None
+        if cached and (cached['fresh'] or self.cache.offline):
+            self._count_cache(url, 'hit')
+            return 200, cached['entries']
+        
+        if self.cache and self.cache.offline:
+            # Same answer an HTTP cache gives for only-if-cached requests it cannot serve
+            self._count_cache(url, 'miss')
+            return 504, []
+        
+        # Stale entries are revalidated so unchanged listings are not downloaded again
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        
+        with self.get(url, timeout, headers=headers or None, stream=True) as response:
+            if cached and response.status_code == 304:
+                self._count_cache(url, 'revalidated')
+                self.cache.mark_revalidated(url)
+                return 200, cached['entries']
+            
+            if response.status_code != 200:
+                return response.status_code, []
+            
+            entries = self.read_listing(response)
+        if self.cache:
+            self._count_cache(url, 'miss')
+            with self.metrics.stage("cache"):
+                self.cache.put(url, entries, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return 200, entries
+    
+    def get_listing_conditional(self, url, timeout, etag=None, last_modified=None):
+        """Fetch a listing from the server, bypassing cache freshness, with optional validators.
+        
+        Returns (status_code, entries, etag, last_modified); entries is empty unless the status is 200.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        
+        timeout = self.timeout or self.limiter.timeout_for(urlparse(url).netloc, timeout)
+        with self.get(url, timeout, headers=headers or None, stream=True) as response:
+            new_etag = response.headers.get('ETag')
+            new_last_modified = response.headers.get('Last-Modified')
+            if response.status_code != 200:
+                return response.status_code, [], new_etag, new_last_modified
+            
+            entries = self.read_listing(response)
+        if self.cache and not self.cache.offline:
+            self.cache.put(url, entries, new_etag, new_last_modified)
+        return 200, entries, new_etag, new_last_modified
+    
+    def stats(self):
+        """Return request and connection counts for this crawl."""
+        connections = 0
+        pool_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                pool_requests += pool.num_requests
+        
+        return {
+            'requests': self.request_count,
+            'errors': self.error_count,
+            'connections': connections,
+            'reused': max(0, pool_requests - connections),
+            'cache_hits': self.cache_hits,
+            'cache_revalidated': self.cache_revalidated,
+            'cache_misses': self.cache_misses,
+            'parse_count': self.parse_count,
+            'parse_seconds': self.parse_seconds,
+            'coalesced': self.coalesced,
+        }
+    
+    def report(self):
+        """Return a one-line summary of connection reuse."""
+        stats = self.stats()
+        total = stats['reused'] + stats['connections']
+        reuse = stats['reused'] / total if total else 0
+        summary = (f"{stats['requests']} listing requests over {stats['connections']} connections "
+                   f"({reuse:.0%} reused, {stats['errors']} errors)")
+        if stats['parse_count']:
+            summary += (f"; parsed {stats['parse_count']} listings in {stats['parse_seconds']:.2f}s "
+                        f"({stats['parse_seconds'] * 1000 / stats['parse_count']:.1f} ms each)")
+        if self.cache:
+            summary += (f"; cache: {stats['cache_hits']} hits, {stats['cache_revalidated']} revalidated, "
+                        f"{stats['cache_misses']} misses")
+        if stats['coalesced']:
+            summary += f"; {stats['coalesced']} shared in-flight fetches"
+        return summary
+    
+    def close(self):
+        self.session.close()
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+def get_shared_session():
+    """Return the process-wide session used when a caller does not pass its own."""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = CrawlSession()
+        return _shared_session
+
+def normalize_url(url):
+    """Return the form of a URL used to tell whether two crawl targets are the same.
+
+    Scheme and host are lowercased, default ports dropped, percent-encoding made
+    uniform, dot segments and empty segments resolved and the fragment removed. The
+    trailing slash is dropped too, so a folder compares equal with or without it.
+    """
+    parts = urlparse(url)
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and (scheme, port) not in (("http", 80), ("https", 443), ("ftp", 21)):
+        netloc += f":{port}"
+    userinfo = parts.netloc.rpartition("@")[0]
+    if userinfo:
+        netloc = f"{userinfo}@{netloc}"
+
+    segments = []
+    for segment in parts.path.split("/"):
+        if segment in ("", "."):
+            continue
+        if segment == "..":
+            if segments:
+                segments.pop()
+            continue
+        # Decoding and re-encoding each segment on its own keeps an encoded "/" inside a name
+        segments.append(quote(unquote(segment), safe="!$&'()*+,;=:@~"))
+
+    normalized = f"{scheme}://{netloc}/" + "/".join(segments)
+    if parts.query:
+        normalized += "?" + parts.query
+    return normalized
+
+class CrawlBudgetExceeded(Exception):
+    """Raised for a listing a search may not fetch because its folder budget is used up."""
+
+class CrawlFrontier:
+    """Shared record of one search: every listing it fetched and every folder it scanned.
+
+    Both search phases fetch through the same frontier, so a folder reached several
+    ways (as an alphabetical folder, a year folder and again from the folder list) is
+    downloaded once and scanned once. URLs are compared in normalize_url form.
+    max_depth bounds how far a folder scan recurses into subfolders and max_folders
+    how many listings the search may fetch; 0 or None means no limit. Scan results
+    depend on the search term, so use one frontier per search, or pass the term to
+    scanned/record_scan when several searches share it (see batch_search). A scan is
+    remembered with the depth it ran at; if max_depth cut it short, a folder reached
+    again closer to the start is scanned again, as it may now recurse further. cancel()
+    stops every later fetch, and export_scans/restore_scans carry the scan results
+    over to a resumed search (see SearchCheckpoint).
+    """
+
+    def __init__(self, max_depth=DEFAULT_MAX_DEPTH, max_folders=DEFAULT_MAX_FOLDERS):
+        load_asyncio()
+        self.max_depth = max_depth
+        self.max_folders = max_folders
+        self.fetched = 0
+        self.reused = 0
+        self.over_budget = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._listings = {}
+        self._scans = {}
+        self._incomplete = set()
+        self._failed = set()
+        self._depth_limited = set()
+        self._cancelled = threading.Event()
+
+    def _claim(self, url, new_future):
+        # Return (future, owner); the owner is the one caller that actually fetches the URL
+        if self._cancelled.is_set():
+            raise asyncio.CancelledError()
+        key = normalize_url(url)
+        with self._lock:
+            future = self._listings.get(key)
+            if future is not None:
+                self.reused += 1
+                return future, False
+            if self.max_folders and self.fetched >= self.max_folders:
+                self.over_budget += 1
+                self._incomplete.add(key)
+                raise CrawlBudgetExceeded(f"folder budget of {self.max_folders} listings reached, skipping {url}")
+            self.fetched += 1
+            future = self._listings[key] = new_future()
+            return future, True
+
+    def fetch_listing(self, fetch, url, timeout):
+        """Return fetch(url, timeout), calling it at most once per folder for the whole search."""
+        future, owner = self._claim(url, Future)
+        if owner:
+            try:
+                result = fetch(url, timeout)
+            except asyncio.CancelledError as e:
+                # Threads waiting for this folder are stopped as well
+                future.set_exception(e)
+            except Exception as e:
+                self._count_failure(url)
+                future.set_exception(e)
+            else:
+                if result[0] != 200:
+                    self._count_failure(url)
+                future.set_result(result)
+        return future.result()
+
+    def _count_failure(self, url):
+        with self._lock:
+            self.failed += 1
+            self._failed.add(normalize_url(url))
+            self._incomplete.add(normalize_url(url))
+
+    def listing_failed(self, url):
+        """Return True if fetching the listing of a folder failed during the search."""
+        with self._lock:
+            return normalize_url(url) in self._failed
+
+    def cancel(self):
+        """Make every later listing fetch of the search raise asyncio.CancelledError (thread-safe)."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def listing_fetcher(self, fetch):
+        """Wrap a (url, timeout) -> (status, entries) function so it goes through the frontier."""
+        return functools.partial(self.fetch_listing, fetch)
+
+    async def fetch_listing_async(self, fetch, url, timeout):
+        """Async counterpart of fetch_listing for a coroutine function fetch."""
+        future, owner = self._claim(url, asyncio.get_running_loop().create_future)
+        if owner:
+            try:
+                result = await fetch(url, timeout)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                self._count_failure(url)
+                future.set_exception(e)
+                # Mark the exception as retrieved; it is re-raised to this caller below
+                future.exception()
+            else:
+                if result[0] != 200:
+                    self._count_failure(url)
+                future.set_result(result)
+        # Shielded so a waiter being cancelled does not cancel the shared fetch
+        return await asyncio.shield(future)
+
+    def may_descend(self, depth):
+        """Return True if a folder scan at this depth may recurse into subfolders."""
+        return not self.max_depth or depth < self.max_depth
+
+    def record_depth_limit(self, folder_url):
+        """Remember that a scan did not recurse into a folder's subfolders because of max_depth."""
+        with self._lock:
+            self._depth_limited.add(normalize_url(folder_url))
+
+    def scanned(self, folder_url, search_term=None, depth=0):
+        """Return the files an earlier scan of a folder found, or None if it must be scanned (again).
+        
+        A scan recorded at a greater depth than this one is not reused if the depth
+        limit stopped it somewhere in the folder's subtree, since this scan can go further.
+        """
+        url = normalize_url(folder_url)
+        with self._lock:
+            scan = self._scans.get((url, search_term))
+            if scan is None or (depth < scan[0] and any(other == url or other.startswith(url + "/")
+                                                        for other in self._depth_limited)):
+                return None
+        return list(scan[1])
+
+    def record_scan(self, folder_url, files, search_term=None, depth=0):
+        """Remember the files a folder scan at this depth found, unless a shallower scan is known."""
+        key = (normalize_url(folder_url), search_term)
+        with self._lock:
+            scan = self._scans.get(key)
+            if scan is None or depth <= scan[0]:
+                self._scans[key] = (depth, list(files))
+
+    def export_scans(self):
+        """Return [folder_url, search_term, files] for every complete folder scan.
+        
+        Scans are left out if a listing in their subtree failed or was over budget,
+        or the depth limit stopped them in it, so a resumed search fetches those
+        folders again.
+        """
+        with self._lock:
+            scans = list(self._scans.items())
+            incomplete = list(self._incomplete) + list(self._depth_limited)
+        return [[url, term, files] for (url, term), (depth, files) in scans
+                if not any(other == url or other.startswith(url + "/") for other in incomplete)]
+
+    def restore_scans(self, scans):
+        """Load scan results saved by export_scans; those folders are not fetched again."""
+        with self._lock:
+            for url, term, files in scans:
+                self._scans[(url, term)] = (0, list(files))
+
+    def report(self):
+        """Return a one-line summary of fetched and deduplicated folders."""
+        summary = f"{self.fetched} folders fetched, {self.reused} repeat visits served without refetching"
+        if self.failed:
+            summary += f", {self.failed} failed"
+        if self.over_budget:
+            summary += f", {self.over_budget} skipped over the {self.max_folders} folder budget"
+        return summary
+
+class SearchCheckpoint:
+    """On-disk progress of one search, so an interrupted crawl resumes where it stopped.
+    
+    Holds the folder list of the folder search phase and the frontier's complete folder
+    scans. A resumed search restores them into its CrawlFrontier, skips the folder search
+    and answers the folders scanned before without fetching them. A search is identified
+    by its URL, search term, extensions and crawl limits.
+    """
+    
+    def __init__(self, base_url, search_term, extensions=None, max_depth=DEFAULT_MAX_DEPTH,
+                 max_folders=DEFAULT_MAX_FOLDERS, directory=None, interval=CHECKPOINT_INTERVAL):
+        self.key = {
+            'base_url': normalize_url(base_url),
+            'search_term': search_term.strip().lower(),
+            'extensions': sorted(media_suffixes(extensions)),
+            'max_depth': max_depth,
+            'max_folders': max_folders,
+        }
+        name = hashlib.sha1(json.dumps(self.key, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+        directory = directory or os.path.join(get_app_data_dir(), "checkpoints")
+        self.path = os.path.join(directory, f"{name}.json")
+        self.interval = interval
+        self.folders = None
+        self.scans = []
+        self.saved_at = None
+        self._lock = threading.Lock()
+        self._last_save = time.monotonic()
+    
+    def load(self):
+        """Read the saved progress of this search; return False if there is none."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != CHECKPOINT_VERSION or data.get('key') != self.key:
+            return False
+        self.folders = data['folders']
+        self.scans = data['scans']
+        self.saved_at = data['saved_at']
+        return True
+    
+    def restore(self, frontier):
+        """Load the saved scans into a frontier and return the saved folder list (None if not found yet)."""
+        frontier.restore_scans(self.scans)
+        return self.folders
+    
+    def record_folders(self, folders, frontier):
+        """Remember the result of the folder search phase and save it right away."""
+        self.folders = list(folders)
+        self.save(frontier)
+    
+    def maybe_save(self, frontier):
+        """Save if the last save is more than interval seconds old."""
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save(frontier)
+    
+    def save(self, frontier):
+        """Write the current progress of the search (thread-safe, atomic)."""
+        with self._lock:
+            self.scans = frontier.export_scans()
+            self.saved_at = time.time()
+            data = {'version': CHECKPOINT_VERSION, 'key': self.key, 'saved_at': self.saved_at,
+                    'folders': self.folders, 'scans': self.scans}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.remove(temp_path)
+                raise
+            self._last_save = time.monotonic()
+    
+    def discard(self):
+        """Delete the saved progress and start over."""
+        with self._lock:
+            self.folders = None
+            self.scans = []
+            self.saved_at = None
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.path)
+    
+    @contextlib.contextmanager
+    def recording(self, frontier):
+        """Save the checkpoint if the search inside stops early; discard it once it completes."""
+        try:
+            yield self
+        except BaseException:
+            self.save(frontier)
+            raise
+        self.discard()
+
+def folder_priority(folder_url, matcher):
+    """Rank a folder by how likely it is to hold the search term's files (lower comes first)."""
+    name = unquote(urlparse(folder_url).path.rstrip("/").rpartition("/")[2]).lower()
+    if (matcher.search_term_lower in name or matcher.search_term_filename in name
+            or matcher.search_term_filename2 in name):
+        return 0
+    if any(word in name for word in matcher.search_words):
+        return 1
+    if SEASON_FOLDER_PATTERN.search(name):
+        return 2
+    if matcher.year and matcher.year in name:
+        return 3
+    return 4
+
+def run_crawl_steps(steps, fetch_listing):
+    """Drive a crawl step generator, answering each (url, timeout) it yields with fetch_listing.
+    
+    The step generators hold the crawl logic without doing any I/O, so the blocking
+    functions below and AsyncCrawler share it. Fetch errors are thrown back into the
+    generator, where the same try/except blocks as before handle them.
+    """
+    try:
+        request = next(steps)
+        while True:
+            try:
+                result = fetch_listing(*request)
+            except Exception as e:
+                request = steps.throw(e)
+            else:
+                request = steps.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+def get_folders_recursive(base_url, search_term, session=None, frontier=None):
+    """Recursively scrape FTP directory for folders that might contain the search term."""
+    if session is None:
+        session = get_shared_session()
+    fetch_listing = frontier.listing_fetcher(session.get_listing) if frontier else session.get_listing
+    return run_crawl_steps(folder_search_steps(base_url, search_term), fetch_listing)
+
+def folder_search_steps(base_url, search_term):
+    """Step generator behind get_folders_recursive."""
+    # Always include the base URL as a folder to check
+    folders = [base_url]
+    checked_folders = set()  # Keep track of folders we've already checked
+    
+    try:
+        # Get the base page content
+        status, entries = yield base_url, 5
+        if status == 200:
+            
+            # Convert search term to lowercase for case-insensitive matching
+            # Split into words for better matching
+            search_words = search_term.lower().split()
+            
+            # First, check if this is a movie directory
+            is_movie_dir = "movie" in base_url.lower()
+            
+            # Look for direct subfolders that might match the search term
+            for entry in entries:
+                href = entry.href
+                if href and href.endswith("/") and href != "../" and href != "/":
+                    full_url = urljoin(base_url, href)
+                    
+                    # Skip if we've already checked this URL
+                    if normalize_url(full_url) in checked_folders:
+                        continue
+                    checked_folders.add(normalize_url(full_url))
+                    
+                    # Special handling for movie directories
+                    if is_movie_dir:
+                        # For movie directories, check if folder might contain our movie
+                        # For example: alphabetical folders (A-Z), year folders, genre folders
+                        href_lower = href.lower()
+                        
+                        # Check for alphabetical folders
+                        first_letter = search_term[0].lower()
+                        if href_lower.startswith(first_letter) or first_letter in href_lower:
+                            folders.append(full_url)
+                            continue
+                            
+                        # Check for year folders (4-digit numbers)
+                        year_match = re.search(r'(19\d\d|20\d\d)', href_lower)
+                        if year_match:
+                            folders.append(full_url)
+                            continue
+                            
+                        # If folder contains any search word, add it
+                        if any(word in href_lower for word in search_words):
+                            folders.append(full_url)
+                            continue
+                            
+                        # Add common movie organization folders
+                        if any(x in href_lower for x in ['action', 'drama', 'comedy', 'horror', 'thriller']):
+                            folders.append(full_url)
+                            continue
+                    else:
+                        # For TV show directories or general directories
+                        # Check if ANY of the search words are in the folder name
+                        href_lower = href.lower()
+                        if any(word in href_lower for word in search_words):
+                            folders.append(full_url)
+                            
+                            # Also check for season subfolders within this folder
+                            try:
+                                subfolder_status, subfolder_entries = yield full_url, 5
+                                if subfolder_status == 200:
+                                    for subfolder_entry in subfolder_entries:
+                                        subfolder_href = subfolder_entry.href
+                                        if subfolder_href and subfolder_href.endswith("/") and subfolder_href != "../" and subfolder_href != "/":
+                                            # Check if it's a season folder (contains "season" or "s01", "s02", etc.)
+                                            if re.search(r'season|s\d+', subfolder_href.lower()):
+                                                season_url = urljoin(full_url, subfolder_href)
+                                                folders.append(season_url)
+                            except Exception:
+                                # If error checking subfolders, just continue
+                                pass
+    except Exception as e:
+        print(f"Error in folder search: {str(e)}")
+        # If there's an error, just use the base URL
+        pass
+    
+    # Remove duplicates while preserving order
+    unique_folders = []
+    seen = set()
+    for folder in folders:
+        if normalize_url(folder) not in seen:
+            seen.add(normalize_url(folder))
+            unique_folders.append(folder)
+    
+    return unique_folders
+
+def parse_season_episode(filename):
+    """Extract season and episode numbers from filename."""
+    # Common patterns: S01E02, 1x02, Season 1 Episode 2, etc.
+    patterns = [
+        r'[Ss](\d+)[Ee](\d+)',  # S01E02
+        r'(\d+)[xX](\d+)',      # 1x02
+        r'[Ss]eason\s*(\d+)\s*[Ee]pisode\s*(\d+)',  # Season 1 Episode 2
+        r'[Ee]p(?:isode)?\s*(\d+)',  # Episode only (assume season 1)
+    ]
+    
+    for pattern in patterns:
+        match = re.search(pattern, filename)
+        if match:
+            groups = match.groups()
+            if len(groups) == 2:
+                return int(groups[0]), int(groups[1])
+            elif len(groups) == 1:
+                return 1, int(groups[0])  # Assume season 1
+            
+    # If folder contains season information
+    season_match = re.search(r'[Ss]eason\s*(\d+)', filename)
+    if season_match:
+        season = int(season_match.group(1))
+        # Look for episode number
+        ep_match = re.search(r'[Ee]p(?:isode)?\s*(\d+)', filename)
+        if ep_match:
+            return season, int(ep_match.group(1))
+    
+    return None, None  # Could not parse
+
+# parse_season_episode's patterns as one regex. Each branch is a lookahead that
+# finds the same leftmost match re.search would, and the alternation tries them
+# in the same order, so one match() call gives the same answer as the loop above.
+# The season + episode fallback above can never match once the "Episode only"
+# pattern has failed, so it needs no branch here.
+SEASON_EPISODE_PATTERN = re.compile(
+    r'(?=.*?[Ss](\d+)[Ee](\d+))'                        # S01E02
+    r'|(?=.*?(\d+)[xX](\d+))'                           # 1x02
+    r'|(?=.*?[Ss]eason\s*(\d+)\s*[Ee]pisode\s*(\d+))'    # Season 1 Episode 2
+    r'|(?=.*?[Ee]p(?:isode)?\s*(\d+))',                 # Episode only (assume season 1)
+    re.DOTALL,
+)
+
+@functools.lru_cache(maxsize=65536)
+def _parse_season_episode_fast(filename):
+    match = SEASON_EPISODE_PATTERN.match(filename)
+    if match is None:
+        return None, None
+    
+    # The last group set tells which branch matched
+    if match.lastindex == 7:
+        return 1, int(match.group(7))
+    return int(match.group(match.lastindex - 1)), int(match.group(match.lastindex))
+
+def parse_season_episode_batch(filenames):
+    """Return lists of season and episode numbers for many filenames, same as parse_season_episode."""
+    seasons = []
+    episodes = []
+    for filename in filenames:
+        season, episode = _parse_season_episode_fast(filename)
+        seasons.append(season)
+        episodes.append(episode)
+    return seasons, episodes
+
+class SearchMatcher:
+    """A search term compiled once into the patterns and word sets get_file_links matches with."""
+    
+    def __init__(self, search_term):
+        self.search_term = search_term
+        self.search_term_lower = search_term.lower()
+        # Create a version with spaces replaced by dots/underscores for filename matching
+        self.search_term_filename = self.search_term_lower.replace(" ", ".")
+        self.search_term_filename2 = self.search_term_lower.replace(" ", "_")
+        # Split into words, filtering out very short words
+        self.search_words = [word.lower() for word in self.search_term_lower.split() if len(word) > 2]
+        self.single_term = len(self.search_term_lower.split()) == 1
+        self.first_letter = search_term[0].lower() if search_term else ""
+        
+        # Standalone word patterns for single-word searches
+        self.term_pattern = re.compile(rf'(^|[^a-z0-9]){re.escape(self.search_term_lower)}([^a-z0-9]|$)')
+        self.word_pattern = (re.compile(rf'(^|[^a-z0-9]){re.escape(self.search_words[0])}([^a-z0-9]|$)')
+                             if self.search_words else None)
+        
+        year_match = YEAR_PATTERN.search(self.search_term_lower)
+        self.year = year_match.group(1) if year_match else None
+        self.other_words = [w for w in self.search_words if w != self.year]
+        
+        # Every rule needs one of these substrings in the name, so a single
+        # regex search rules out most non-matching names
+        required = self.search_words or [self.search_term_lower, self.search_term_filename,
+                                         self.search_term_filename2]
+        self.required_tokens = sorted(set(required), key=len)
+        self.prefilter = re.compile("|".join(re.escape(token) for token in self.required_tokens))
+    
+    def match(self, decoded_name_lower):
+        """Return why a lowercased file name matches the search term, or None if it does not."""
+        if not self.prefilter.search(decoded_name_lower):
+            return None
+        
+        search_words = self.search_words
+        
+        # MUCH stricter matching criteria:
+        is_match = False
+        match_reason = ""
+        
+        # 1. Exact match of full search term
+        if self.search_term_lower in decoded_name_lower:
+            # For single words, make sure it's not just part of another word
+            if self.single_term:
+                # Check if the word is a standalone word or surrounded by non-alphanumeric chars
+                if self.term_pattern.search(decoded_name_lower):
+                    is_match = True
+                    match_reason = "exact word match"
+            else:
+                is_match = True
+                match_reason = "exact phrase match"
+        
+        # 2. Match with dots/underscores instead of spaces (common in filenames)
+        elif self.search_term_filename in decoded_name_lower or self.search_term_filename2 in decoded_name_lower:
+            is_match = True
+            match_reason = "filename format match"
+        
+        # 3. For multi-word searches (3+ words), require at least 75% of words to match
+        # AND the first word must be present
+        elif len(search_words) >= 3:
+            matching_words = [word for word in search_words if word in decoded_name_lower]
+            match_percentage = len(matching_words) / len(search_words)
+            
+            # First word must match and at least 75% of all words
+            if search_words[0] in decoded_name_lower and match_percentage >= 0.75:
+                is_match = True
+                match_reason = f"multi-word match ({match_percentage:.0%})"
+        
+        # 4. For 2-word searches, both words must be present
+        elif len(search_words) == 2:
+            if all(word in decoded_name_lower for word in search_words):
+                is_match = True
+                match_reason = "all words match"
+        
+        # 5. For single-word searches, word must be present as a distinct part
+        # (not just as part of another word)
+        elif len(search_words) == 1:
+            # Check if word is surrounded by non-alphanumeric chars or start/end of string
+            if self.word_pattern.search(decoded_name_lower):
+                is_match = True
+                match_reason = "single word match"
+        
+        # Special case for movies with year in search term
+        if not is_match and self.year and self.year in decoded_name_lower:
+            # If search has a year and filename has same year, check if any other word matches
+            if any(word in decoded_name_lower for word in self.other_words):
+                is_match = True
+                match_reason = "movie with year match"
+        
+        return match_reason if is_match else None
+    
+    def match_all(self, names):
+        """Return the match reason (or None) of every decoded file name in a list."""
+        prefilter = self.prefilter.search
+        match = self.match
+        reasons = []
+        for name in names:
+            name_lower = name.lower()
+            reasons.append(match(name_lower) if prefilter(name_lower) else None)
+        return reasons
+    
+    def filter(self, names):
+        """Return (name, reason) for the decoded file names in a list that match."""
+        return [(name, reason) for name, reason in zip(names, self.match_all(names)) if reason]
+    
+    def match_folder(self, href_lower):
+        """Return True if a lowercased subfolder name is worth searching for the term."""
+        # Exact match
+        if self.search_term_lower in href_lower:
+            return True
+        
+        # Filename format match
+        elif self.search_term_filename in href_lower or self.search_term_filename2 in href_lower:
+            return True
+        
+        # For multi-word searches, first word must match
+        elif len(self.search_words) > 1 and self.search_words[0] in href_lower:
+            return True
+        
+        # Single word must match as distinct part
+        elif len(self.search_words) == 1:
+            return bool(self.word_pattern.search(href_lower))
+        
+        # Season folders
+        elif SEASON_FOLDER_PATTERN.search(href_lower):
+            return True
+        
+        return False
+
+@functools.lru_cache(maxsize=64)
+def get_matcher(search_term):
+    """Return the shared compiled matcher for a search term."""
+    return SearchMatcher(search_term)
+
+def match_file_name(decoded_name_lower, search_term):
+    """Return why a lowercased file name matches the search term, or None if it does not."""
+    return get_matcher(search_term).match(decoded_name_lower)
+
+class MultiSearchMatcher:
+    """Several search terms matched against a file name in one pass.
+    
+    The required tokens of every term are combined into a single regex, so one scan of a
+    name finds the terms that could match it; only those terms' rules are then checked.
+    The alternation lists longer tokens first, so the match at each position is the
+    longest token starting there, and every other token starting there is a prefix of it.
+    """
+    
+    def __init__(self, search_terms):
+        self.matchers = {term: get_matcher(term) for term in search_terms}
+        
+        token_terms = defaultdict(set)
+        for term, matcher in self.matchers.items():
+            for token in matcher.required_tokens:
+                token_terms[token].add(term)
+        
+        # Terms of a token and of every shorter token that is a prefix of it
+        self.token_terms = {
+            token: frozenset().union(*(terms for other, terms in token_terms.items() if token.startswith(other)))
+            for token in token_terms
+        }
+        tokens = sorted(token_terms, key=len, reverse=True)
+        self.pattern = re.compile("(?=(" + "|".join(re.escape(token) for token in tokens) + "))") if tokens else None
+    
+    def candidates(self, decoded_name_lower):
+        """Return the terms whose required tokens occur in a lowercased name."""
+        if self.pattern is None:
+            return frozenset()
+        terms = set()
+        for token in set(self.pattern.findall(decoded_name_lower)):
+            terms |= self.token_terms[token]
+        return terms
+    
+    def match_all(self, names, search_terms=None):
+        """Return, for every decoded file name, a dict of the terms it matches and why."""
+        wanted = set(self.matchers) if search_terms is None else set(search_terms)
+        results = []
+        for name in names:
+            name_lower = name.lower()
+            reasons = {}
+            for term in self.candidates(name_lower) & wanted:
+                reason = self.matchers[term].match(name_lower)
+                if reason:
+                    reasons[term] = reason
+            results.append(reasons)
+        return results
+
+def media_suffixes(extensions):
+    """Return the lowercased, dotted file suffixes to look for (.mp4/.mkv/.avi by default)."""
+    # Default extensions if none provided
+    if extensions is None or not extensions:
+        extensions = [".mp4", ".mkv", ".avi"]
+    
+    # Make sure extensions have dots
+    return tuple((ext if ext.startswith('.') else f'.{ext}').lower() for ext in extensions)
+
+def get_file_links(folder_url, search_term, extensions=None, session=None, matcher=None, frontier=None):
+    """Scrape media file links from a given folder with improved movie file detection."""
+    if session is None:
+        session = get_shared_session()
+    fetch_listing = frontier.listing_fetcher(session.get_listing) if frontier else session.get_listing
+    return run_crawl_steps(file_link_steps(folder_url, search_term, extensions, matcher, frontier), fetch_listing)
+
+def file_link_steps(folder_url, search_term, extensions=None, matcher=None, frontier=None, depth=0):
+    """Step generator behind get_file_links."""
+    if frontier is not None:
+        # A folder reached again through another parent gives the same files, so
+        # the first scan's result is reused instead of walking the subtree again
+        previous = frontier.scanned(folder_url, depth=depth)
+        if previous is not None:
+            return previous
+    
+    file_links = yield from _scan_folder_steps(folder_url, search_term, extensions, matcher, frontier, depth)
+    if frontier is not None:
+        frontier.record_scan(folder_url, file_links, depth=depth)
+    return file_links
+
+def _scan_folder_steps(folder_url, search_term, extensions, matcher, frontier, depth):
+    # The compiled matcher is passed down so recursion does not rebuild it
+    if matcher is None:
+        matcher = get_matcher(search_term)
+    
+    extension_suffixes = media_suffixes(extensions)
+    
+    try:
+        print(f"Requesting URL: {folder_url}")
+        status, entries = yield folder_url, 15
+        if status != 200:
+            print(f"Failed to access {folder_url}: Status {status}")
+            return []
+        
+        file_links = []
+        processed_urls = set()  # Track URLs we've already processed
+        
+        # First, collect the direct media files in this folder
+        candidates = []
+        for entry in entries:
+            href = entry.href
+            if not href or href == "../" or href == "/":
+                continue
+                
+            # Check if the file has one of our extensions
+            if href.lower().endswith(extension_suffixes):
+                full_url = urljoin(folder_url, href)
+                
+                # Skip if we've already processed this URL
+                if full_url in processed_urls:
+                    continue
+                processed_urls.add(full_url)
+                candidates.append((full_url, unquote(href), entry))
+        
+        # Then match all of their names in one pass
+        metrics = get_run_metrics()
+        with metrics.stage("match"):
+            reasons = matcher.match_all([decoded_name for _, decoded_name, _ in candidates])
+        matched = [(full_url, decoded_name, entry, match_reason)
+                   for (full_url, decoded_name, entry), match_reason in zip(candidates, reasons) if match_reason]
+        with metrics.stage("episodes"):
+            seasons, episodes = parse_season_episode_batch([decoded_name for _, decoded_name, _, _ in matched])
+        if matched:
+            metrics.count('matched_files_total', len(matched), host=urlparse(folder_url).netloc)
+        for (full_url, decoded_name, entry, match_reason), season, episode in zip(matched, seasons, episodes):
+            file_links.append({
+                'url': full_url,
+                'name': decoded_name,
+                'season': season,
+                'episode': episode,
+                'size': entry.size,
+                'mtime': entry.mtime,
+            })
+            print(f"Found media file: {decoded_name} ({match_reason})")
+        
+        # If no direct media files found, check for subfolders (within the depth budget)
+        if not file_links and frontier is not None and not frontier.may_descend(depth):
+            print(f"Depth limit reached at {folder_url}, not checking subfolders")
+            frontier.record_depth_limit(folder_url)
+        elif not file_links:
+            print("No direct media files found, checking subfolders...")
+            
+            # Find all potential subfolders
+            subfolders = []
+            for entry in entries:
+                href = entry.href
+                if href and href.endswith("/") and href != "../" and href != "/":
+                    subfolder_url = urljoin(folder_url, href)
+                    subfolders.append((href, subfolder_url))
+            
+            # First, check folders that might contain our search terms
+            matching_subfolders = [subfolder_url for href, subfolder_url in subfolders
+                                   if matcher.match_folder(href.lower())]
+            
+            # Check matching subfolders first
+            for subfolder_url in matching_subfolders:
+                print(f"Checking subfolder: {subfolder_url}")
+                subfolder_files = yield from file_link_steps(subfolder_url, search_term, extensions, matcher,
+                                                             frontier, depth + 1)
+                file_links.extend(subfolder_files)
+            
+            # If still no files and this is a base movie directory, check specific organization patterns
+            if not file_links and "movies" in folder_url.lower():
+                print("No files found in matching subfolders. Checking movie organization folders...")
+                
+                # For movies, check alphabetical folders and year folders
+                for href, subfolder_url in subfolders:
+                    href_lower = href.lower()
+                    
+                    # Check for first letter match (alphabetical organization)
+                    if matcher.first_letter and href_lower.startswith(matcher.first_letter):
+                        print(f"Checking alphabetical folder: {subfolder_url}")
+                        subfolder_files = yield from file_link_steps(subfolder_url, search_term, extensions, matcher,
+                                                                     frontier, depth + 1)
+                        file_links.extend(subfolder_files)
+                    
+                    # Check for year folders if search term contains a year
+                    if matcher.year and matcher.year in href_lower:
+                        print(f"Checking year folder: {subfolder_url}")
+                        subfolder_files = yield from file_link_steps(subfolder_url, search_term, extensions, matcher,
+                                                                     frontier, depth + 1)
+                        file_links.extend(subfolder_files)
+        
+        return file_links
+    except Exception as e:
+        print(f"Error in get_file_links for {folder_url}: {str(e)}")
+        return []
+
+def batch_file_link_steps(folder_url, multi_matcher, search_terms, extensions=None, frontier=None, depth=0):
+    """Step generator scanning a folder for several search terms at once.
+    
+    Returns {term: files}, where each term's files are what get_file_links would find
+    for it, but the folder and every subfolder are fetched once for all the terms.
+    """
+    results = {}
+    pending = []
+    for term in search_terms:
+        previous = frontier.scanned(folder_url, term, depth) if frontier is not None else None
+        if previous is not None:
+            results[term] = previous
+        else:
+            pending.append(term)
+    
+    if pending:
+        found = yield from _batch_scan_folder_steps(folder_url, multi_matcher, pending, extensions, frontier, depth)
+        for term in pending:
+            results[term] = found[term]
+            if frontier is not None:
+                frontier.record_scan(folder_url, found[term], term, depth)
+    return results
+
+def _batch_scan_folder_steps(folder_url, multi_matcher, search_terms, extensions, frontier, depth):
+    extension_suffixes = media_suffixes(extensions)
+    
+    try:
+        print(f"Requesting URL: {folder_url}")
+        status, entries = yield folder_url, 15
+        file_links = {term: [] for term in search_terms}
+        if status != 200:
+            print(f"Failed to access {folder_url}: Status {status}")
+            return file_links
+        
+        candidates = []
+        processed_urls = set()
+        for entry in entries:
+            href = entry.href
+            if not href or href == "../" or href == "/":
+                continue
+            if href.lower().endswith(extension_suffixes):
+                full_url = urljoin(folder_url, href)
+                if full_url in processed_urls:
+                    continue
+                processed_urls.add(full_url)
+                candidates.append((full_url, unquote(href), entry))
+        
+        # One pass over the names for all terms
+        metrics = get_run_metrics()
+        with metrics.stage("match"):
+            reasons = multi_matcher.match_all([decoded_name for _, decoded_name, _ in candidates], search_terms)
+        matched = [(full_url, decoded_name, entry, term_reasons)
+                   for (full_url, decoded_name, entry), term_reasons in zip(candidates, reasons) if term_reasons]
+        with metrics.stage("episodes"):
+            seasons, episodes = parse_season_episode_batch([decoded_name for _, decoded_name, _, _ in matched])
+        if matched:
+            metrics.count('matched_files_total', sum(len(term_reasons) for *_, term_reasons in matched),
+                          host=urlparse(folder_url).netloc)
+        for (full_url, decoded_name, entry, term_reasons), season, episode in zip(matched, seasons, episodes):
+            for term in term_reasons:
+                file_links[term].append({
+                    'url': full_url,
+                    'name': decoded_name,
+                    'season': season,
+                    'episode': episode,
+                    'size': entry.size,
+                    'mtime': entry.mtime,
+                })
+            print(f"Found media file: {decoded_name} ({len(term_reasons)} terms)")
+        
+        # Terms without direct files look in subfolders, following the same rules as get_file_links
+        empty_terms = [term for term in search_terms if not file_links[term]]
+        if empty_terms and frontier is not None and not frontier.may_descend(depth):
+            print(f"Depth limit reached at {folder_url}, not checking subfolders")
+            frontier.record_depth_limit(folder_url)
+        elif empty_terms:
+            subfolders = []
+            for entry in entries:
+                href = entry.href
+                if href and href.endswith("/") and href != "../" and href != "/":
+                    subfolders.append((href, urljoin(folder_url, href)))
+            
+            # Each subfolder is scanned once for all the terms whose rules select it
+            for href, subfolder_url in subfolders:
+                subfolder_terms = [term for term in empty_terms
+                                   if multi_matcher.matchers[term].match_folder(href.lower())]
+                if subfolder_terms:
+                    print(f"Checking subfolder: {subfolder_url} ({len(subfolder_terms)} terms)")
+                    found = yield from batch_file_link_steps(subfolder_url, multi_matcher, subfolder_terms,
+                                                             extensions, frontier, depth + 1)
+                    for term, files in found.items():
+                        file_links[term].extend(files)
+            
+            still_empty = [term for term in empty_terms if not file_links[term]]
+            if still_empty and "movies" in folder_url.lower():
+                for href, subfolder_url in subfolders:
+                    href_lower = href.lower()
+                    matchers = [(term, multi_matcher.matchers[term]) for term in still_empty]
+                    letter_terms = [term for term, matcher in matchers
+                                    if matcher.first_letter and href_lower.startswith(matcher.first_letter)]
+                    year_terms = [term for term, matcher in matchers if matcher.year and matcher.year in href_lower]
+                    for subfolder_terms in (letter_terms, year_terms):
+                        if not subfolder_terms:
+                            continue
+                        print(f"Checking movie folder: {subfolder_url} ({len(subfolder_terms)} terms)")
+                        found = yield from batch_file_link_steps(subfolder_url, multi_matcher, subfolder_terms,
+                                                                 extensions, frontier, depth + 1)
+                        for term, files in found.items():
+                            file_links[term].extend(files)
+        
+        return file_links
+    except Exception as e:
+        print(f"Error in batch scan of {folder_url}: {str(e)}")
+        return {term: [] for term in search_terms}
+
+def scan_folders(folders, search_term, extensions=None, max_workers=DEFAULT_MAX_WORKERS, session=None,
+                 frontier=None):
+    """Scan folders for media files in parallel, yielding (index, folder, files) in folder order.
+    
+    With a frontier, folders are submitted most promising first (see folder_priority) and
+    share its visited set and budgets with the folder search that produced them. How many
+    requests each host gets at once is up to the session's HostLimiter.
+    """
+    load_asyncio()
+    # Compile the search term once for every folder of the crawl
+    matcher = get_matcher(search_term)
+    
+    def scan(folder):
+        return get_file_links(folder, search_term, extensions, session, matcher, frontier)
+    
+    order = range(len(folders))
+    if frontier is not None:
+        order = sorted(order, key=lambda i: folder_priority(folders[i], matcher))
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        futures = [None] * len(folders)
+        for i in order:
+            futures[i] = executor.submit(scan, folders[i])
+        # Results are handed back as soon as the next folder in order is done,
+        # so callers see a deterministic order while later folders keep scanning
+        for i, (folder, future) in enumerate(zip(folders, futures)):
+            yield i, folder, future.result()
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        # Stop the scans still running too instead of waiting for them below
+        if frontier is not None:
+            frontier.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def batch_search(base_url, search_terms, extensions=None, max_workers=DEFAULT_MAX_WORKERS, session=None,
+                 frontier=None, progress=None):
+    """Search one category for many terms in a single crawl and return {term: files}.
+    
+    Every term finds its folders the way get_folders_recursive does, then each folder
+    is scanned once for all the terms that selected it. Listings are shared through
+    one frontier, so a directory is fetched at most once for the whole batch.
+    Each term's files are deduplicated by URL. progress(done, total, folder) is
+    called after every folder.
+    """
+    if session is None:
+        session = get_shared_session()
+    if frontier is None:
+        frontier = CrawlFrontier()
+    search_terms = list(dict.fromkeys(term for term in search_terms if term))
+    multi_matcher = MultiSearchMatcher(search_terms)
+    fetch_listing = frontier.listing_fetcher(session.get_listing)
+    
+    # Step 1: every term's candidate folders, merged; the base listing is fetched once
+    folder_terms = {}
+    for term in search_terms:
+        for folder in run_crawl_steps(folder_search_steps(base_url, term), fetch_listing):
+            folder_terms.setdefault(normalize_url(folder), (folder, []))[1].append(term)
+    folders = list(folder_terms.values())
+    print(f"Found {len(folders)} folders for {len(search_terms)} search terms")
+    
+    # Step 2: scan each folder once for its terms, in parallel like scan_folders
+    def scan(folder, terms):
+        return run_crawl_steps(batch_file_link_steps(folder, multi_matcher, terms, extensions, frontier),
+                               fetch_listing)
+    
+    def priority(i):
+        folder, terms = folders[i]
+        return min(folder_priority(folder, multi_matcher.matchers[term]) for term in terms)
+    
+    results = {term: [] for term in search_terms}
+    seen = {term: set() for term in search_terms}
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        futures = [None] * len(folders)
+        for i in sorted(range(len(folders)), key=priority):
+            futures[i] = executor.submit(scan, *folders[i])
+        for i, ((folder, _), future) in enumerate(zip(folders, futures)):
+            for term, files in future.result().items():
+                for file_info in files:
+                    if file_info['url'] not in seen[term]:
+                        seen[term].add(file_info['url'])
+                        results[term].append(file_info)
+            if progress:
+                progress(i + 1, len(folders), folder)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return results
+
+def parse_category(option):
+    """Split a saved "Name- URL" category into (name, url)."""
+    if "- " in option:
+        name, url = option.split("- ", 1)
+        return name.strip(), url.strip()
+    return "", option.strip()
+
+def federated_search(categories, search_term, extensions=None, max_workers=DEFAULT_MAX_WORKERS, session=None,
+                     max_depth=DEFAULT_MAX_DEPTH, max_folders=DEFAULT_MAX_FOLDERS, stop=None):
+    """Search several categories at once, yielding (category_name, file_info) as files arrive.
+    
+    Every (name, url) category is searched in its own thread with its own frontier.
+    Requests of all categories go through the session's HostLimiter, so a server that
+    hosts several of them is not sent more at once than it handles. A file is yielded once:
+    later copies with the same normalized URL, or the same decoded name and size
+    on another mirror, are not yielded again but listed in the first copy's 'mirrors'
+    (see select_mirrors). Setting the stop event ends the search early.
+    """
+    if session is None:
+        session = get_shared_session()
+    if stop is None:
+        stop = threading.Event()
+    # Set when the caller stops consuming, so category threads wind down too
+    closing = threading.Event()
+    results = queue.Queue()
+    done = object()
+    
+    def search_category(name, url):
+        try:
+            frontier = CrawlFrontier(max_depth, max_folders)
+            folders = get_folders_recursive(url, search_term, session, frontier)
+            print(f"{name or url}: found {len(folders)} folders")
+            for _, _, files in scan_folders(folders, search_term, extensions, max_workers, session, frontier):
+                if stop.is_set() or closing.is_set():
+                    break
+                results.put((name, files))
+        except Exception as e:
+            print(f"Error searching {name or url}: {str(e)}")
+        finally:
+            results.put((name, done))
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, len(categories)))
+    try:
+        for name, url in categories:
+            executor.submit(search_category, name, url)
+        
+        seen_urls = set()
+        seen_copies = {}
+        remaining = len(categories)
+        while remaining and not stop.is_set():
+            name, files = results.get()
+            if files is done:
+                remaining -= 1
+                continue
+            for file_info in files:
+                url_key = normalize_url(file_info['url'])
+                copy_key = (file_info['name'].lower(), file_info.get('size'))
+                if url_key in seen_urls:
+                    continue
+                seen_urls.add(url_key)
+                if copy_key[1] is not None:
+                    first_copy = seen_copies.get(copy_key)
+                    if first_copy is not None:
+                        first_copy.setdefault('mirrors', []).append(file_info['url'])
+                        continue
+                    seen_copies[copy_key] = file_info
+                yield name, file_info
+    finally:
+        closing.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def probe_host(url, session=None, health=None, sample_bytes=MIRROR_SAMPLE_BYTES, timeout=MIRROR_PROBE_TIMEOUT):
+    """Measure a host's latency (HEAD) and throughput (a small Range GET) using one of its files.
+    
+    Results go into the host health record; returns True if the host answered.
+    """
+    if session is None:
+        session = get_shared_session()
+    if health is None:
+        health = session.health
+    host = urlparse(url).netloc
+    try:
+        with session.get(url, timeout, method="HEAD"):
+            pass
+        started = time.perf_counter()
+        received = 0
+        with session.get(url, timeout, headers={'Range': f"bytes=0-{sample_bytes - 1}"}, stream=True) as response:
+            if response.status_code not in (200, 206):
+                return False
+            for chunk in response.iter_content(LISTING_CHUNK_SIZE):
+                received += len(chunk)
+                if received >= sample_bytes:
+                    break
+        elapsed = time.perf_counter() - started
+        if received and elapsed > 0:
+            health.record_throughput(host, received / elapsed)
+        return True
+    except Exception as e:
+        print(f"Mirror probe of {host} failed: {str(e)}")
+        return False
+
+def select_mirrors(file_info_list, session=None, health=None, probe=True, max_age=HEALTH_COOLDOWN):
+    """Point every entry at its fastest healthy copy and return how many entries changed.
+    
+    Candidates are an entry's url plus its 'mirrors'. Unless probe is False, every host
+    among them not probed in the last max_age seconds is probed once (in parallel).
+    Afterwards url is the best scoring copy and 'mirrors' the others, best first.
+    """
+    if session is None:
+        session = get_shared_session()
+    if health is None:
+        health = session.health
+    
+    if probe:
+        samples = {}
+        for file_info in file_info_list:
+            for url in [file_info['url']] + file_info.get('mirrors', []):
+                host = urlparse(url).netloc
+                probed_at = health.probed_at(host)
+                if host not in samples and (probed_at is None or time.time() - probed_at > max_age):
+                    samples[host] = url
+        if samples:
+            with ThreadPoolExecutor(max_workers=min(DEFAULT_MAX_WORKERS, len(samples))) as executor:
+                list(executor.map(lambda url: probe_host(url, session, health), samples.values()))
+    
+    changed = 0
+    for file_info in file_info_list:
+        mirrors = file_info.get('mirrors')
+        if not mirrors:
+            continue
+        candidates = [file_info['url']] + mirrors
+        # sorted() is stable, so equal scores keep the discovery order
+        ranked = sorted(candidates, key=lambda url: health.score(urlparse(url).netloc))
+        if ranked[0] != file_info['url']:
+            changed += 1
+        file_info['url'] = ranked[0]
+        file_info['mirrors'] = ranked[1:]
+    return changed
+
+def read_search_terms(source):
+    """Read one search term per line from a file, or from stdin if source is "-".
+    
+    Blank lines and lines starting with # are skipped.
+    """
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+
+class AsyncCrawler:
+    """Asyncio crawl engine that fetches listings concurrently without blocking on requests.
+    
+    Runs the same step generators as get_folders_recursive and get_file_links, so it finds
+    the same folders and files, but every listing is fetched by a small HTTP/1.1 client on
+    an event loop, under a global concurrency limit and the host limiter's per-host slots.
+    cancel() can be called from any thread and aborts in-flight requests.
+    """
+    
+    def __init__(self, max_concurrency=DEFAULT_MAX_WORKERS, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 cache=None, health=None, timeout=None, metrics=None, limiter=None):
+        load_asyncio()
+        self.health = health if health is not None else get_host_health()
+        self.metrics = metrics if metrics is not None else get_run_metrics()
+        self.limiter = limiter if limiter is not None else get_host_limiter()
+        self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+        
+        self.request_count = 0
+        self.error_count = 0
+        self.connection_count = 0
+        self.reused_count = 0
+        self.cache_hits = 0
+        self.cache_revalidated = 0
+        self.cache_misses = 0
+        self.parse_count = 0
+        self.parse_seconds = 0.0
+        
+        self.cancelled = False
+        self._loop = None
+        self._task = None
+        self._limit = None
+        self._idle = defaultdict(list)
+        self._open_writers = set()
+    
+    def search(self, base_url, search_term, extensions=None, on_folders=None, on_result=None, frontier=None,
+               folders=None):
+        """Find folders and then files like get_folders_recursive + scan_folders.
+        
+        Blocks until done. on_folders(folders) is called once the folder list is known, and
+        on_result(index, folder, files) for every folder in order, as soon as it is scanned.
+        A frontier deduplicates listings across both phases and applies its budgets. A known
+        folder list (from a SearchCheckpoint) skips the folder search.
+        Returns the list of (index, folder, files); raises asyncio.CancelledError if cancelled.
+        """
+        return asyncio.run(self._run(self._search(base_url, search_term, extensions, on_folders, on_result,
+                                                  frontier, folders)))
+    
+    def cancel(self):
+        """Stop the running search and abort its requests (thread-safe)."""
+        self.cancelled = True
+        if self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+    
+    async def _run(self, coro):
+        self._loop = asyncio.get_running_loop()
+        self._limit = asyncio.Semaphore(self.max_concurrency)
+        self._task = asyncio.current_task()
+        try:
+            if self.cancelled:
+                raise asyncio.CancelledError()
+            return await coro
+        finally:
+            # Closing the sockets is what actually stops in-flight downloads
+            for writer in list(self._open_writers):
+                writer.close()
+            self._open_writers.clear()
+            self._idle.clear()
+            self._loop = None
+            self._task = None
+    
+    async def _search(self, base_url, search_term, extensions, on_folders, on_result, frontier, folders=None):
+        fetch_listing = self.fetch_listing
+        if frontier is not None:
+            fetch_listing = functools.partial(frontier.fetch_listing_async, self.fetch_listing)
+        
+        if folders is None:
+            folders = await self.run_steps(folder_search_steps(base_url, search_term), fetch_listing)
+        if on_folders:
+            on_folders(folders)
+        
+        matcher = get_matcher(search_term)
+        order = range(len(folders))
+        if frontier is not None:
+            # Tasks start in creation order, so the most promising folders are requested first
+            order = sorted(order, key=lambda i: folder_priority(folders[i], matcher))
+        tasks = [None] * len(folders)
+        for i in order:
+            steps = file_link_steps(folders[i], search_term, extensions, matcher, frontier)
+            tasks[i] = asyncio.ensure_future(self.run_steps(steps, fetch_listing))
+        results = []
+        try:
+            # Hand results back in folder order while later folders are still being fetched
+            for i, (folder, task) in enumerate(zip(folders, tasks)):
+                files = await task
+                results.append((i, folder, files))
+                if on_result:
+                    on_result(i, folder, files)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return results
+    
+    async def run_steps(self, steps, fetch_listing=None):
+        """Async counterpart of run_crawl_steps."""
+        if fetch_listing is None:
+            fetch_listing = self.fetch_listing
+        try:
+            request = next(steps)
+            while True:
+                try:
+                    result = await fetch_listing(*request)
+                except asyncio.CancelledError:
+                    steps.close()
+                    raise
+                except Exception as e:
+                    request = steps.throw(e)
+                else:
+                    request = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+    
+    async def fetch_listing(self, url, timeout):
+        """Return (status_code, entries) for a directory URL, like CrawlSession.get_listing."""
+        timeout = self.timeout or self.limiter.timeout_for(urlparse(url).netloc, timeout)
+        with self.metrics.stage("cache"):
+            cached = self.cache.get(url) if self.cache else None
+        if cached and (cached['fresh'] or self.cache.offline):
+            self._count_cache(url, 'hit')
+            return 200, cached['entries']
+        if self.cache and self.cache.offline:
+            self._count_cache(url, 'miss')
+            return 504, []
+        
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        
+        async with self._limit:
+            status, response_headers, entries = await self._fetch_with_retries(url, timeout, headers)
+        
+        if cached and status == 304:
+            self._count_cache(url, 'revalidated')
+            self.cache.mark_revalidated(url)
+            return 200, cached['entries']
+        if status != 200:
+            return status, []
+        
+        if self.cache:
+            self._count_cache(url, 'miss')
+            with self.metrics.stage("cache"):
+                self.cache.put(url, entries, response_headers.get('etag'), response_headers.get('last-modified'))
+        return 200, entries
+    
+    def _count_cache(self, url, result):
+        # Only touched from the event loop thread, so no lock
+        attr = CACHE_RESULT_COUNTERS[result]
+        setattr(self, attr, getattr(self, attr) + 1)
+        self.metrics.count('listing_cache_total', host=urlparse(url).netloc, result=result)
+    
+    async def _fetch_with_retries(self, url, timeout, headers):
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            if self.health.is_down(host):
+                self.error_count += 1
+                raise HostUnavailable(f"{host} is not responding, skipping {url}")
+            # The slot is held for the whole attempt, body included
+            await self.limiter.acquire_async(host)
+            self.request_count += 1
+            started = time.perf_counter()
+            retry_after = None
+            try:
+                status, response_headers, entries = await self._fetch(url, timeout, headers)
+                if status in THROTTLE_STATUSES:
+                    # A host asking us to slow down is up; throttling is left to the limiter
+                    retry_after = parse_retry_after(response_headers.get('retry-after'))
+                    self.metrics.count('throttled_responses_total', host=host)
+                else:
+                    self.health.record(host, time.perf_counter() - started, ok=status < 500)
+                if status not in RETRY_STATUSES or attempt >= self.retries:
+                    return status, response_headers, entries
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                self.error_count += 1
+                self.health.record(host, ok=False, timeout=timed_out)
+                self.limiter.record_failure(host, timeout if timed_out else None)
+                self.metrics.record_request(host, ok=False)
+                if attempt >= self.retries:
+                    raise
+            finally:
+                self.limiter.release(host)
+            await asyncio.sleep(min(retry_after, ADAPTIVE_MAX_RETRY_AFTER) if retry_after is not None
+                                else self.backoff * (2 ** attempt))
+            attempt += 1
+    
+    async def _fetch(self, url, timeout, headers):
+        # Follow redirects the way requests does (e.g. a folder URL missing its slash)
+        for _ in range(ASYNC_MAX_REDIRECTS + 1):
+            status, response_headers, entries = await self._fetch_once(url, timeout, headers)
+            location = response_headers.get('location')
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            return status, response_headers, entries
+        raise ValueError(f"Too many redirects for {url}")
+    
+    async def _connect(self, scheme, host, port, timeout):
+        key = (scheme, host, port)
+        while self._idle[key]:
+            reader, writer = self._idle[key].pop()
+            if not writer.is_closing() and not reader.at_eof():
+                self.reused_count += 1
+                return key, reader, writer, True
+            writer.close()
+            self._open_writers.discard(writer)
+        
+        # Name lookup, TCP connect and TLS handshake one after another, so each is timed
+        loop = asyncio.get_running_loop()
+        with self.metrics.stage("dns"):
+            addresses = await asyncio.wait_for(
+                loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), timeout
+            )
+        if not addresses:
+            raise OSError(f"cannot resolve {host}")
+        with self.metrics.stage("connect"):
+            for i, (family, _, _, _, address) in enumerate(addresses):
+                try:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(address[0], address[1], family=family), timeout
+                    )
+                    break
+                except OSError:
+                    if i == len(addresses) - 1:
+                        raise
+        if scheme == "https":
+            import ssl
+            with self.metrics.stage("tls"):
+                try:
+                    await asyncio.wait_for(
+                        writer.start_tls(ssl.create_default_context(), server_hostname=host), timeout
+                    )
+                except BaseException:
+                    writer.close()
+                    raise
+        self.connection_count += 1
+        self._open_writers.add(writer)
+        return key, reader, writer, False
+    
+    async def _fetch_once(self, url, timeout, headers):
+        parts = urlparse(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        
+        started = time.perf_counter()
+        key, reader, writer, reused = await self._connect(scheme, parts.hostname, port, timeout)
+        keep_alive = False
+        try:
+            sent = time.perf_counter()
+            request_headers = {
+                'Host': parts.netloc,
+                'User-Agent': ASYNC_USER_AGENT,
+                'Accept-Encoding': 'gzip, deflate',
+                'Accept': '*/*',
+                'Connection': 'keep-alive',
+            }
+            request_headers.update(headers)
+            request = f"GET {path} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in request_headers.items())
+            writer.write((request + "\r\n").encode("latin-1"))
+            await asyncio.wait_for(writer.drain(), timeout)
+            
+            status_line = await asyncio.wait_for(reader.readline(), timeout)
+            if not status_line and reused:
+                # The server closed an idle keep-alive connection; retry on a fresh one
+                writer.close()
+                self._open_writers.discard(writer)
+                return await self._fetch_once(url, timeout, headers)
+            status = int(status_line.split()[1])
+            
+            response_headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                response_headers[name.strip().lower()] = value.strip()
+            headers_at = time.perf_counter()
+            self.limiter.record(parts.netloc, headers_at - started, status,
+                                parse_retry_after(response_headers.get('retry-after')))
+            self.metrics.add("fetch", headers_at - sent)
+            self.metrics.record_request(parts.netloc, headers_at - started, ok=status < 500)
+            
+            entries = []
+            body = self._count_bytes(parts.netloc, self._read_body(reader, status, response_headers, timeout))
+            if status == 200:
+                entries = await self._parse_body(body, response_headers, parts.netloc)
+            else:
+                async for _ in body:
+                    pass
+            
+            connection = response_headers.get('connection', '').lower()
+            persistent = connection == 'keep-alive' if status_line.startswith(b"HTTP/1.0") else connection != 'close'
+            keep_alive = (persistent
+                          and ('content-length' in response_headers
+                               or 'chunked' in response_headers.get('transfer-encoding', '').lower()
+                               or status in (204, 304)))
+            return status, response_headers, entries
+        finally:
+            if keep_alive:
+                self._idle[key].append((reader, writer))
+            else:
+                writer.close()
+                self._open_writers.discard(writer)
+    
+    async def _count_bytes(self, host, body):
+        async for chunk in body:
+            self.metrics.record_bytes(host, len(chunk))
+            yield chunk
+    
+    async def _read_body(self, reader, status, response_headers, timeout):
+        if status in (204, 304) or 100 <= status < 200:
+            return
+        
+        if 'chunked' in response_headers.get('transfer-encoding', '').lower():
+            while True:
+                size_line = await asyncio.wait_for(reader.readline(), timeout)
+                size = int(size_line.split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    # Skip trailers up to the blank line that ends the message
+                    while (await asyncio.wait_for(reader.readline(), timeout)) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                yield await asyncio.wait_for(reader.readexactly(size), timeout)
+                await asyncio.wait_for(reader.readexactly(2), timeout)
+        elif 'content-length' in response_headers:
+            remaining = int(response_headers['content-length'])
+            while remaining > 0:
+                chunk = await asyncio.wait_for(reader.read(min(remaining, LISTING_CHUNK_SIZE)), timeout)
+                if not chunk:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                remaining -= len(chunk)
+                yield chunk
+        else:
+            while True:
+                chunk = await asyncio.wait_for(reader.read(LISTING_CHUNK_SIZE), timeout)
+                if not chunk:
+                    return
+                yield chunk
+    
+    async def _parse_body(self, body, response_headers, host):
+        encoding = response_headers.get('content-encoding', '').lower()
+        if encoding == 'gzip':
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            decompressor = zlib.decompressobj()
+        else:
+            decompressor = None
+        
+        # Same charset choice as requests: the declared one, else ISO-8859-1 for text/*
+        content_type = response_headers.get('content-type', '')
+        charset_match = re.search(r'charset=["\']?([\w.:-]+)', content_type, re.IGNORECASE)
+        if charset_match:
+            charset = charset_match.group(1)
+        elif content_type.lower().startswith("text/"):
+            charset = "ISO-8859-1"
+        else:
+            charset = "utf-8"
+        try:
+            decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        
+        parser = StreamingListingParser()
+        entries = []
+        started = time.perf_counter()
+        async for chunk in body:
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+            entries.extend(parser.feed_chunk(decoder.decode(chunk)))
+        tail = decompressor.flush() if decompressor else b""
+        entries.extend(parser.feed_chunk(decoder.decode(tail, final=True)))
+        entries.extend(parser.finish())
+        
+        self.parse_count += 1
+        self.parse_seconds += parser.parse_seconds
+        self.metrics.record_listing(host, time.perf_counter() - started - parser.parse_seconds, parser.parse_seconds)
+        return entries
+    
+    def report(self):
+        """Return a one-line summary of requests, connection reuse and parsing."""
+        summary = (f"{self.request_count} listing requests over {self.connection_count} connections "
+                   f"({self.reused_count} reused, {self.error_count} errors)")
+        if self.parse_count:
+            summary += f"; parsed {self.parse_count} listings in {self.parse_seconds:.2f}s"
+        if self.cache:
+            summary += (f"; cache: {self.cache_hits} hits, {self.cache_revalidated} revalidated, "
+                        f"{self.cache_misses} misses")
+        return summary
+
+def m3u_title(playlist_name, file_info):
+    """Return the #EXTINF title of a playlist entry."""
+    name, ext = os.path.splitext(file_info['name'])
+    if file_info['season'] is not None and file_info['episode'] is not None:
+        # Just use a simple standardized format instead of trying to clean the title
+        display_name = f"{playlist_name} - S{file_info['season']:02d}E{file_info['episode']:02d}"
+    else:
+        # For movie files, use the filename with dots/underscores turned into spaces
+        display_name = name.replace(".", " ").replace("_", " ")
+    
+    # Add file extension and, once the media header was read, the resolution to display name
+    tags = [ext[1:].upper()] if ext else []
+    resolution = resolution_label(file_info.get('width'), file_info.get('height'))
+    if resolution:
+        tags.append(resolution)
+    if tags:
+        display_name += f" [{' '.join(tags)}]"
+    return display_name
+
+# Video widths and heights of the usual resolution names, so letterboxed
+# (1920x800) and portrait videos still get the name of their class
+RESOLUTION_CLASSES = [("2160p", 3800, 2100), ("1440p", 2500, 1400), ("1080p", 1900, 1000),
+                      ("720p", 1260, 700), ("576p", 1000, 560), ("480p", 700, 460)]
+
+def resolution_label(width, height):
+    """Return a name like "1080p" for a video size, or None if the size is unknown."""
+    if not width or not height:
+        return None
+    for label, min_width, min_height in RESOLUTION_CLASSES:
+        if width >= min_width or height >= min_height:
+            return label
+    return f"{height}p"
+
+def m3u_entry(playlist_name, file_info, fallbacks=False):
+    """Return the lines of one playlist entry.
+    
+    With fallbacks, the entry's other mirrors are listed as #EXTALT lines before its URL;
+    players that do not know the tag skip them. The #EXTINF length is the probed duration
+    in seconds (see ftp_m3u_metadata), or -1 if it is not known.
+    """
+    duration = file_info.get('duration')
+    lines = f"#EXTINF:{round(duration) if duration else -1},{m3u_title(playlist_name, file_info)}\n"
+    if fallbacks:
+        lines += "".join(f"#EXTALT:{url}\n" for url in file_info.get('mirrors', []))
+    return lines + f"{file_info['url']}\n"
+
+def create_m3u(playlist_name, file_info_list, save_dir, fallbacks=False):
+    """Generate an M3U playlist from file links, organized by season and episode."""
+    if not file_info_list:
+        print("No matching files found.")
+        return
+    
+    os.makedirs(save_dir, exist_ok=True)
+    file_path = os.path.join(save_dir, f"{playlist_name}.m3u")
+    
+    with open(file_path, "w", encoding="utf-8") as f:
+        write_m3u(f, playlist_name, file_info_list, fallbacks)
+    
+    print(f"Playlist saved at: {file_path}")
+    return file_path
+
+def write_m3u(f, playlist_name, file_info_list, fallbacks=False):
+    """Write an M3U playlist to an open text file, organized by season and episode."""
+    metrics = get_run_metrics()
+    with metrics.stage("write"):
+        _write_m3u(f, playlist_name, file_info_list, fallbacks)
+    count_playlist(metrics, Counter(url_host(file_info['url']) for file_info in file_info_list))
+
+def url_host(url):
+    # Entry URLs are absolute, so the host is the third "/"-separated part (cheaper than urlparse)
+    return url.split("/", 3)[2]
+
+def count_playlist(metrics, entries_per_host):
+    """Count a written playlist and its entries per host in the Prometheus counters."""
+    metrics.count('playlists_written_total')
+    for host, entries in entries_per_host.items():
+        metrics.count('playlist_entries_total', entries, host=host)
+
+def _write_m3u(f, playlist_name, file_info_list, fallbacks):
+    # Organize files by season and episode
+    organized_files = defaultdict(list)
+    movie_files = []
+    
+    for file_info in file_info_list:
+        if file_info['season'] is not None and file_info['episode'] is not None:
+            organized_files[(file_info['season'], file_info['episode'])].append(file_info)
+        else:
+            movie_files.append(file_info)
+    
+    f.write("#EXTM3U\n")
+    
+    # Write organized files first, sorted by season and episode
+    if organized_files:
+        f.write("\n# TV Series Episodes\n")
+        for season_episode in sorted(organized_files.keys()):
+            for file_info in organized_files[season_episode]:
+                f.write(m3u_entry(playlist_name, file_info, fallbacks))
+    
+    # Write movie files
+    if movie_files:
+        f.write("\n# Movies\n")
+        for file_info in movie_files:
+            f.write(m3u_entry(playlist_name, file_info, fallbacks))
+
+class StreamingPlaylistWriter:
+    """M3U playlist written entry by entry while a crawl is still running.
+    
+    Entries are appended to the playlist file as soon as they are added, in discovery
+    order, so a player can open it straight away. finalize() then rewrites the file in
+    create_m3u's order (episodes by season and episode, then movies) and swaps it in with
+    an atomic rename. Sorting is done in runs of run_size entries spilled to temporary
+    files and merged, so memory use does not grow with the number of entries.
+    """
+    
+    def __init__(self, playlist_name, save_dir, run_size=PLAYLIST_RUN_SIZE):
+        self.playlist_name = playlist_name
+        self.save_dir = save_dir
+        self.run_size = max(1, run_size)
+        self.count = 0
+        
+        os.makedirs(save_dir, exist_ok=True)
+        self.file_path = os.path.join(save_dir, f"{playlist_name}.m3u")
+        self._file = open(self.file_path, "w", encoding="utf-8")
+        self._file.write("#EXTM3U\n")
+        self._file.flush()
+        
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._runs = []
+    
+    def add_files(self, file_info_list):
+        """Append entries to the playlist file and flush them so readers see them."""
+        with self._lock, get_run_metrics().stage("write"):
+            for file_info in file_info_list:
+                title = m3u_title(self.playlist_name, file_info)
+                self._file.write(f"#EXTINF:-1,{title}\n{file_info['url']}\n")
+                
+                # Episodes sort before movies; the counter keeps discovery order within a key
+                if file_info['season'] is not None and file_info['episode'] is not None:
+                    key = [0, file_info['season'], file_info['episode'], self.count]
+                else:
+                    key = [1, 0, 0, self.count]
+                self._buffer.append(key + [title, file_info['url']])
+                self.count += 1
+                if len(self._buffer) >= self.run_size:
+                    self._spill()
+            self._file.flush()
+    
+    def _spill(self):
+        # Write the buffered entries, sorted, to a temporary run file
+        self._buffer.sort(key=lambda record: record[:4])
+        run = tempfile.TemporaryFile("w+", encoding="utf-8")
+        for record in self._buffer:
+            run.write(json.dumps(record) + "\n")
+        run.seek(0)
+        self._runs.append(run)
+        self._buffer = []
+    
+    def finalize(self):
+        """Rewrite the playlist in season/episode order and return its path (None if empty)."""
+        with self._lock, get_run_metrics().stage("write"):
+            self._file.close()
+            if not self.count:
+                os.remove(self.file_path)
+                print("No matching files found.")
+                return None
+            
+            self._buffer.sort(key=lambda record: record[:4])
+            sources = [(json.loads(line) for line in run) for run in self._runs] + [iter(self._buffer)]
+            fd, temp_path = tempfile.mkstemp(prefix=".playlist-", suffix=".m3u", dir=self.save_dir)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write("#EXTM3U\n")
+                    section = None
+                    entries_per_host = Counter()
+                    for group, _, _, _, title, url in heapq.merge(*sources, key=lambda record: record[:4]):
+                        if group != section:
+                            section = group
+                            f.write("\n# TV Series Episodes\n" if group == 0 else "\n# Movies\n")
+                        f.write(f"#EXTINF:-1,{title}\n{url}\n")
+                        entries_per_host[url_host(url)] += 1
+                os.replace(temp_path, self.file_path)
+                count_playlist(get_run_metrics(), entries_per_host)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            finally:
+                for run in self._runs:
+                    run.close()
+                self._runs = []
+                self._buffer = []
+        
+        print(f"Playlist saved at: {self.file_path}")
+        return self.file_path
+    
+    def abort(self):
+        """Stop writing, keeping the entries streamed so far in discovery order."""
+        with self._lock:
+            self._file.close()
+            for run in self._runs:
+                run.close()
+            self._runs = []
+            self._buffer = []
+
+def listing_hash(entries):
+    """Return a fingerprint of a listing for servers without ETag/Last-Modified support."""
+    digest = hashlib.sha1()
+    for entry in entries:
+        digest.update(f"{entry.href}\t{entry.size}\t{entry.mtime}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def normalize_title(name):
+    """Return the bare, lowercased title of a file name or search term.
+    
+    Accents are folded, bracketed tags and punctuation dropped and everything from
+    the first episode marker, year or release tag on is cut, so
+    "The.Matrix.1999.1080p.BluRay.x264-GRP.mkv" becomes "the matrix".
+    """
+    root, ext = os.path.splitext(name)
+    if ext.lower() in MEDIA_EXTENSIONS:
+        name = root
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char)).lower()
+    name = " ".join(re.sub(r'[\W_]+', " ", BRACKETED_PATTERN.sub(" ", name)).split())
+    for match in RELEASE_TAG_PATTERN.finditer(name):
+        if match.start() > 0:
+            return name[:match.start()].strip()
+    return name
+
+def title_trigrams(title):
+    """Return the set of trigrams of a normalized title, each word padded like "  word "."""
+    grams = set()
+    for word in title.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class CategoryIndex:
+    """Local SQLite index of every media file under one or more category URLs.
+    
+    Besides the files, the index keeps every distinct normalized title with an
+    inverted trigram index over them for fuzzy_search.
+    """
+    
+    def __init__(self, path=None):
+        import sqlite3
+        self.path = path or os.path.join(get_app_data_dir(), "category_index.sqlite3")
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "id INTEGER PRIMARY KEY, category TEXT NOT NULL, url TEXT NOT NULL UNIQUE, name TEXT NOT NULL, "
+            "season INTEGER, episode INTEGER, size INTEGER, mtime INTEGER, folder TEXT)"
+        )
+        # Indexes created before incremental refresh did not record each file's folder
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(files)")]
+        if "folder" not in columns:
+            self._conn.execute("ALTER TABLE files ADD COLUMN folder TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_category ON files (category)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_folder ON files (folder)")
+        
+        # Validators of every indexed folder, so a refresh can skip unchanged ones
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            "url TEXT PRIMARY KEY, category TEXT NOT NULL, parent TEXT, etag TEXT, last_modified TEXT, "
+            "listing_hash TEXT, mtime INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints (category TEXT PRIMARY KEY, state TEXT NOT NULL)"
+        )
+        
+        # Distinct titles of the files and their trigrams, so a fuzzy search only reads
+        # the posting lists of its own trigrams
+        if "title_id" not in columns:
+            self._conn.execute("ALTER TABLE files ADD COLUMN title_id INTEGER")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_title ON files (title_id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS titles (id INTEGER PRIMARY KEY, title TEXT NOT NULL UNIQUE, "
+            "gram_count INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS title_grams (gram TEXT NOT NULL, title_id INTEGER NOT NULL, "
+            "PRIMARY KEY (gram, title_id)) WITHOUT ROWID"
+        )
+        
+        # Trigram full-text search finds substrings, which is what the match rules test for
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(name, tokenize='trigram')"
+            )
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        if self.has_fts and self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            # Refreshes before version 1 left the search rows of replaced files behind
+            self._conn.execute("DELETE FROM files_fts WHERE rowid NOT IN (SELECT id FROM files)")
+            self._conn.execute("PRAGMA user_version = 1")
+        self._conn.commit()
+        self._add_missing_titles()
+    
+    def _title_id(self, name):
+        # Return the id of a file name's title, adding the title and its trigrams if new
+        title = normalize_title(name)
+        row = self._conn.execute("SELECT id FROM titles WHERE title = ?", (title,)).fetchone()
+        if row:
+            return row[0]
+        grams = title_trigrams(title)
+        cursor = self._conn.execute("INSERT INTO titles (title, gram_count) VALUES (?, ?)", (title, len(grams)))
+        self._conn.executemany("INSERT INTO title_grams VALUES (?, ?)",
+                               [(gram, cursor.lastrowid) for gram in grams])
+        return cursor.lastrowid
+    
+    def _add_missing_titles(self):
+        # Files indexed before titles were kept get theirs once
+        with self._lock:
+            rows = self._conn.execute("SELECT id, name FROM files WHERE title_id IS NULL").fetchall()
+            for file_id, name in rows:
+                self._conn.execute("UPDATE files SET title_id = ? WHERE id = ?", (self._title_id(name), file_id))
+            self._conn.commit()
+    
+    def prune_titles(self):
+        """Forget titles no indexed file has any more."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM title_grams WHERE title_id NOT IN (SELECT title_id FROM files WHERE title_id IS NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM titles WHERE id NOT IN (SELECT title_id FROM files WHERE title_id IS NOT NULL)")
+            self._conn.commit()
+    
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+    
+    def add_file(self, category, folder, file_info):
+        with self._lock:
+            if self.has_fts:
+                # REPLACE gives a known URL a new id, so its old search row goes first
+                self._conn.execute("DELETE FROM files_fts WHERE rowid IN (SELECT id FROM files WHERE url = ?)",
+                                   (file_info['url'],))
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO files (category, url, name, season, episode, size, mtime, folder, title_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (category, file_info['url'], file_info['name'], file_info['season'], file_info['episode'],
+                 file_info['size'], file_info['mtime'], folder, self._title_id(file_info['name'])),
+            )
+            if self.has_fts:
+                self._conn.execute("INSERT INTO files_fts (rowid, name) VALUES (?, ?)",
+                                   (cursor.lastrowid, file_info['name']))
+    
+    def remove_file(self, url):
+        with self._lock:
+            if self.has_fts:
+                self._conn.execute("DELETE FROM files_fts WHERE rowid IN (SELECT id FROM files WHERE url = ?)", (url,))
+            self._conn.execute("DELETE FROM files WHERE url = ?", (url,))
+    
+    def folder_files(self, folder):
+        """Return the stored file dicts of one folder keyed by URL."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, name, season, episode, size, mtime FROM files WHERE folder = ?", (folder,)
+            ).fetchall()
+        return {row[0]: dict(zip(('url', 'name', 'season', 'episode', 'size', 'mtime'), row)) for row in rows}
+    
+    def dir_states(self, category):
+        """Return the stored validators of every folder of a category keyed by URL."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, parent, etag, last_modified, listing_hash, mtime FROM dirs WHERE category = ?",
+                (category,),
+            ).fetchall()
+        return {row[0]: dict(zip(('url', 'parent', 'etag', 'last_modified', 'listing_hash', 'mtime'), row))
+                for row in rows}
+    
+    def child_dirs(self, folder):
+        with self._lock:
+            return self._conn.execute("SELECT url, mtime FROM dirs WHERE parent = ?", (folder,)).fetchall()
+    
+    def put_dir(self, category, url, parent, etag, last_modified, listing_hash, mtime):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, category, parent, etag, last_modified, listing_hash, mtime),
+            )
+    
+    def remove_subtree(self, folder):
+        """Forget a folder and everything below it, returning the removed file dicts."""
+        removed = []
+        pending = [folder]
+        with self._lock:
+            while pending:
+                url = pending.pop()
+                pending.extend(child for child, _ in self.child_dirs(url))
+                for file_info in self.folder_files(url).values():
+                    self.remove_file(file_info['url'])
+                    removed.append(file_info)
+                self._conn.execute("DELETE FROM dirs WHERE url = ?", (url,))
+        return removed
+    
+    def clear_category(self, category):
+        with self._lock:
+            if self.has_fts:
+                self._conn.execute(
+                    "DELETE FROM files_fts WHERE rowid IN (SELECT id FROM files WHERE category = ?)", (category,)
+                )
+            self._conn.execute("DELETE FROM files WHERE category = ?", (category,))
+            self._conn.execute("DELETE FROM dirs WHERE category = ?", (category,))
+            self._conn.execute("DELETE FROM checkpoints WHERE category = ?", (category,))
+            self._conn.commit()
+        self.prune_titles()
+    
+    def load_checkpoint(self, category):
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM checkpoints WHERE category = ?", (category,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def save_checkpoint(self, category, state):
+        """Store refresh progress and commit it together with the folder updates made so far."""
+        with self._lock:
+            if state is None:
+                self._conn.execute("DELETE FROM checkpoints WHERE category = ?", (category,))
+            else:
+                self._conn.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?)", (category, json.dumps(state)))
+            self._conn.commit()
+    
+    def file_count(self, category):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files WHERE category = ?", (category,)).fetchone()[0]
+    
+    def search(self, category, search_term, extensions=None):
+        """Return file dicts of a category that get_file_links' match rules accept."""
+        suffixes = media_suffixes(extensions)
+        
+        # Every match rule needs at least one of these words in the name, so they
+        # narrow the candidates down before the rules run
+        search_words = [word for word in search_term.lower().split() if len(word) > 2]
+        columns = "f.url, f.name, f.season, f.episode, f.size, f.mtime"
+        with self._lock:
+            if self.has_fts and search_words:
+                query = " OR ".join('"' + word.replace('"', '""') + '"' for word in search_words)
+                rows = self._conn.execute(
+                    f"SELECT {columns} FROM files_fts JOIN files f ON f.id = files_fts.rowid "
+                    "WHERE files_fts MATCH ? AND f.category = ? ORDER BY f.url",
+                    (query, category),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    f"SELECT {columns} FROM files f WHERE f.category = ? ORDER BY f.url", (category,)
+                ).fetchall()
+        
+        rows = [row for row in rows if row[1].lower().endswith(suffixes)]
+        reasons = get_matcher(search_term).match_all([row[1] for row in rows])
+        
+        results = []
+        for (url, name, season, episode, size, mtime), reason in zip(rows, reasons):
+            if reason:
+                results.append({
+                    'url': url,
+                    'name': name,
+                    'season': season,
+                    'episode': episode,
+                    'size': size,
+                    'mtime': mtime,
+                })
+        return results
+    
+    def fuzzy_search(self, category, search_term, extensions=None, min_score=FUZZY_MIN_SCORE):
+        """Return file dicts of a category whose title is similar to the search term, best first.
+        
+        Titles are compared by the Dice coefficient of their trigram sets, so typos,
+        release tags and spelling variants still match. Each dict gets the 'title' it
+        matched through and its 'score'. Only titles sharing one of the term's trigrams
+        are read, through the inverted index, never the whole catalogue.
+        """
+        extension_suffixes = media_suffixes(extensions)
+        query = title_trigrams(normalize_title(search_term))
+        if not query:
+            return []
+        
+        # Dice = 2 * shared / (len(query) + gram_count) and gram_count >= shared, so a title
+        # needs at least this many shared trigrams to reach min_score
+        min_shared = max(1, math.ceil(min_score * len(query) / (2 - min_score)))
+        placeholders = ", ".join("?" * len(query))
+        with self._lock:
+            candidates = self._conn.execute(
+                f"SELECT t.id, t.title, t.gram_count, g.shared FROM "
+                f"(SELECT title_id, COUNT(*) AS shared FROM title_grams WHERE gram IN ({placeholders}) "
+                f"GROUP BY title_id HAVING shared >= ?) g JOIN titles t ON t.id = g.title_id",
+                (*query, min_shared),
+            ).fetchall()
+            scored = [(2 * shared / (len(query) + gram_count), title_id, title)
+                      for title_id, title, gram_count, shared in candidates]
+            scored = sorted((match for match in scored if match[0] >= min_score), key=lambda match: (-match[0], match[2]))
+            
+            results = []
+            for score, title_id, title in scored:
+                rows = self._conn.execute(
+                    "SELECT url, name, season, episode, size, mtime FROM files "
+                    "WHERE title_id = ? AND category = ? ORDER BY url",
+                    (title_id, category),
+                ).fetchall()
+                for url, name, season, episode, size, mtime in rows:
+                    if name.lower().endswith(extension_suffixes):
+                        results.append({
+                            'url': url,
+                            'name': name,
+                            'season': season,
+                            'episode': episode,
+                            'size': size,
+                            'mtime': mtime,
+                            'title': title,
+                            'score': round(score, 3),
+                        })
+        return results
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def _split_listing(category_url, folder_url, entries):
+    """Split a listing into media file dicts and (url, mtime) subfolders inside the category."""
+    files = []
+    subfolders = []
+    for entry in entries:
+        href = entry.href
+        if not href or href == "../" or href == "/":
+            continue
+        full_url = urljoin(folder_url, href)
+        # Stay inside the category (skips parent links and absolute links elsewhere)
+        if not full_url.startswith(category_url) or full_url == folder_url:
+            continue
+        
+        if entry.is_dir:
+            subfolders.append((full_url, entry.mtime))
+        elif href.lower().endswith(tuple(MEDIA_EXTENSIONS)):
+            files.append({
+                'url': full_url,
+                'name': unquote(href.rsplit("/", 1)[-1]),
+                'size': entry.size,
+                'mtime': entry.mtime,
+            })
+    
+    seasons, episodes = parse_season_episode_batch([file_info['name'] for file_info in files])
+    for file_info, season, episode in zip(files, seasons, episodes):
+        file_info['season'] = season
+        file_info['episode'] = episode
+    return files, subfolders
+
+def refresh_category(category_url, index, session=None, progress=None, trust_dir_mtime=False,
+                     checkpoint_every=25):
+    """Re-crawl only the changed folders of an indexed category and return the added/removed files.
+    
+    Every known folder is revalidated with its stored ETag/Last-Modified (or listing hash), and
+    only listings that changed are diffed. With trust_dir_mtime, folders whose modification time
+    on the parent listing is unchanged are skipped without a request, subtree included.
+    """
+    if session is None:
+        session = get_shared_session()
+    
+    # Pick up an interrupted refresh where it stopped
+    state = index.load_checkpoint(category_url)
+    if state:
+        print(f"Resuming refresh of {category_url}: {len(state['visited'])} folders already done")
+    else:
+        state = {'pending': [[category_url, None, None]], 'visited': [], 'added': [], 'removed': []}
+    
+    pending = state['pending']
+    visited = set(state['visited'])
+    added = state['added']
+    removed = state['removed']
+    dir_states = index.dir_states(category_url)
+    processed = 0
+    
+    while pending:
+        folder_url, parent, listed_mtime = pending.pop(0)
+        if folder_url in visited:
+            continue
+        visited.add(folder_url)
+        stored = dir_states.get(folder_url)
+        
+        if progress:
+            progress(len(visited), len(added), len(removed), folder_url)
+        
+        if trust_dir_mtime and stored and listed_mtime is not None and stored['mtime'] == listed_mtime:
+            continue
+        
+        try:
+            status, entries, etag, last_modified = session.get_listing_conditional(
+                folder_url, 15,
+                etag=stored['etag'] if stored else None,
+                last_modified=stored['last_modified'] if stored else None,
+            )
+        except Exception as e:
+            # Keep what is stored; the next refresh tries again
+            print(f"Error refreshing {folder_url}: {str(e)}")
+            continue
+        
+        new_hash = listing_hash(entries) if status == 200 else None
+        if stored and (status == 304 or (status == 200 and new_hash == stored['listing_hash'])):
+            # Unchanged listing: only its subfolders still need checking
+            index.put_dir(category_url, folder_url, parent, etag or stored['etag'],
+                          last_modified or stored['last_modified'], stored['listing_hash'], listed_mtime)
+            pending.extend([child, folder_url, mtime] for child, mtime in index.child_dirs(folder_url))
+        elif status == 200:
+            files, subfolders = _split_listing(category_url, folder_url, entries)
+            old_files = index.folder_files(folder_url)
+            for file_info in files:
+                if file_info['url'] not in old_files:
+                    added.append(file_info)
+                index.add_file(category_url, folder_url, file_info)
+            new_urls = {file_info['url'] for file_info in files}
+            for url, file_info in old_files.items():
+                if url not in new_urls:
+                    index.remove_file(url)
+                    removed.append(file_info)
+            
+            new_children = {child for child, _ in subfolders}
+            for child, _ in index.child_dirs(folder_url):
+                if child not in new_children:
+                    removed.extend(index.remove_subtree(child))
+            
+            index.put_dir(category_url, folder_url, parent, etag, last_modified, new_hash, listed_mtime)
+            pending.extend([child, folder_url, mtime] for child, mtime in subfolders)
+        elif stored and status in (404, 410) and folder_url != category_url:
+            removed.extend(index.remove_subtree(folder_url))
+        else:
+            print(f"Failed to access {folder_url}: Status {status}")
+        
+        processed += 1
+        if processed % checkpoint_every == 0:
+            state['visited'] = sorted(visited)
+            index.save_checkpoint(category_url, state)
+    
+    index.save_checkpoint(category_url, None)
+    index.prune_titles()
+    print(f"Refreshed {len(visited)} folders under {category_url}: "
+          f"{len(added)} files added, {len(removed)} removed")
+    return {'added': added, 'removed': removed}
+
+def index_category(category_url, index, session=None, progress=None):
+    """Walk the whole tree under a category URL and store every media file in the index."""
+    # A full index is a refresh against an empty index, unless an earlier run was interrupted
+    if index.load_checkpoint(category_url) is None:
+        index.clear_category(category_url)
+    
+    def folder_progress(folder_count, added_count, removed_count, folder_url):
+        if progress:
+            progress(folder_count, added_count, folder_url)
+    
+    diff = refresh_category(category_url, index, session, folder_progress)
+    return len(diff['added'])
+
+DEFAULT_CATEGORIES = [
+    "Select a category...",
+    "English Movies- http://server2.ftpbd.net/FTP-2/English%20Movies/",
+    "English and Foreign TV Series- http://server4.ftpbd.net/FTP-4/English%20%26%20Foreign%20TV%20Series/",
+    "Animation Movies- http://server5.ftpbd.net/FTP-5/Animation%20Movies/",
+    "Anime and Cartoon Series- http://server5.ftpbd.net/FTP-5/Anime%20%26%20Cartoon%20TV%20Series/",
+    "Documentary- http://server5.ftpbd.net/FTP-5/Documentary/"
+]
+
+def get_categories_file():
+    """Return the path of the saved categories file."""
+    return os.path.join(get_app_data_dir(), "ftp_categories.json")
+
+def load_category_options(categories_file=None):
+    """Return the saved category options, starting with "Select a category...", or the defaults."""
+    categories_file = categories_file or get_categories_file()
+    try:
+        if os.path.exists(categories_file):
+            with open(categories_file, 'r') as f:
+                saved_categories = json.load(f)
+                # Ensure the first item is always "Select a category..."
+                if saved_categories and saved_categories[0] != "Select a category...":
+                    saved_categories.insert(0, "Select a category...")
+                print(f"Successfully loaded categories from {categories_file}")
+                return saved_categories
+        print(f"Categories file not found at {categories_file}, using defaults")
+    except Exception as e:
+        print(f"Error loading categories: {str(e)}")
+    return list(DEFAULT_CATEGORIES)
+
+def cli_int_option(argv, name, default):
+    """Return the integer value following a --name flag on the command line, or the default."""
+    if name in argv:
+        position = argv.index(name)
+        try:
+            return int(argv[position + 1])
+        except (IndexError, ValueError):
+            print(f"{name} needs a number, using {default}")
+    return default
+
+def build_search_parser():
+    """Return the argument parser of the non-interactive search command."""
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog="FTP_m3u_Generator search",
+        description="Search an FTP-style HTTP directory and write an M3U playlist or JSON Lines records. "
+                    f"Exit codes: {EXIT_OK} results found, {EXIT_NO_RESULTS} no results, "
+                    f"2 bad arguments, {EXIT_ERROR} error.",
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--url", help="category or folder URL to search")
+    source.add_argument("--category", help="name of a saved category (case-insensitive, unique prefix is enough)")
+    parser.add_argument("--term", required=True, help="movie/series name to search for")
+    parser.add_argument("--ext", "--extensions", dest="extensions", default=".mp4,.mkv,.avi",
+                        help="comma-separated file extensions (default: .mp4,.mkv,.avi)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="output file, existing folder, or - for stdout (default)")
+    parser.add_argument("--format", choices=["m3u", "jsonl"], default="m3u", help="output format")
+    parser.add_argument("--name", help="playlist name (default: the term with spaces as underscores)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="folders scanned in parallel")
+    parser.add_argument("--engine", choices=CRAWL_ENGINES, default=CRAWL_ENGINES[0], help="crawl engine")
+    parser.add_argument("--cache", action=argparse.BooleanOptionalAction, default=True,
+                        help="use the on-disk listing cache")
+    parser.add_argument("--offline", action="store_true", help="answer from the listing cache only")
+    parser.add_argument("--use-index", action="store_true", help="search the local category index instead")
+    parser.add_argument("--fuzzy", action="store_true",
+                        help="rank index titles by similarity to the term instead of the exact match rules "
+                             "(implies --use-index)")
+    parser.add_argument("--min-score", type=float, default=FUZZY_MIN_SCORE,
+                        help=f"smallest similarity (0-1) of a --fuzzy match (default {FUZZY_MIN_SCORE})")
+    parser.add_argument("--timeout", type=float,
+                        help="listing request timeout in seconds (default: from each host's latency)")
+    parser.add_argument("--adaptive", action=argparse.BooleanOptionalAction, default=True,
+                        help="adapt each host's concurrency and request rate to its latency and throttling; "
+                             f"--no-adaptive keeps {DEFAULT_PER_HOST_LIMIT} requests per host")
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH, help="subfolder depth limit (0 = none)")
+    parser.add_argument("--max-folders", type=int, default=DEFAULT_MAX_FOLDERS,
+                        help="listing fetch budget (0 = none)")
+    parser.add_argument("--resume", action="store_true",
+                        help="checkpoint progress and continue an interrupted run of the same search")
+    parser.add_argument("--media-info", action="store_true",
+                        help="read durations and resolutions from the media files' headers")
+    parser.add_argument("--report", metavar="PATH",
+                        help="where to write the run's JSON performance report (default: the reports folder)")
+    parser.add_argument("--profile", action="store_true",
+                        help="also profile the run with cProfile and tracemalloc (saved next to the report)")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="write Prometheus metrics there when done (for a node_exporter textfile collector)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress messages on stderr")
+    return parser
+
+def resolve_category(name, options=None):
+    """Return the URL of the saved category whose name matches, or raise ValueError."""
+    categories = [parse_category(option) for option in (options or load_category_options())[1:]]
+    wanted = name.strip().lower()
+    exact = [url for category, url in categories if category.lower() == wanted]
+    if exact:
+        return exact[0]
+    prefixed = [url for category, url in categories if category.lower().startswith(wanted)]
+    if len(prefixed) == 1:
+        return prefixed[0]
+    known = ", ".join(category for category, _ in categories)
+    raise ValueError(f"no single saved category matches {name!r} (saved: {known})")
+
+def _cli_search(args):
+    """Run the search described by parsed search arguments and return the matching file dicts."""
+    base_url = args.url or resolve_category(args.category)
+    extensions = [ext.strip() for ext in args.extensions.split(",") if ext.strip()]
+    
+    if args.use_index or args.fuzzy:
+        index = CategoryIndex()
+        try:
+            if not index.file_count(base_url):
+                raise ValueError(f"{base_url} has not been indexed yet; run --index {base_url} first")
+            if args.fuzzy:
+                with get_run_metrics().phase("index_search"):
+                    all_file_info = index.fuzzy_search(base_url, args.term, extensions, args.min_score)
+                scores = {}
+                for file_info in all_file_info:
+                    scores.setdefault(file_info['title'], file_info['score'])
+                for title, score in scores.items():
+                    print(f"Matched title: {title} (score {score})")
+            else:
+                with get_run_metrics().phase("index_search"):
+                    all_file_info = index.search(base_url, args.term, extensions)
+        finally:
+            index.close()
+        if args.media_info:
+            _cli_probe_media(all_file_info, args)
+        return all_file_info
+    
+    cache = ListingCache(offline=args.offline) if args.cache or args.offline else None
+    frontier = CrawlFrontier(args.max_depth, args.max_folders)
+    workers = max(1, args.workers)
+    limiter = None if args.adaptive else HostLimiter(min(workers, DEFAULT_PER_HOST_LIMIT), adaptive=False)
+    found = []
+    
+    checkpoint = None
+    folders = None
+    if args.resume:
+        checkpoint = SearchCheckpoint(base_url, args.term, extensions, args.max_depth, args.max_folders)
+        if checkpoint.load():
+            folders = checkpoint.restore(frontier)
+            print(f"Resuming search saved {time.ctime(checkpoint.saved_at)}: "
+                  f"{len(checkpoint.scans)} folders already scanned")
+    
+    def scanned(files):
+        found.extend(files)
+        if checkpoint:
+            checkpoint.maybe_save(frontier)
+    
+    try:
+        with checkpoint.recording(frontier) if checkpoint else contextlib.nullcontext():
+            if args.engine == "asyncio":
+                crawler = AsyncCrawler(workers, cache=cache, timeout=args.timeout, limiter=limiter)
+                on_folders = functools.partial(checkpoint.record_folders, frontier=frontier) if checkpoint else None
+                # The folder search and the folder scans run inside one crawler.search call,
+                # so they are timed as one phase (the scans start once the folder list is known)
+                with get_run_metrics().phase("crawl"):
+                    crawler.search(base_url, args.term, extensions, on_folders,
+                                   lambda i, folder, files: scanned(files), frontier, folders)
+                print(f"Connections: {crawler.report()}")
+                print(f"Flow control: {crawler.limiter.report()}")
+            else:
+                session = CrawlSession(pool_size=min(workers, DEFAULT_PER_HOST_LIMIT), cache=cache,
+                                       timeout=args.timeout, limiter=limiter)
+                try:
+                    if folders is None:
+                        with get_run_metrics().phase("folder_search"):
+                            folders = get_folders_recursive(base_url, args.term, session, frontier)
+                        if checkpoint:
+                            checkpoint.record_folders(folders, frontier)
+                    with get_run_metrics().phase("file_scan"):
+                        for _, _, files in scan_folders(folders, args.term, extensions, max_workers=workers,
+                                                        session=session, frontier=frontier):
+                            scanned(files)
+                    print(f"Connections: {session.report()}")
+                    print(f"Flow control: {session.limiter.report()}")
+                finally:
+                    session.close()
+    finally:
+        if cache:
+            cache.close()
+    print(f"Folders: {frontier.report()}")
+    if not found and frontier.failed and (frontier.listing_failed(base_url) or frontier.failed == frontier.fetched):
+        # Nothing found because the server could not be read is an error, not an empty result;
+        # a few unreadable subfolders are not, so cron jobs only see real failures
+        raise RuntimeError(f"no results and {frontier.failed} of {frontier.fetched} listings could not be fetched")
+    
+    # Same duplicate handling as the GUI
+    all_file_info = []
+    processed_urls = set()
+    for file_info in found:
+        if file_info['url'] not in processed_urls:
+            processed_urls.add(file_info['url'])
+            all_file_info.append(file_info)
+    if args.media_info:
+        _cli_probe_media(all_file_info, args)
+    return all_file_info
+
+def _cli_probe_media(all_file_info, args):
+    """Read durations and resolutions for the search command's results."""
+    from ftp_m3u_metadata import MetadataCache, probe_media
+    workers = max(1, args.workers)
+    session = CrawlSession(pool_size=min(workers, DEFAULT_PER_HOST_LIMIT))
+    cache = MetadataCache()
+    try:
+        with get_run_metrics().phase("media_info"):
+            with_duration = probe_media(all_file_info, session, cache, max_workers=workers)
+        print(f"Media info: {with_duration} of {len(all_file_info)} files have a duration")
+    finally:
+        cache.close()
+        session.close()
+
+def write_jsonl(f, file_info_list):
+    """Write one JSON object per file."""
+    for file_info in file_info_list:
+        f.write(json.dumps(file_info, ensure_ascii=False) + "\n")
+
+def run_search_cli(argv):
+    """Non-interactive search command for scripts and cron; returns the process exit code.
+    
+    Every run writes a JSON performance report (see RunMetrics), with --profile
+    including the cProfile and tracemalloc results.
+    """
+    args = build_search_parser().parse_args(argv)
+    run = {
+        'mode': "search",
+        'source': args.url or args.category,
+        'term': args.term,
+        'engine': "index" if args.use_index or args.fuzzy else args.engine,
+        'workers': args.workers,
+        'adaptive': args.adaptive,
+    }
+    get_run_metrics().reset()
+    profiler = RunProfiler() if args.profile else None
+    if profiler:
+        profiler.start()
+    exit_code = EXIT_ERROR
+    try:
+        exit_code = _run_search_cli(args, run)
+        return exit_code
+    finally:
+        report_path = args.report or new_run_report_path()
+        run['exit_code'] = exit_code
+        try:
+            profile = profiler.stop(os.path.splitext(report_path)[0] + ".prof") if profiler else None
+            write_run_report(run, report_path, profile=profile)
+            if not args.quiet:
+                print(f"Report: {report_path} ({get_run_metrics().report()})", file=sys.stderr)
+        except OSError as e:
+            print(f"Error writing report: {str(e)}", file=sys.stderr)
+        if args.metrics_file:
+            try:
+                write_metrics_file(args.metrics_file)
+            except OSError as e:
+                print(f"Error writing metrics: {str(e)}", file=sys.stderr)
+
+def _run_search_cli(args, run):
+    load_asyncio()
+    playlist_name = args.name or args.term.replace(" ", "_")
+    
+    # Progress messages go to stderr (nowhere with --quiet) so stdout only carries the output
+    log = open(os.devnull, "w") if args.quiet else sys.stderr
+    try:
+        with contextlib.redirect_stdout(log):
+            all_file_info = _cli_search(args)
+            run['results'] = len(all_file_info)
+            
+            if not all_file_info:
+                print("No media files found.")
+                return EXIT_NO_RESULTS
+            
+            if args.output != "-":
+                output = args.output
+                if os.path.isdir(output):
+                    output = os.path.join(output, f"{playlist_name}.{args.format}")
+                with open(output, "w", encoding="utf-8") as f:
+                    if args.format == "jsonl":
+                        write_jsonl(f, all_file_info)
+                    else:
+                        write_m3u(f, playlist_name, all_file_info)
+                print(f"Wrote {len(all_file_info)} files to {output}")
+                return EXIT_OK
+    except KeyboardInterrupt:
+        print("Search stopped.", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except (Exception, asyncio.CancelledError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        if log is not sys.stderr:
+            log.close()
+    
+    if args.format == "jsonl":
+        write_jsonl(sys.stdout, all_file_info)
+    else:
+        write_m3u(sys.stdout, playlist_name, all_file_info)
+    sys.stdout.flush()
+    return EXIT_OK
+
+def check_startup(budget_ms=STARTUP_BUDGET_MS):
+    """Time a fresh import of this module with -X importtime.
+
+    Returns (ok, import_ms, eager) where eager lists the STARTUP_LAZY_MODULES the
+    import pulled in; ok is False if any did or the budget was exceeded.
+    """
+    import subprocess
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    
+    # Lines look like "import time:   self [us] | cumulative | imported package"
+    import_ms = 0.0
+    loaded = set()
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if not line.startswith("import time:") or len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        loaded.add(name)
+        if name == module:
+            import_ms = int(fields[1]) / 1000
+    eager = [name for name in STARTUP_LAZY_MODULES if name in loaded]
+    return not eager and import_ms <= budget_ms, import_ms, eager
+
+# Update the main function to support both CLI and GUI modes
+def main():
+    # Check if GUI mode or command line mode
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "search":
+        # Non-interactive search: see build_search_parser for the options
+        sys.exit(run_search_cli(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        # Benchmarks against a generated local server: see build_benchmark_parser for the options
+        from ftp_m3u_benchmark import run_benchmark_cli
+        sys.exit(run_benchmark_cli(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--check-startup":
+        # Import time regression check: --check-startup [--budget MS]
+        budget = cli_int_option(sys.argv, "--budget", STARTUP_BUDGET_MS)
+        ok, import_ms, eager = check_startup(budget)
+        print(f"Import time: {import_ms:.1f} ms (budget {budget} ms)")
+        if eager:
+            print(f"Imported at startup: {', '.join(eager)}")
+        sys.exit(EXIT_OK if ok else EXIT_ERROR)
+    elif len(sys.argv) > 2 and sys.argv[1] == "--index":
+        # Index a whole category for later --use-index searches
+        cache = ListingCache(offline="--offline" in sys.argv)
+        session = CrawlSession(cache=cache)
+        index = CategoryIndex()
+        try:
+            index_category(sys.argv[2], index, session)
+            print(f"Connections: {session.report()}")
+        finally:
+            index.close()
+            session.close()
+            cache.close()
+    elif len(sys.argv) > 2 and sys.argv[1] == "--refresh":
+        # Re-crawl only changed folders of an indexed category; optional diff file as JSON
+        session = CrawlSession()
+        index = CategoryIndex()
+        try:
+            diff = refresh_category(sys.argv[2], index, session)
+            print(f"Connections: {session.report()}")
+        finally:
+            index.close()
+            session.close()
+        
+        for file_info in diff['added']:
+            print(f"+ {file_info['url']}")
+        for file_info in diff['removed']:
+            print(f"- {file_info['url']}")
+        if len(sys.argv) > 3 and not sys.argv[3].startswith("--"):
+            with open(sys.argv[3], 'w', encoding='utf-8') as f:
+                json.dump(diff, f, indent=2)
+            print(f"Diff saved to {sys.argv[3]}")
+    elif len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        # Headless job API: --serve [PORT] [--host ADDR] [--workers N] [--queue N] [--no-cache]
+        from ftp_m3u_service import (run_service, DEFAULT_SERVICE_HOST, DEFAULT_SERVICE_PORT,
+                                     DEFAULT_SERVICE_WORKERS, DEFAULT_SERVICE_QUEUE)
+        port = DEFAULT_SERVICE_PORT
+        if len(sys.argv) > 2 and sys.argv[2].isdigit():
+            port = int(sys.argv[2])
+        host = sys.argv[sys.argv.index("--host") + 1] if "--host" in sys.argv[:-1] else DEFAULT_SERVICE_HOST
+        cache = None if "--no-cache" in sys.argv else ListingCache()
+        try:
+            run_service(host, port, cli_int_option(sys.argv, "--workers", DEFAULT_SERVICE_WORKERS),
+                        cli_int_option(sys.argv, "--queue", DEFAULT_SERVICE_QUEUE), cache)
+        finally:
+            if cache:
+                cache.close()
+    elif len(sys.argv) > 3 and sys.argv[1] == "--batch":
+        # One playlist per search term from a file (or - for stdin), crawling the category once
+        base_url = sys.argv[2]
+        search_terms = read_search_terms(sys.argv[3])
+        save_dir = sys.argv[4] if len(sys.argv) > 4 and not sys.argv[4].startswith("--") else os.getcwd()
+        
+        cache = ListingCache(offline="--offline" in sys.argv)
+        session = CrawlSession(cache=cache)
+        frontier = CrawlFrontier(cli_int_option(sys.argv, "--max-depth", DEFAULT_MAX_DEPTH),
+                                 cli_int_option(sys.argv, "--max-folders", DEFAULT_MAX_FOLDERS))
+        try:
+            results = batch_search(base_url, search_terms, session=session, frontier=frontier)
+            print(f"Connections: {session.report()}")
+            print(f"Folders: {frontier.report()}")
+        finally:
+            session.close()
+            cache.close()
+        
+        for term, all_file_info in results.items():
+            if all_file_info:
+                playlist_path = create_m3u(term.replace(" ", "_"), all_file_info, save_dir)
+                print(f"{term}: {len(all_file_info)} files -> {playlist_path}")
+            else:
+                print(f"{term}: no media files found")
+    elif len(sys.argv) > 1 and sys.argv[1] == "--cli":
+        # Command line mode - use original code
+        all_categories = "--all-categories" in sys.argv
+        base_url = None if all_categories else input("Enter FTP URL: ")
+        search_term = input("Enter movie/series name: ")
+        
+        print("Select where to save the playlist...")
+        from ftp_m3u_gui import open_save_dialog
+        save_dir = open_save_dialog()
+        
+        if all_categories:
+            # Search every saved category at once; files are listed as they arrive
+            categories = [parse_category(option) for option in load_category_options()[1:]]
+            categories = [(name, url) for name, url in categories if url]
+            print(f"Searching {len(categories)} categories in parallel...")
+            cache = ListingCache(offline="--offline" in sys.argv)
+            session = CrawlSession(cache=cache)
+            all_file_info = []
+            try:
+                for name, file_info in federated_search(
+                        categories, search_term, session=session,
+                        max_depth=cli_int_option(sys.argv, "--max-depth", DEFAULT_MAX_DEPTH),
+                        max_folders=cli_int_option(sys.argv, "--max-folders", DEFAULT_MAX_FOLDERS)):
+                    print(f"Added ({name}): {file_info['name']}")
+                    all_file_info.append(file_info)
+            except KeyboardInterrupt:
+                print("Search stopped.")
+            finally:
+                print(f"Connections: {session.report()}")
+                session.close()
+                cache.close()
+            
+            if all_file_info and "--mirrors" in sys.argv:
+                # Point entries at their fastest healthy copy
+                session = CrawlSession()
+                print(f"Switched {select_mirrors(all_file_info, session)} entries to a faster mirror")
+                print(f"Hosts: {session.health.report()}")
+                session.close()
+            
+            if all_file_info:
+                playlist_path = create_m3u(search_term.replace(" ", "_"), all_file_info, save_dir,
+                                           "--fallbacks" in sys.argv)
+                print(f"Created playlist with {len(all_file_info)} files from {len(categories)} categories.")
+                print(f"Playlist location: {playlist_path}")
+            else:
+                print("No media files found.")
+            return
+        
+        if "--use-index" in sys.argv:
+            # Answer from the local index without touching the network
+            index = CategoryIndex()
+            try:
+                if not index.file_count(base_url):
+                    print(f"{base_url} has not been indexed yet. Run with --index {base_url} first.")
+                    return
+                all_file_info = index.search(base_url, search_term)
+            finally:
+                index.close()
+            
+            if all_file_info:
+                playlist_path = create_m3u(search_term.replace(" ", "_"), all_file_info, save_dir)
+                print(f"Created playlist with {len(all_file_info)} files from the local index.")
+                print(f"Playlist location: {playlist_path}")
+            else:
+                print("No media files found.")
+            return
+        
+        print("Searching for matching folders...")
+        # --offline answers from the listing cache only
+        cache = ListingCache(offline="--offline" in sys.argv)
+        all_file_info = []
+        # --max-depth N / --max-folders N bound the crawl (0 = unlimited)
+        frontier = CrawlFrontier(cli_int_option(sys.argv, "--max-depth", DEFAULT_MAX_DEPTH),
+                                 cli_int_option(sys.argv, "--max-folders", DEFAULT_MAX_FOLDERS))
+        
+        # --stream writes entries to the playlist as they are found, then sorts it
+        playlist = None
+        if "--stream" in sys.argv:
+            playlist = StreamingPlaylistWriter(search_term.replace(" ", "_"), save_dir)
+            print(f"Streaming playlist to: {playlist.file_path}")
+        
+        # Same duplicate handling as the GUI: a show folder and its season folders overlap
+        processed_urls = set()
+        
+        def collect(i, folder, files_found):
+            new_files = []
+            for file_info in files_found:
+                if file_info['url'] not in processed_urls:
+                    processed_urls.add(file_info['url'])
+                    new_files.append(file_info)
+            if playlist is not None:
+                playlist.add_files(new_files)
+            else:
+                all_file_info.extend(new_files)
+        
+        if "--async" in sys.argv:
+            # Asyncio engine; Ctrl+C cancels the in-flight requests
+            crawler = AsyncCrawler(cache=cache)
+            try:
+                crawler.search(
+                    base_url, search_term,
+                    on_folders=lambda folders: print(f"Found {len(folders)} folders. Searching for media files..."),
+                    on_result=collect,
+                    frontier=frontier,
+                )
+            except (KeyboardInterrupt, asyncio.CancelledError):
+                print("Search stopped.")
+                if playlist is not None:
+                    playlist.abort()
+                    print(f"Partial playlist kept at: {playlist.file_path}")
+                return
+            finally:
+                cache.close()
+            print(f"Connections: {crawler.report()}")
+        else:
+            session = CrawlSession(cache=cache)
+            folders = get_folders_recursive(base_url, search_term, session, frontier)
+            
+            if not folders:
+                print("No matching folders found.")
+                session.close()
+                cache.close()
+                if playlist is not None:
+                    playlist.finalize()
+                return
+            
+            print(f"Found {len(folders)} folders. Searching for media files...")
+            for i, folder, files_found in scan_folders(folders, search_term, session=session, frontier=frontier):
+                collect(i, folder, files_found)
+            print(f"Connections: {session.report()}")
+            session.close()
+            cache.close()
+        
+        print(f"Folders: {frontier.report()}")
+        
+        if playlist is not None:
+            file_count = playlist.count
+            playlist_path = playlist.finalize()
+            if playlist_path:
+                print(f"Created playlist with {file_count} files organized by season and episode when possible.")
+                print(f"Playlist location: {playlist_path}")
+            else:
+                print("No media files found.")
+        elif all_file_info:
+            playlist_path = create_m3u(search_term.replace(" ", "_"), all_file_info, save_dir)
+            print(f"Created playlist with {len(all_file_info)} files organized by season and episode when possible.")
+            print(f"Playlist location: {playlist_path}")
+        else:
+            print("No media files found.")
+    else:
+        # GUI mode
+        from ftp_m3u_gui import run_gui
+        run_gui()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
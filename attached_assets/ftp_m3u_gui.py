@@ -0,0 +1,911 @@
+"""Tk GUI of the FTP M3U Playlist Generator."""
+import os
+import json
+import threading
+from collections import deque
+from datetime import datetime
+import tkinter as tk
+from tkinter import filedialog, ttk, messagebox, simpledialog
+
+from ftp_m3u_generator import (
+    DEFAULT_CATEGORIES, DEFAULT_MAX_DEPTH, DEFAULT_MAX_FOLDERS, DEFAULT_MAX_WORKERS, DEFAULT_PER_HOST_LIMIT,
+    CRAWL_ENGINES, AsyncCrawler, CategoryIndex, CrawlFrontier, CrawlSession, ListingCache, RunProfiler,
+    SearchCheckpoint, StreamingPlaylistWriter, create_m3u, federated_search, get_categories_file, get_folders_recursive,
+    get_run_metrics, index_category, load_category_options, new_run_report_path, parse_category, refresh_category,
+    scan_folders, select_mirrors, write_run_report,
+)
+
+# Worker thread updates are applied by the Tk main loop every UI_REFRESH_MS;
+# the log view keeps only the last LOG_MAX_LINES lines
+UI_REFRESH_MS = 100
+LOG_MAX_LINES = 2000
+
+class UIEventQueue:
+    """Updates posted by worker threads for the Tk main loop to apply in batches.
+    
+    Log lines go into a ring buffer of max_lines, so a burst of messages costs one
+    widget insert however many arrive; only the latest status and progress are kept.
+    """
+    
+    def __init__(self, max_lines=LOG_MAX_LINES):
+        self._lock = threading.Lock()
+        self._lines = deque(maxlen=max_lines)
+        self._dropped = 0
+        self._status = None
+        self._progress = None
+        self._dialogs = []
+    
+    def log(self, line):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self._dropped += 1
+            self._lines.append(line)
+    
+    def status(self, message):
+        with self._lock:
+            self._status = message
+    
+    def progress(self, value):
+        with self._lock:
+            self._progress = value
+    
+    def dialog(self, kind, title, message):
+        """Queue a messagebox; kind is "info" or "error"."""
+        with self._lock:
+            self._dialogs.append((kind, title, message))
+    
+    def drain(self):
+        """Take everything posted so far: (lines, dropped, status, progress, dialogs)"""
+        with self._lock:
+            batch = (list(self._lines), self._dropped, self._status, self._progress, self._dialogs)
+            self._lines.clear()
+            self._dropped = 0
+            self._status = self._progress = None
+            self._dialogs = []
+        return batch
+
+def open_save_dialog():
+    """Open a GUI dialog to select save location and ensure it's in the foreground."""
+    root = tk.Tk()
+    root.attributes('-topmost', True)  # Make window appear on top
+    root.update()  # Update to ensure it's shown
+    root.withdraw()  # Hide the main window but keep it on top
+    
+    directory = filedialog.askdirectory(
+        title="Select folder to save playlist",
+        initialdir=os.getcwd(),
+        parent=root  # Set parent to ensure dialog is also on top
+    )
+    
+    root.destroy()  # Properly close the Tk instance
+    
+    return directory if directory else os.getcwd()
+
+class FTPPlaylistGeneratorApp:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("FTP M3U Playlist Generator")
+        self.root.geometry("600x500")
+        self.root.resizable(True, True)
+        
+        # Crawler of the running search, if it can be stopped
+        self.active_crawler = None
+        self.active_stop = None
+        # (frontier, session, checkpoint) of the running search
+        self.active_search = None
+        
+        # Status, progress and log updates from any thread are applied on a timer
+        self.ui_events = UIEventQueue()
+        
+        # Load saved categories - modified for portable exe support
+        self.categories_file = self.get_categories_file_path()
+        self.load_categories()
+        
+        # Create the UI elements
+        self.create_widgets()
+        self.root.after(UI_REFRESH_MS, self.process_ui_events)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+    
+    def get_categories_file_path(self):
+        """Get the path to the categories file, working in both script and exe mode"""
+        categories_path = get_categories_file()
+        print(f"Categories file path: {categories_path}")
+        return categories_path
+    
+    def load_categories(self):
+        """Load saved categories from JSON file"""
+        self.default_categories = list(DEFAULT_CATEGORIES)
+        self.url_options = load_category_options(self.categories_file)
+    
+    def save_categories(self):
+        """Save categories to JSON file"""
+        try:
+            # Skip the first item ("Select a category...") when saving
+            categories_to_save = self.url_options[1:] if len(self.url_options) > 1 else []
+            
+            # Ensure the directory exists
+            categories_dir = os.path.dirname(self.categories_file)
+            os.makedirs(categories_dir, exist_ok=True)
+            
+            # Save the file
+            with open(self.categories_file, 'w') as f:
+                json.dump(categories_to_save, f, indent=2)
+            print(f"Categories saved to {self.categories_file}")
+            
+            # Verify the file was created
+            if os.path.exists(self.categories_file):
+                print(f"Verified: Categories file exists at {self.categories_file}")
+            else:
+                print(f"Warning: Categories file was not created at {self.categories_file}")
+        except Exception as e:
+            print(f"Error saving categories: {str(e)}")
+            # Try an alternative location if the primary location fails
+            try:
+                alt_path = os.path.join(os.path.expanduser("~"), "ftp_categories.json")
+                with open(alt_path, 'w') as f:
+                    json.dump(categories_to_save, f, indent=2)
+                print(f"Categories saved to alternative location: {alt_path}")
+                # Update the path for future saves
+                self.categories_file = alt_path
+            except Exception as e2:
+                print(f"Error saving to alternative location: {str(e2)}")
+    
+    def add_category(self):
+        """Add a new category and URL to the dropdown"""
+        category_name = simpledialog.askstring("Add Category", "Enter category name:", parent=self.root)
+        if not category_name:
+            return
+            
+        url = simpledialog.askstring("Add URL", "Enter FTP URL for this category:", parent=self.root)
+        if not url:
+            return
+            
+        # Format the new entry
+        new_entry = f"{category_name}- {url}"
+        
+        # Add to the list and update dropdown
+        self.url_options.append(new_entry)
+        self.url_dropdown['values'] = self.url_options
+        
+        # Save the updated categories
+        self.save_categories()
+        
+        # Show confirmation
+        messagebox.showinfo("Category Added", f"Added category: {category_name}")
+    
+    def edit_category(self):
+        """Edit the selected category and URL"""
+        selected_index = self.url_dropdown.current()
+        
+        # Don't allow editing the "Select a category..." option
+        if selected_index == 0:
+            messagebox.showinfo("Edit Category", "Please select a category to edit.")
+            return
+            
+        selected = self.url_dropdown.get()
+        
+        # Split the category name and URL
+        if "- " in selected:
+            category_name, url = selected.split("- ", 1)
+        else:
+            category_name = ""
+            url = selected
+            
+        # Ask for new category name
+        new_category_name = simpledialog.askstring("Edit Category", 
+                                                 "Enter new category name:", 
+                                                 parent=self.root,
+                                                 initialvalue=category_name)
+        if new_category_name is None:  # User cancelled
+            return
+            
+        # Ask for new URL
+        new_url = simpledialog.askstring("Edit URL", 
+                                       "Enter new FTP URL for this category:", 
+                                       parent=self.root,
+                                       initialvalue=url)
+        if new_url is None:  # User cancelled
+            return
+            
+        # Format the new entry
+        new_entry = f"{new_category_name}- {new_url}"
+        
+        # Update the list and dropdown
+        self.url_options[selected_index] = new_entry
+        self.url_dropdown['values'] = self.url_options
+        self.url_dropdown.current(selected_index)
+        
+        # Update the URL field
+        self.url_var.set(new_url)
+        
+        # Save the updated categories
+        self.save_categories()
+        
+        # Show confirmation
+        messagebox.showinfo("Category Updated", f"Updated category: {new_category_name}")
+    
+    def delete_category(self):
+        """Delete the selected category"""
+        selected_index = self.url_dropdown.current()
+        
+        # Don't allow deleting the "Select a category..." option
+        if selected_index == 0:
+            messagebox.showinfo("Delete Category", "Please select a category to delete.")
+            return
+            
+        selected = self.url_dropdown.get()
+        
+        # Get category name for confirmation message
+        category_name = selected.split("- ", 1)[0] if "- " in selected else selected
+        
+        # Confirm deletion
+        confirm = messagebox.askyesno("Confirm Deletion", 
+                                     f"Are you sure you want to delete the category '{category_name}'?",
+                                     parent=self.root)
+        if not confirm:
+            return
+            
+        # Remove from the list and update dropdown
+        self.url_options.pop(selected_index)
+        self.url_dropdown['values'] = self.url_options
+        
+        # Reset to first item
+        self.url_dropdown.current(0)
+        self.url_var.set("")
+        
+        # Save the updated categories
+        self.save_categories()
+        
+        # Show confirmation
+        messagebox.showinfo("Category Deleted", f"Deleted category: {category_name}")
+    
+    def create_widgets(self):
+        # Main frame
+        main_frame = tk.Frame(self.root, padx=10, pady=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # URL input
+        tk.Label(main_frame, text="FTP URL:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.url_var = tk.StringVar()
+        
+        # Create a frame to hold the dropdown, entry field, and add button
+        url_frame = tk.Frame(main_frame)
+        url_frame.grid(row=0, column=1, sticky=tk.EW, pady=5)
+        
+        # Create the dropdown for predefined URLs
+        self.url_dropdown = ttk.Combobox(url_frame, values=self.url_options, width=40)
+        self.url_dropdown.current(0)
+        self.url_dropdown.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.url_dropdown.bind("<<ComboboxSelected>>", self.update_url_from_dropdown)
+        
+        # Category management buttons
+        category_buttons_frame = tk.Frame(url_frame)
+        category_buttons_frame.pack(side=tk.RIGHT)
+        
+        # Add button for new categories
+        tk.Button(category_buttons_frame, text="+", command=self.add_category, width=3).pack(side=tk.LEFT, padx=2)
+        # Edit button for existing categories
+        tk.Button(category_buttons_frame, text="✎", command=self.edit_category, width=3).pack(side=tk.LEFT, padx=2)
+        # Delete button for categories
+        tk.Button(category_buttons_frame, text="✕", command=self.delete_category, width=3).pack(side=tk.LEFT, padx=2)
+        
+        # Entry field for URL (below the dropdown)
+        tk.Entry(main_frame, textvariable=self.url_var, width=50).grid(row=1, column=1, sticky=tk.EW, pady=5)
+        
+        # Search term input
+        tk.Label(main_frame, text="Movie/Series Name:").grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.search_var = tk.StringVar()
+        tk.Entry(main_frame, textvariable=self.search_var, width=50).grid(row=2, column=1, sticky=tk.EW, pady=5)
+        
+        # File extensions
+        tk.Label(main_frame, text="File Extensions:").grid(row=3, column=0, sticky=tk.W, pady=5)
+        self.extensions_var = tk.StringVar(value=".mp4, .mkv, .avi")
+        tk.Entry(main_frame, textvariable=self.extensions_var, width=50).grid(row=3, column=1, sticky=tk.EW, pady=5)
+        
+        # Save location
+        tk.Label(main_frame, text="Save Location:").grid(row=4, column=0, sticky=tk.W, pady=5)
+        self.save_location_frame = tk.Frame(main_frame)
+        self.save_location_frame.grid(row=4, column=1, sticky=tk.EW, pady=5)
+        
+        self.save_var = tk.StringVar(value=os.getcwd())
+        tk.Entry(self.save_location_frame, textvariable=self.save_var, width=40).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Button(self.save_location_frame, text="Browse", command=self.browse_save_location).pack(side=tk.RIGHT, padx=5)
+        
+        # Number of folders scanned in parallel and listing cache options
+        tk.Label(main_frame, text="Parallel Scans:").grid(row=5, column=0, sticky=tk.W, pady=5)
+        options_frame = tk.Frame(main_frame)
+        options_frame.grid(row=5, column=1, sticky=tk.W, pady=5)
+        
+        self.workers_var = tk.IntVar(value=DEFAULT_MAX_WORKERS)
+        tk.Spinbox(options_frame, from_=1, to=32, textvariable=self.workers_var, width=5).pack(side=tk.LEFT)
+        
+        self.use_cache_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(options_frame, text="Use listing cache", variable=self.use_cache_var).pack(side=tk.LEFT, padx=10)
+        self.offline_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(options_frame, text="Offline (cache only)", variable=self.offline_var).pack(side=tk.LEFT)
+        self.use_index_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(options_frame, text="Search local index", variable=self.use_index_var).pack(side=tk.LEFT, padx=10)
+        # Ranked approximate title matching over the index, for typos and release names
+        self.fuzzy_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(options_frame, text="Fuzzy", variable=self.fuzzy_var).pack(side=tk.LEFT)
+        self.stream_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(options_frame, text="Stream playlist", variable=self.stream_var).pack(side=tk.LEFT)
+        self.all_categories_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(options_frame, text="All categories", variable=self.all_categories_var).pack(side=tk.LEFT, padx=10)
+        
+        tk.Label(options_frame, text="Engine:").pack(side=tk.LEFT)
+        self.engine_var = tk.StringVar(value=CRAWL_ENGINES[0])
+        ttk.Combobox(options_frame, textvariable=self.engine_var, values=CRAWL_ENGINES,
+                        state="readonly", width=8).pack(side=tk.LEFT, padx=2)
+        
+        # Crawl budgets (0 = unlimited)
+        tk.Label(main_frame, text="Crawl Limits:").grid(row=6, column=0, sticky=tk.W, pady=5)
+        limits_frame = tk.Frame(main_frame)
+        limits_frame.grid(row=6, column=1, sticky=tk.W, pady=5)
+        
+        tk.Label(limits_frame, text="Max depth:").pack(side=tk.LEFT)
+        self.max_depth_var = tk.IntVar(value=DEFAULT_MAX_DEPTH)
+        tk.Spinbox(limits_frame, from_=0, to=64, textvariable=self.max_depth_var, width=5).pack(side=tk.LEFT, padx=2)
+        tk.Label(limits_frame, text="Max folders:").pack(side=tk.LEFT, padx=(10, 0))
+        self.max_folders_var = tk.IntVar(value=DEFAULT_MAX_FOLDERS)
+        tk.Spinbox(limits_frame, from_=0, to=1000000, increment=500, textvariable=self.max_folders_var,
+                   width=8).pack(side=tk.LEFT, padx=2)
+        
+        # Mirror selection across categories that hold the same files
+        self.use_mirrors_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(limits_frame, text="Fastest mirror", variable=self.use_mirrors_var).pack(side=tk.LEFT, padx=10)
+        self.fallbacks_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(limits_frame, text="Fallback URLs", variable=self.fallbacks_var).pack(side=tk.LEFT)
+        
+        # Durations and resolutions from the files' headers, a few small requests per file
+        self.media_info_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(limits_frame, text="Media info", variable=self.media_info_var).pack(side=tk.LEFT, padx=10)
+        # cProfile and tracemalloc results in the run's performance report
+        self.profile_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(limits_frame, text="Profile", variable=self.profile_var).pack(side=tk.LEFT)
+        
+        # Progress frame
+        progress_frame = tk.LabelFrame(main_frame, text="Progress", padx=5, pady=5)
+        progress_frame.grid(row=7, column=0, columnspan=2, sticky=tk.EW, pady=10)
+        
+        self.progress_var = tk.DoubleVar()
+        self.progress_bar = ttk.Progressbar(progress_frame, variable=self.progress_var, maximum=100)
+        self.progress_bar.pack(fill=tk.X, expand=True, pady=5)
+        
+        self.status_var = tk.StringVar(value="Ready")
+        tk.Label(progress_frame, textvariable=self.status_var, wraplength=550).pack(fill=tk.X, expand=True)
+        
+        # Log frame
+        log_frame = tk.LabelFrame(main_frame, text="Log", padx=5, pady=5)
+        log_frame.grid(row=8, column=0, columnspan=2, sticky=tk.NSEW, pady=10)
+        
+        self.log_text = tk.Text(log_frame, height=10, width=70, wrap=tk.WORD)
+        self.log_text.pack(fill=tk.BOTH, expand=True)
+        
+        # Add scrollbar to log
+        scrollbar = tk.Scrollbar(log_frame, command=self.log_text.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.log_text.config(yscrollcommand=scrollbar.set)
+        
+        # Button frame
+        button_frame = tk.Frame(main_frame)
+        button_frame.grid(row=9, column=0, columnspan=2, pady=10)
+        
+        tk.Button(button_frame, text="Generate Playlist", command=self.generate_playlist).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Index Category", command=self.index_category).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Refresh Index", command=lambda: self.index_category(refresh=True)).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Stop", command=self.stop_search).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Exit", command=self.close).pack(side=tk.LEFT, padx=5)
+        
+        # Configure grid weights
+        main_frame.columnconfigure(1, weight=1)
+        main_frame.rowconfigure(8, weight=1)  # Updated to make the log frame expandable
+    
+    def browse_save_location(self):
+        directory = filedialog.askdirectory(
+            title="Select folder to save playlist",
+            initialdir=self.save_var.get()
+        )
+        if directory:
+            self.save_var.set(directory)
+    
+    def update_url_from_dropdown(self, event):
+        selected = self.url_dropdown.get()
+        if selected != "Select a category...":
+            # Extract the URL part after the hyphen
+            self.url_var.set(parse_category(selected)[1])
+    
+    def log_message(self, message):
+        self.ui_events.log(f"{datetime.now().strftime('%H:%M:%S')} - {message}")
+    
+    def update_status(self, message, log=True):
+        self.ui_events.status(message)
+        if log:
+            self.log_message(message)
+    
+    def update_progress(self, value=None, message=None):
+        if value is not None:
+            self.ui_events.progress(value)
+        if message is not None:
+            self.update_status(message)
+    
+    def show_dialog(self, kind, title, message):
+        """Show a messagebox from any thread once the main loop gets to it"""
+        self.ui_events.dialog(kind, title, message)
+    
+    def process_ui_events(self):
+        """Apply the updates posted since the last tick, then schedule the next one"""
+        try:
+            with get_run_metrics().stage("ui"):
+                self._apply_ui_events()
+        finally:
+            self.root.after(UI_REFRESH_MS, self.process_ui_events)
+    
+    def _apply_ui_events(self):
+        lines, dropped, status, progress, dialogs = self.ui_events.drain()
+        if progress is not None:
+            self.progress_var.set(progress)
+        if status is not None:
+            self.status_var.set(status)
+        if lines:
+            self.append_log_lines(lines, dropped)
+        for kind, title, message in dialogs:
+            if kind == "error":
+                messagebox.showerror(title, message)
+            else:
+                messagebox.showinfo(title, message)
+    
+    def append_log_lines(self, lines, dropped=0):
+        """Add lines to the log view in one insert and drop the oldest past LOG_MAX_LINES"""
+        if dropped:
+            # The ring buffer overflowed, so the new lines replace the whole view
+            self.log_text.delete("1.0", tk.END)
+            lines = [f"... {dropped} lines not shown"] + lines
+        self.log_text.insert(tk.END, "".join(line + "\n" for line in lines))
+        line_count = int(self.log_text.index("end-1c").split(".")[0]) - 1
+        if line_count > LOG_MAX_LINES:
+            self.log_text.delete("1.0", f"{line_count - LOG_MAX_LINES + 1}.0")
+        self.log_text.see(tk.END)
+    
+    def generate_playlist(self):
+        base_url = self.url_var.get().strip()
+        search_term = self.search_var.get().strip()
+        save_dir = self.save_var.get().strip()
+        all_categories = self.all_categories_var.get()
+        
+        if all_categories and search_term:
+            # Every saved category is searched, whatever is in the URL field
+            base_url = None
+        elif not base_url or not search_term:
+            tk.messagebox.showerror("Error", "Please enter both FTP URL and search term.")
+            return
+        
+        # Parse extensions
+        extensions = [ext.strip() for ext in self.extensions_var.get().split(',')]
+        
+        max_workers = self.get_max_workers()
+        cache = self.open_listing_cache()
+        fuzzy = self.fuzzy_var.get()
+        use_index = self.use_index_var.get() or fuzzy
+        engine = self.engine_var.get()
+        frontier = self.create_frontier()
+        stream = self.stream_var.get()
+        mirrors = (self.use_mirrors_var.get(), self.fallbacks_var.get())
+        media_info = self.media_info_var.get()
+        profile = self.profile_var.get()
+        if all_categories and use_index:
+            self.log_message("The local index covers one category; searching all categories online instead.")
+            use_index = False
+        checkpoint = None if use_index or all_categories else self.open_checkpoint(base_url, search_term,
+                                                                                  extensions, frontier)
+        
+        # Reset progress
+        self.update_progress(0, "Starting search...")
+        
+        # Run in a separate thread to keep UI responsive
+        import threading
+        threading.Thread(target=self._generate_playlist_thread, 
+                         args=(base_url, search_term, save_dir, extensions, max_workers, cache, use_index, engine,
+                               frontier, stream, mirrors, checkpoint, media_info, fuzzy, profile),
+                         daemon=True).start()
+    
+    def get_max_workers(self):
+        try:
+            return max(1, int(self.workers_var.get()))
+        except (tk.TclError, ValueError):
+            return DEFAULT_MAX_WORKERS
+    
+    def create_frontier(self):
+        """Create the crawl frontier of a new search from the crawl limit options"""
+        limits = []
+        for var, default in ((self.max_depth_var, DEFAULT_MAX_DEPTH), (self.max_folders_var, DEFAULT_MAX_FOLDERS)):
+            try:
+                limits.append(max(0, int(var.get())))
+            except (tk.TclError, ValueError):
+                limits.append(default)
+        return CrawlFrontier(*limits)
+    
+    def open_checkpoint(self, base_url, search_term, extensions, frontier):
+        """Return the checkpoint of a new search, offering to resume it if an earlier run was interrupted"""
+        checkpoint = SearchCheckpoint(base_url, search_term, extensions, frontier.max_depth, frontier.max_folders)
+        if checkpoint.load():
+            saved = datetime.fromtimestamp(checkpoint.saved_at).strftime('%Y-%m-%d %H:%M')
+            resume = messagebox.askyesno("Resume Search",
+                                         f"A search for '{search_term}' was interrupted on {saved} after "
+                                         f"scanning {len(checkpoint.scans)} folders.\n\n"
+                                         "Resume it? Choose No to start over.")
+            if not resume:
+                checkpoint.discard()
+        return checkpoint
+    
+    def open_listing_cache(self):
+        """Open the listing cache if enabled in the options, or return None"""
+        if not (self.use_cache_var.get() or self.offline_var.get()):
+            return None
+        try:
+            return ListingCache(offline=self.offline_var.get())
+        except Exception as e:
+            self.log_message(f"Listing cache unavailable: {str(e)}")
+            return None
+    
+    def index_category(self, refresh=False):
+        """Index every media file under the current URL for offline searches"""
+        base_url = self.url_var.get().strip()
+        if not base_url:
+            tk.messagebox.showerror("Error", "Please enter the FTP URL of the category to index.")
+            return
+        
+        max_workers = self.get_max_workers()
+        cache = self.open_listing_cache()
+        
+        self.update_progress(0, f"Indexing {base_url}...")
+        
+        import threading
+        threading.Thread(target=self._index_category_thread,
+                         args=(base_url, max_workers, cache, refresh),
+                         daemon=True).start()
+    
+    def _index_category_thread(self, base_url, max_workers, cache, refresh=False):
+        session = CrawlSession(pool_size=min(max_workers, DEFAULT_PER_HOST_LIMIT), cache=cache)
+        index = CategoryIndex()
+        try:
+            if refresh and index.file_count(base_url):
+                def refresh_progress(folder_count, added_count, removed_count, folder_url):
+                    self.update_status(f"Checked {folder_count} folders, +{added_count} -{removed_count}: {folder_url}",
+                                       log=False)
+                
+                diff = refresh_category(base_url, index, session, refresh_progress)
+                for file_info in diff['added']:
+                    self.log_message(f"New: {file_info['name']}")
+                for file_info in diff['removed']:
+                    self.log_message(f"Removed: {file_info['name']}")
+                message = f"Index refreshed: {len(diff['added'])} files added, {len(diff['removed'])} removed."
+            else:
+                def progress(folder_count, file_count, folder_url):
+                    self.update_status(f"Indexed {folder_count} folders, {file_count} files: {folder_url}", log=False)
+                
+                file_count = index_category(base_url, index, session, progress)
+                message = f"Indexed {file_count} media files."
+            
+            self.update_progress(100, message)
+            self.log_message(f"Connections: {session.report()}")
+            self.show_dialog("info", "Index Complete", message)
+        except Exception as e:
+            self.update_status(f"Error: {str(e)}")
+            self.show_dialog("error", "Error", f"An error occurred while indexing: {str(e)}")
+        finally:
+            index.close()
+            session.close()
+            if cache:
+                cache.close()
+    
+    def _search_index(self, base_url, search_term, extensions, fuzzy=False):
+        """Answer a search from the local index, or return None if the category is not indexed"""
+        index = CategoryIndex()
+        try:
+            if not index.file_count(base_url):
+                return None
+            if fuzzy:
+                all_file_info = index.fuzzy_search(base_url, search_term, extensions)
+            else:
+                all_file_info = index.search(base_url, search_term, extensions)
+            for file_info in all_file_info:
+                if fuzzy:
+                    self.log_message(f"Added: {file_info['name']} ({file_info['title']}, score {file_info['score']})")
+                else:
+                    self.log_message(f"Added: {file_info['name']}")
+            return all_file_info
+        finally:
+            index.close()
+    
+    def _crawl_all_categories(self, search_term, extensions, max_workers, session, frontier, playlist=None):
+        """Search every saved category at once, adding files in the order they arrive"""
+        import asyncio
+        categories = [parse_category(option) for option in self.url_options[1:]]
+        categories = [(name, url) for name, url in categories if url]
+        self.update_status(f"Searching {len(categories)} categories in parallel...")
+        
+        all_file_info = []
+        stop = threading.Event()
+        self.active_stop = stop
+        try:
+            for name, file_info in federated_search(categories, search_term, extensions, max_workers,
+                                                    session=session, max_depth=frontier.max_depth,
+                                                    max_folders=frontier.max_folders, stop=stop):
+                self.log_message(f"Added ({name}): {file_info['name']}")
+                if playlist is not None:
+                    playlist.add_files([file_info])
+                else:
+                    all_file_info.append(file_info)
+        finally:
+            self.active_stop = None
+        if stop.is_set():
+            raise asyncio.CancelledError()
+        
+        self.update_progress(75)
+        self.log_message(f"Connections: {session.report()}")
+        return all_file_info
+    
+    def _crawl_files(self, base_url, search_term, extensions, max_workers, session, engine="threads", frontier=None,
+                     playlist=None, checkpoint=None):
+        """Crawl the server for matching files, or return None if no folders were found
+        
+        With a StreamingPlaylistWriter, files go straight into the playlist and are not kept.
+        Without a base_url every saved category is searched. With a SearchCheckpoint, progress
+        is saved as the crawl goes and an interrupted crawl continues from the saved state.
+        """
+        if frontier is None:
+            frontier = CrawlFrontier()
+        if base_url is None:
+            return self._crawl_all_categories(search_term, extensions, max_workers, session, frontier, playlist)
+        if checkpoint is None:
+            return self._crawl_category(base_url, search_term, extensions, max_workers, session, engine,
+                                        frontier, playlist)
+        folders = checkpoint.restore(frontier)
+        if checkpoint.scans:
+            self.log_message(f"Resuming: {len(checkpoint.scans)} folders already scanned.")
+        with checkpoint.recording(frontier):
+            return self._crawl_category(base_url, search_term, extensions, max_workers, session, engine,
+                                        frontier, playlist, checkpoint, folders)
+    
+    def _crawl_category(self, base_url, search_term, extensions, max_workers, session, engine, frontier,
+                        playlist=None, checkpoint=None, folders=None):
+        all_file_info = []
+        folder_count = 0
+        
+        # Track URLs to avoid duplicates
+        processed_urls = set()
+        
+        def found_folders(folders):
+            nonlocal folder_count
+            folder_count = len(folders)
+            self.update_progress(25, f"Found {folder_count} folders. Searching for media files...")
+            self.update_status(f"Scanning {folder_count} folders ({min(max_workers, folder_count)} in parallel)...")
+            if checkpoint is not None:
+                checkpoint.record_folders(folders, frontier)
+        
+        def scanned_folder(i, folder, files_found):
+            self.update_status(f"Scanned folder {i+1}/{folder_count}: {folder}")
+            
+            # Only add files that haven't been processed yet and match the search term
+            new_files = []
+            for file_info in files_found:
+                if file_info['url'] not in processed_urls:
+                    processed_urls.add(file_info['url'])
+                    new_files.append(file_info)
+                    self.log_message(f"Added: {file_info['name']}")
+                else:
+                    self.log_message(f"Skipped (duplicate): {file_info['name']}")
+            
+            if playlist is not None:
+                playlist.add_files(new_files)
+            else:
+                all_file_info.extend(new_files)
+                    
+            self.update_progress(25 + (50 * (i+1) / folder_count))
+            if checkpoint is not None:
+                checkpoint.maybe_save(frontier)
+        
+        # Step 1: Find folders, Step 2: Find files in folders
+        self.update_status("Searching for matching folders...")
+        if engine == "asyncio":
+            crawler = AsyncCrawler(max_workers, cache=session.cache)
+            self.active_crawler = crawler
+            try:
+                with get_run_metrics().phase("crawl"):
+                    results = crawler.search(base_url, search_term, extensions, found_folders, scanned_folder,
+                                             frontier, folders)
+            finally:
+                self.active_crawler = None
+            if not results:
+                return None
+            self.log_message(f"Connections: {crawler.report()}")
+            self.log_message(f"Flow control: {crawler.limiter.report()}")
+        else:
+            if folders is None:
+                with get_run_metrics().phase("folder_search"):
+                    folders = get_folders_recursive(base_url, search_term, session, frontier)
+            if not folders:
+                return None
+            
+            found_folders(folders)
+            with get_run_metrics().phase("file_scan"):
+                for i, folder, files_found in scan_folders(folders, search_term, extensions,
+                                                           max_workers=max_workers, session=session,
+                                                           frontier=frontier):
+                    scanned_folder(i, folder, files_found)
+            self.log_message(f"Connections: {session.report()}")
+            self.log_message(f"Flow control: {session.limiter.report()}")
+        self.log_message(f"Folders: {frontier.report()}")
+        
+        return all_file_info
+    
+    def _probe_media(self, all_file_info, session, max_workers):
+        """Add durations and resolutions to the found files for #EXTINF and the titles."""
+        from ftp_m3u_metadata import MetadataCache, probe_media
+        
+        def probed(done, total, file_info):
+            self.update_progress(75 + 25 * done / total)
+            self.update_status(f"Read media info of {done}/{total} files", log=False)
+        
+        cache = MetadataCache()
+        try:
+            with get_run_metrics().phase("media_info"):
+                with_duration = probe_media(all_file_info, session, cache, max_workers, progress=probed)
+        finally:
+            cache.close()
+        self.log_message(f"Media info: {with_duration} of {len(all_file_info)} files have a duration")
+    
+    def _generate_playlist_thread(self, base_url, search_term, save_dir, extensions,
+                                  max_workers=DEFAULT_MAX_WORKERS, cache=None, use_index=False, engine="threads",
+                                  frontier=None, stream=False, mirrors=(False, False), checkpoint=None,
+                                  media_info=False, fuzzy=False, profile=False):
+        # Imported here, like the crawl classes do, so opening the window stays quick
+        import asyncio
+        # Every search writes a performance report; Profile adds cProfile/tracemalloc results
+        get_run_metrics().reset()
+        profiler = RunProfiler() if profile else None
+        if profiler:
+            profiler.start()
+        run = {'mode': "gui", 'source': base_url or "all categories", 'term': search_term,
+               'engine': "index" if use_index else engine, 'workers': max_workers, 'outcome': "finished"}
+        
+        # One pooled session for the whole crawl so listings reuse connections
+        session = CrawlSession(pool_size=min(max_workers, DEFAULT_PER_HOST_LIMIT), cache=cache)
+        if frontier is None:
+            frontier = CrawlFrontier()
+        self.active_search = (frontier, session, checkpoint)
+        playlist = None
+        try:
+            if use_index:
+                self.update_status("Searching local index...")
+                with get_run_metrics().phase("index_search"):
+                    all_file_info = self._search_index(base_url, search_term, extensions, fuzzy)
+                if all_file_info is None:
+                    self.update_status("This category has not been indexed yet.")
+                    self.show_dialog("info", "Search Complete",
+                                     "This category has not been indexed yet. Use 'Index Category' first.")
+                    return
+            elif stream:
+                # Entries are written as they are found and sorted once the crawl is done
+                playlist = StreamingPlaylistWriter(search_term.replace(" ", "_"), save_dir)
+                self.log_message(f"Streaming playlist to: {playlist.file_path}")
+                if media_info:
+                    self.log_message("Media info is not read for streamed playlists.")
+                found = self._crawl_files(base_url, search_term, extensions, max_workers, session, engine,
+                                          frontier, playlist, checkpoint)
+                
+                self.update_status(f"Sorting playlist with {playlist.count} files...")
+                file_count = run['results'] = playlist.count
+                playlist_path = playlist.finalize()
+                playlist = None
+                if found is None or not file_count:
+                    message = ("No matching folders found." if found is None
+                               else "No media files found matching your search term.")
+                    self.update_status(message)
+                    self.show_dialog("info", "Search Complete", message)
+                    return
+                
+                self.update_progress(100, f"Playlist created successfully at: {playlist_path}")
+                self.show_dialog("info", "Success",
+                                 f"Created playlist with {file_count} files.\n\nLocation: {playlist_path}")
+                return
+            else:
+                all_file_info = self._crawl_files(base_url, search_term, extensions, max_workers, session, engine,
+                                                  frontier, checkpoint=checkpoint)
+                if all_file_info is None:
+                    self.update_status("No matching folders found.")
+                    self.show_dialog("info", "Search Complete", "No matching folders found.")
+                    return
+            
+            run['results'] = len(all_file_info)
+            if not all_file_info:
+                self.update_status("No media files found matching your search term.")
+                self.show_dialog("info", "Search Complete", "No media files found matching your search term.")
+                return
+            
+            use_mirrors, fallbacks = mirrors
+            if use_mirrors:
+                self.update_status("Probing mirrors...")
+                changed = select_mirrors(all_file_info, session)
+                self.log_message(f"Switched {changed} entries to a faster mirror. Hosts: {session.health.report()}")
+            
+            if media_info:
+                self.update_status(f"Reading media info of {len(all_file_info)} files...")
+                self._probe_media(all_file_info, session, max_workers)
+            
+            # Step 3: Create playlist
+            self.update_status(f"Creating playlist with {len(all_file_info)} files...")
+            playlist_path = create_m3u(search_term.replace(" ", "_"), all_file_info, save_dir, fallbacks)
+            
+            self.update_progress(100, f"Playlist created successfully at: {playlist_path}")
+            
+            # Show success message
+            self.show_dialog("info", "Success",
+                             f"Created playlist with {len(all_file_info)} files.\n\nLocation: {playlist_path}")
+            
+        except asyncio.CancelledError:
+            run['outcome'] = "stopped"
+            if checkpoint is not None and checkpoint.saved_at:
+                self.update_status("Search stopped. Start it again to resume where it stopped.")
+            else:
+                self.update_status("Search stopped.")
+        except Exception as e:
+            run['outcome'] = "error"
+            self.update_status(f"Error: {str(e)}")
+            self.show_dialog("error", "Error", f"An error occurred: {str(e)}")
+        finally:
+            self.active_search = None
+            if playlist is not None:
+                # Keep what was streamed so far, unsorted
+                playlist.abort()
+                self.log_message(f"Partial playlist kept at: {playlist.file_path}")
+            session.close()
+            if cache:
+                cache.close()
+            self._write_run_report(run, profiler)
+    
+    def _write_run_report(self, run, profiler=None):
+        report_path = new_run_report_path()
+        try:
+            profile = profiler.stop(os.path.splitext(report_path)[0] + ".prof") if profiler else None
+            write_run_report(run, report_path, profile=profile)
+            self.log_message(f"Performance report: {report_path} ({get_run_metrics().report()})")
+        except OSError as e:
+            self.log_message(f"Error writing performance report: {str(e)}")
+    
+    def stop_search(self):
+        """Stop the running search and abort its requests"""
+        active_search = self.active_search
+        if active_search is None:
+            self.log_message("No search is running.")
+            return
+        
+        self.update_status("Stopping search...")
+        frontier, session, _ = active_search
+        frontier.cancel()
+        session.cancel()
+        if self.active_crawler is not None:
+            self.active_crawler.cancel()
+        if self.active_stop is not None:
+            self.active_stop.set()
+    
+    def close(self):
+        """Stop any running search, saving its checkpoint so it can be resumed, and exit"""
+        active_search = self.active_search
+        if active_search is not None:
+            frontier, _, checkpoint = active_search
+            self.stop_search()
+            # The search thread is a daemon and dies with the window, so save here
+            if checkpoint is not None and checkpoint.folders is not None:
+                try:
+                    checkpoint.save(frontier)
+                except OSError:
+                    pass
+        self.root.destroy()
+
+def run_gui():
+    """Open the main window and run the Tk event loop."""
+    root = tk.Tk()
+    app = FTPPlaylistGeneratorApp(root)
+    root.mainloop()
@@ -0,0 +1,392 @@
+"""Media header probing for the FTP M3U Playlist Generator: durations and resolutions for #EXTINF.
+
+Only the container header of each file is read, with small HTTP Range requests: the
+moov box of MP4/MOV, the Info and Tracks elements of Matroska/WebM and the avih chunk
+of AVI. Results are cached by URL, size and modification time.
+"""
+import os
+import re
+import time
+import struct
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from ftp_m3u_generator import DEFAULT_MAX_WORKERS, get_app_data_dir, get_shared_session
+
+# Bytes per Range request, and the most one file may cost before it is given up on
+PROBE_BLOCK_SIZE = 64 * 1024
+PROBE_MAX_BYTES = 1024 * 1024
+PROBE_MAX_REQUESTS = 8
+PROBE_TIMEOUT = 10
+PROBE_SUFFIXES = (".mp4", ".m4v", ".mov", ".mkv", ".webm", ".avi")
+
+CONTENT_RANGE_PATTERN = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+
+# Matroska element IDs (with their length marker bits)
+EBML_SEGMENT = 0x18538067
+EBML_SEEK_HEAD = 0x114D9B74
+EBML_SEEK = 0x4DBB
+EBML_SEEK_ID = 0x53AB
+EBML_SEEK_POSITION = 0x53AC
+EBML_INFO = 0x1549A966
+EBML_TIMECODE_SCALE = 0x2AD7B1
+EBML_DURATION = 0x4489
+EBML_TRACKS = 0x1654AE6B
+EBML_TRACK_ENTRY = 0xAE
+EBML_TRACK_TYPE = 0x83
+EBML_VIDEO = 0xE0
+EBML_PIXEL_WIDTH = 0xB0
+EBML_PIXEL_HEIGHT = 0xBA
+EBML_CLUSTER = 0x1F43B675
+
+class MediaProbeError(Exception):
+    """Raised for a file whose header cannot be read: unknown format, damaged or too costly."""
+
+class RangeReader:
+    """Random access to a remote file through HTTP Range requests, fetched in aligned blocks.
+
+    Raises MediaProbeError once a file needs more than max_bytes or max_requests, or
+    if a read past the first block hits a server that ignores Range.
+    """
+
+    def __init__(self, session, url, block_size=PROBE_BLOCK_SIZE, max_bytes=PROBE_MAX_BYTES,
+                 max_requests=PROBE_MAX_REQUESTS, timeout=PROBE_TIMEOUT):
+        self.session = session
+        self.url = url
+        self.block_size = block_size
+        self.max_bytes = max_bytes
+        self.max_requests = max_requests
+        self.timeout = timeout
+        self.size = None
+        self.requests = 0
+        self.bytes_read = 0
+        self._blocks = {}
+
+    def read(self, offset, length):
+        """Return up to length bytes at offset (fewer at the end of the file)."""
+        if self.size is not None:
+            length = min(length, self.size - offset)
+        if length <= 0:
+            return b""
+        first = offset // self.block_size
+        last = (offset + length - 1) // self.block_size
+        missing = [block for block in range(first, last + 1) if block not in self._blocks]
+        if missing:
+            self._fetch(missing[0], missing[-1])
+        data = b"".join(self._blocks.get(block, b"") for block in range(first, last + 1))
+        start = offset - first * self.block_size
+        return data[start:start + length]
+
+    def _fetch(self, first, last):
+        start = first * self.block_size
+        end = (last + 1) * self.block_size - 1
+        if self.requests >= self.max_requests or self.bytes_read + end - start + 1 > self.max_bytes:
+            raise MediaProbeError(f"header of {self.url} is larger than the probe limit")
+        self.requests += 1
+
+        with self.session.get(self.url, self.timeout, headers={'Range': f"bytes={start}-{end}"},
+                              stream=True) as response:
+            if response.status_code == 416:
+                # Past the end of the file
+                for block in range(first, last + 1):
+                    self._blocks[block] = b""
+                return
+            if response.status_code == 200:
+                if start:
+                    raise MediaProbeError(f"{urlparse(self.url).netloc} does not support range requests")
+                length = response.headers.get('Content-Length')
+                self.size = int(length) if length and length.isdigit() else self.size
+            elif response.status_code == 206:
+                match = CONTENT_RANGE_PATTERN.search(response.headers.get('Content-Range', ""))
+                if match and match.group(3) != "*":
+                    self.size = int(match.group(3))
+            else:
+                raise OSError(f"HTTP {response.status_code} for {self.url}")
+
+            # A server ignoring Range sends the whole file; only the requested part is read
+            wanted = end - start + 1
+            chunks = []
+            received = 0
+            for chunk in response.iter_content(self.block_size):
+                chunks.append(chunk)
+                received += len(chunk)
+                if received >= wanted:
+                    break
+        data = b"".join(chunks)[:wanted]
+        self.bytes_read += len(data)
+        for block in range(first, last + 1):
+            offset = (block - first) * self.block_size
+            self._blocks[block] = data[offset:offset + self.block_size]
+
+def _mp4_boxes(reader, start, end):
+    # Yield (type, payload start, payload end) for the boxes between start and end
+    offset = start
+    while end is None or offset + 8 <= end:
+        header = reader.read(offset, 16)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if size == 1 and len(header) == 16:
+            size = struct.unpack(">Q", header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            # Box runs to the end of its parent (or of the file)
+            parent_end = end if end is not None else reader.size
+            if parent_end is None:
+                yield box_type, offset + header_size, None
+                return
+            size = parent_end - offset
+        if size < header_size:
+            raise MediaProbeError("damaged MP4 box header")
+        yield box_type, offset + header_size, offset + size
+        offset += size
+
+def parse_mp4(reader):
+    """Return {'duration', 'width', 'height'} from the moov box of an MP4/MOV file."""
+    info = {'duration': None, 'width': None, 'height': None}
+    for box_type, start, end in _mp4_boxes(reader, 0, reader.size):
+        if box_type != b"moov":
+            continue
+        for child, child_start, child_end in _mp4_boxes(reader, start, end):
+            if child == b"mvhd":
+                data = reader.read(child_start, 32)
+                if data[:1] == b"\x01":
+                    timescale, duration = struct.unpack(">IQ", data[20:32])
+                else:
+                    timescale, duration = struct.unpack(">II", data[12:20])
+                if timescale:
+                    info['duration'] = duration / timescale
+            elif child == b"trak" and info['width'] is None:
+                # tkhd comes first in a track; audio tracks have a zero size
+                for track_box, track_start, _ in _mp4_boxes(reader, child_start, child_end):
+                    if track_box == b"tkhd":
+                        data = reader.read(track_start, 96)
+                        offset = 88 if data[:1] == b"\x01" else 76
+                        if len(data) >= offset + 8:
+                            width, height = struct.unpack(">II", data[offset:offset + 8])
+                            if width and height:
+                                info['width'], info['height'] = width >> 16, height >> 16
+                    break
+            if info['duration'] is not None and info['width'] is not None:
+                break
+        return info
+    raise MediaProbeError("no moov box found")
+
+def _read_vint(data, pos, keep_marker):
+    # Return (value, length) of an EBML variable-length integer; value None means "unknown size"
+    if pos >= len(data):
+        raise MediaProbeError("truncated EBML header")
+    first = data[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8 or pos + length > len(data):
+        raise MediaProbeError("damaged EBML header")
+    value = first if keep_marker else first & (mask - 1)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        return None, length
+    return value, length
+
+def _ebml_elements(reader, start, end):
+    # Yield (id, payload start, payload end) for the elements between start and end
+    offset = start
+    while end is None or offset < end:
+        header = reader.read(offset, 12)
+        if not header:
+            return
+        element_id, id_length = _read_vint(header, 0, keep_marker=True)
+        size, size_length = _read_vint(header, id_length, keep_marker=False)
+        payload = offset + id_length + size_length
+        payload_end = None if size is None else payload + size
+        yield element_id, payload, payload_end
+        if payload_end is None:
+            return
+        offset = payload_end
+
+def _ebml_children(data):
+    # Yield (id, payload bytes) for the elements of an in-memory EBML master element
+    pos = 0
+    while pos < len(data):
+        element_id, id_length = _read_vint(data, pos, keep_marker=True)
+        size, size_length = _read_vint(data, pos + id_length, keep_marker=False)
+        start = pos + id_length + size_length
+        end = len(data) if size is None else start + size
+        yield element_id, data[start:end]
+        pos = end
+
+def _ebml_uint(data):
+    return int.from_bytes(data, "big") if data else 0
+
+def _parse_mkv_info(data, info):
+    scale = 1000000
+    duration = None
+    for element_id, payload in _ebml_children(data):
+        if element_id == EBML_TIMECODE_SCALE:
+            scale = _ebml_uint(payload) or scale
+        elif element_id == EBML_DURATION and len(payload) in (4, 8):
+            duration = struct.unpack(">f" if len(payload) == 4 else ">d", payload)[0]
+    if duration is not None:
+        info['duration'] = duration * scale / 1e9
+
+def _parse_mkv_tracks(data, info):
+    for element_id, entry in _ebml_children(data):
+        if element_id != EBML_TRACK_ENTRY:
+            continue
+        fields = dict(_ebml_children(entry))
+        if _ebml_uint(fields.get(EBML_TRACK_TYPE, b"")) != 1 or EBML_VIDEO not in fields:
+            continue
+        video = dict(_ebml_children(fields[EBML_VIDEO]))
+        width = _ebml_uint(video.get(EBML_PIXEL_WIDTH, b""))
+        height = _ebml_uint(video.get(EBML_PIXEL_HEIGHT, b""))
+        if width and height:
+            info['width'], info['height'] = width, height
+            return
+
+def parse_mkv(reader):
+    """Return {'duration', 'width', 'height'} from the Info and Tracks elements of a Matroska/WebM file."""
+    info = {'duration': None, 'width': None, 'height': None}
+    parsers = {EBML_INFO: _parse_mkv_info, EBML_TRACKS: _parse_mkv_tracks}
+    for element_id, start, end in _ebml_elements(reader, 0, None):
+        if element_id != EBML_SEGMENT:
+            continue
+        done = set()
+        positions = {}
+        for child, child_start, child_end in _ebml_elements(reader, start, end):
+            if child in parsers and child_end is not None:
+                parsers[child](reader.read(child_start, child_end - child_start), info)
+                done.add(child)
+            elif child == EBML_SEEK_HEAD and child_end is not None:
+                for seek_id, seek in _ebml_children(reader.read(child_start, child_end - child_start)):
+                    if seek_id == EBML_SEEK:
+                        fields = dict(_ebml_children(seek))
+                        positions[_ebml_uint(fields.get(EBML_SEEK_ID, b""))] = \
+                            start + _ebml_uint(fields.get(EBML_SEEK_POSITION, b""))
+            elif child == EBML_CLUSTER:
+                # Media data from here on; anything still missing is found through the SeekHead
+                break
+            if len(done) == len(parsers):
+                break
+
+        for element, position in positions.items():
+            if element in parsers and element not in done:
+                for child, child_start, child_end in _ebml_elements(reader, position, None):
+                    if child == element and child_end is not None:
+                        parsers[child](reader.read(child_start, child_end - child_start), info)
+                    break
+        return info
+    raise MediaProbeError("no Matroska segment found")
+
+def parse_avi(reader):
+    """Return {'duration', 'width', 'height'} from the main AVI header (avih)."""
+    data = reader.read(0, 1024)
+    pos = data.find(b"avih")
+    if pos < 0 or len(data) < pos + 48:
+        raise MediaProbeError("no AVI main header found")
+    (micro_sec_per_frame, _, _, _, total_frames, _, _, _,
+     width, height) = struct.unpack("<10I", data[pos + 8:pos + 48])
+    return {
+        'duration': total_frames * micro_sec_per_frame / 1e6 if micro_sec_per_frame else None,
+        'width': width or None,
+        'height': height or None,
+    }
+
+def probe_url(url, session=None):
+    """Read a media file's container header and return {'duration', 'width', 'height'}.
+
+    Raises MediaProbeError if the file cannot be understood, or the session's errors if
+    it cannot be fetched.
+    """
+    reader = RangeReader(session or get_shared_session(), url)
+    head = reader.read(0, 12)
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return parse_mkv(reader)
+    if head[4:8] in (b"ftyp", b"moov", b"free", b"mdat", b"wide", b"skip"):
+        return parse_mp4(reader)
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return parse_avi(reader)
+    raise MediaProbeError("unknown container format")
+
+class MetadataCache:
+    """On-disk cache of probed media headers keyed by URL, size and modification time.
+
+    Files that could not be understood are cached too, so they are not probed again
+    until they change.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_app_data_dir(), "media_metadata.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS media ("
+            "url TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, duration REAL, width INTEGER, height INTEGER, "
+            "probed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, file_info):
+        """Return the cached header info of a file dict, or None if it changed or was never probed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime, duration, width, height FROM media WHERE url = ?", (file_info['url'],)
+            ).fetchone()
+        if row is None or (row[0], row[1]) != (file_info.get('size'), file_info.get('mtime')):
+            return None
+        return {'duration': row[2], 'width': row[3], 'height': row[4]}
+
+    def put(self, file_info, info):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_info['url'], file_info.get('size'), file_info.get('mtime'), info['duration'],
+                 info['width'], info['height'], time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def probe_media(file_info_list, session=None, cache=None, max_workers=DEFAULT_MAX_WORKERS, progress=None):
+    """Add 'duration', 'width' and 'height' to file dicts by reading their container headers.
+
+    Files are probed in parallel, as many at a time per host as the session's HostLimiter
+    allows, and looked up in the MetadataCache first. Files that cannot be read keep None values.
+    progress(done, total, file_info) is called as files finish. Returns the number of
+    files that got a duration.
+    """
+    if session is None:
+        session = get_shared_session()
+    def probe(file_info):
+        info = cache.get(file_info) if cache else None
+        if info is None and file_info['name'].lower().endswith(PROBE_SUFFIXES):
+            try:
+                info = probe_url(file_info['url'], session)
+            except MediaProbeError as e:
+                print(f"Cannot read media info of {file_info['name']}: {str(e)}")
+                info = {'duration': None, 'width': None, 'height': None}
+            except Exception as e:
+                # Network trouble is not cached, so the file is tried again next time
+                print(f"Error probing {file_info['url']}: {str(e)}")
+                return file_info
+            if cache:
+                cache.put(file_info, info)
+        if info is not None:
+            file_info.update(info)
+        return file_info
+
+    with_duration = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for done, file_info in enumerate(executor.map(probe, file_info_list), 1):
+            if file_info.get('duration'):
+                with_duration += 1
+            if progress:
+                progress(done, len(file_info_list), file_info)
+    return with_duration
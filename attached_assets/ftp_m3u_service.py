@@ -0,0 +1,296 @@
+"""Headless HTTP job service of the FTP M3U Playlist Generator (--serve)."""
+import os
+import json
+import time
+import uuid
+import queue
+import shutil
+import threading
+from collections import defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+from ftp_m3u_generator import (
+    DEFAULT_MAX_DEPTH, DEFAULT_MAX_FOLDERS, METRICS_PREFIX, CrawlFrontier, CrawlSession, create_m3u,
+    get_app_data_dir, get_folders_recursive, get_metrics_registry, media_suffixes, normalize_url, scan_folders,
+)
+
+# Headless service: address, worker threads, pending job limit and how many
+# finished jobs are kept for status/result requests
+DEFAULT_SERVICE_HOST = "127.0.0.1"
+DEFAULT_SERVICE_PORT = 8080
+DEFAULT_SERVICE_WORKERS = 4
+DEFAULT_SERVICE_QUEUE = 32
+SERVICE_KEEP_JOBS = 200
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+# Content type of the Prometheus text exposition format served at /metrics, and the
+# host limiter's per-host state exported there as gauges (name, snapshot key, help)
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+HOST_LIMIT_GAUGES = [
+    ("host_request_slots", 'limit', "Requests the host limiter lets run at once against the host"),
+    ("host_rate_limit", 'rate', "Requests per second allowed to the host since it throttled us"),
+    ("host_timeout_seconds", 'timeout', "Listing timeout picked from the host's latency"),
+]
+
+class PlaylistJobService:
+    """Playlist jobs run by a pool of worker threads for the headless HTTP service.
+    
+    Jobs wait in a bounded queue; submit() raises queue.Full when it is full. A job
+    identical to one still queued or running (same normalized URL, search term and
+    extensions) is not queued again: the caller gets the existing job. All jobs crawl
+    through one CrawlSession, so they share its connections, listing cache and
+    in-flight listing fetches. Playlists are written under jobs_dir, one folder per job.
+    """
+    
+    def __init__(self, workers=DEFAULT_SERVICE_WORKERS, queue_size=DEFAULT_SERVICE_QUEUE, cache=None,
+                 jobs_dir=None, keep_jobs=SERVICE_KEEP_JOBS):
+        self.jobs_dir = jobs_dir or os.path.join(get_app_data_dir(), "jobs")
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.keep_jobs = keep_jobs
+        self.session = CrawlSession(cache=cache)
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active = {}
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(max(1, workers))]
+        for worker in self._workers:
+            worker.start()
+    
+    def submit(self, base_url, search_term, extensions=None, max_depth=DEFAULT_MAX_DEPTH,
+               max_folders=DEFAULT_MAX_FOLDERS):
+        """Queue a playlist job and return (job, created); created is False for a duplicate."""
+        suffixes = media_suffixes(extensions)
+        key = (normalize_url(base_url), search_term.strip().lower(), suffixes)
+        with self._lock:
+            active_id = self._active.get(key)
+            if active_id is not None:
+                return self._public(self._jobs[active_id]), False
+            
+            job = {
+                'id': uuid.uuid4().hex,
+                'url': base_url,
+                'term': search_term.strip(),
+                'extensions': list(suffixes),
+                'max_depth': max_depth,
+                'max_folders': max_folders,
+                'status': 'queued',
+                'folders': 0,
+                'files': 0,
+                'error': None,
+                'playlist': None,
+                'submitted': time.time(),
+                'started': None,
+                'finished': None,
+            }
+            self._queue.put_nowait(job['id'])
+            self._jobs[job['id']] = job
+            self._active[key] = job['id']
+            job['key'] = key
+            return self._public(job), True
+    
+    def status(self, job_id):
+        """Return the public state of a job, or None if it is unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._public(job) if job else None
+    
+    def result_path(self, job_id):
+        """Return the playlist file of a finished job, or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job['playlist'] if job and job['status'] == 'done' else None
+    
+    def result_files(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return list(job.get('file_info', [])) if job and job['status'] == 'done' else None
+    
+    def _public(self, job):
+        return {k: v for k, v in job.items() if k not in ('key', 'file_info')}
+    
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                job = self._jobs[job_id]
+                job['status'] = 'running'
+                job['started'] = time.time()
+            try:
+                self._run(job)
+            except Exception as e:
+                with self._lock:
+                    job['status'] = 'failed'
+                    job['error'] = str(e)
+            finally:
+                with self._lock:
+                    job['finished'] = time.time()
+                    self._active.pop(job['key'], None)
+                    self._forget_old_jobs()
+                self._queue.task_done()
+    
+    def _run(self, job):
+        frontier = CrawlFrontier(job['max_depth'], job['max_folders'])
+        folders = get_folders_recursive(job['url'], job['term'], self.session, frontier)
+        with self._lock:
+            job['folders'] = len(folders)
+        
+        all_file_info = []
+        processed_urls = set()
+        for _, _, files_found in scan_folders(folders, job['term'], job['extensions'],
+                                              session=self.session, frontier=frontier):
+            for file_info in files_found:
+                if file_info['url'] not in processed_urls:
+                    processed_urls.add(file_info['url'])
+                    all_file_info.append(file_info)
+            with self._lock:
+                job['files'] = len(all_file_info)
+        
+        playlist_path = None
+        if all_file_info:
+            playlist_path = create_m3u(job['term'].replace(" ", "_"), all_file_info,
+                                       os.path.join(self.jobs_dir, job['id']))
+        with self._lock:
+            job['file_info'] = all_file_info
+            job['playlist'] = playlist_path
+            job['status'] = 'done'
+    
+    def _forget_old_jobs(self):
+        # Drop the oldest finished jobs (and their playlist folders) past keep_jobs; a folder
+        # that cannot be removed is left behind rather than stopping the worker thread
+        finished = sorted((job for job in self._jobs.values() if job['finished']), key=lambda job: job['finished'])
+        for job in finished[:max(0, len(finished) - self.keep_jobs)]:
+            del self._jobs[job['id']]
+            shutil.rmtree(os.path.join(self.jobs_dir, job['id']), ignore_errors=True)
+    
+    def stats(self):
+        with self._lock:
+            counts = defaultdict(int)
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+        return {'queued': self._queue.qsize(), 'jobs': dict(counts), 'connections': self.session.report(),
+                'hosts': self.session.limiter.snapshot()}
+    
+    def metrics(self):
+        """Return the crawl metrics and the service's job gauges in the Prometheus text format."""
+        stats = self.stats()
+        lines = [
+            f"# HELP {METRICS_PREFIX}_service_queue_length Jobs waiting for a worker",
+            f"# TYPE {METRICS_PREFIX}_service_queue_length gauge",
+            f"{METRICS_PREFIX}_service_queue_length {stats['queued']}",
+            f"# HELP {METRICS_PREFIX}_service_jobs Jobs kept by the service by status",
+            f"# TYPE {METRICS_PREFIX}_service_jobs gauge",
+        ]
+        lines += [f'{METRICS_PREFIX}_service_jobs{{status="{status}"}} {stats["jobs"].get(status, 0)}'
+                  for status in JOB_STATUSES]
+        for name, key, help_text in HOST_LIMIT_GAUGES:
+            lines += [f"# HELP {METRICS_PREFIX}_{name} {help_text}", f"# TYPE {METRICS_PREFIX}_{name} gauge"]
+            lines += [f'{METRICS_PREFIX}_{name}{{host="{host}"}} {state[key]}'
+                      for host, state in stats['hosts'].items() if state[key] is not None]
+        return get_metrics_registry().exposition() + "\n".join(lines) + "\n"
+    
+    def close(self):
+        self.session.close()
+
+class PlaylistServiceHandler(BaseHTTPRequestHandler):
+    """JSON API of the playlist service.
+    
+    POST /jobs                   {"url", "term", "extensions", "max_depth", "max_folders"} -> 202 job
+    GET  /jobs/<id>              job status
+    GET  /jobs/<id>/result       the M3U playlist (?format=json for the file list)
+    GET  /health                 queue and job counts, per-host limits
+    GET  /metrics                crawl and job metrics for Prometheus
+    """
+    
+    server_version = "FTPPlaylistGenerator"
+    
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send_json(404, {'error': "not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            base_url = request['url']
+            search_term = request['term']
+            if not base_url or not search_term:
+                raise ValueError("url and term must not be empty")
+            extensions = request.get('extensions')
+            if isinstance(extensions, str):
+                extensions = [ext.strip() for ext in extensions.split(",")]
+            max_depth = int(request.get('max_depth', DEFAULT_MAX_DEPTH))
+            max_folders = int(request.get('max_folders', DEFAULT_MAX_FOLDERS))
+        except (ValueError, KeyError, TypeError) as e:
+            return self._send_json(400, {'error': f"bad request: {str(e)}"})
+        
+        try:
+            job, created = self.server.service.submit(base_url, search_term, extensions, max_depth, max_folders)
+        except queue.Full:
+            return self._send_json(503, {'error': "job queue is full, try again later"})
+        self._send_json(202 if created else 200, job)
+    
+    def do_GET(self):
+        parts = urlparse(self.path)
+        segments = [segment for segment in parts.path.split("/") if segment]
+        service = self.server.service
+        
+        if segments == ["health"]:
+            return self._send_json(200, service.stats())
+        if segments == ["metrics"]:
+            body = service.metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if len(segments) == 2 and segments[0] == "jobs":
+            job = service.status(segments[1])
+            return self._send_json(200, job) if job else self._send_json(404, {'error': "unknown job"})
+        if len(segments) == 3 and segments[0] == "jobs" and segments[2] == "result":
+            job = service.status(segments[1])
+            if job is None:
+                return self._send_json(404, {'error': "unknown job"})
+            if job['status'] != 'done':
+                return self._send_json(409, {'error': f"job is {job['status']}", 'job': job})
+            if "format=json" in parts.query:
+                return self._send_json(200, service.result_files(segments[1]))
+            
+            path = service.result_path(segments[1])
+            body = b"#EXTM3U\n"
+            if path:
+                with open(path, "rb") as f:
+                    body = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/x-mpegurl; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self._send_json(404, {'error': "not found"})
+    
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+def run_service(host=DEFAULT_SERVICE_HOST, port=DEFAULT_SERVICE_PORT, workers=DEFAULT_SERVICE_WORKERS,
+                queue_size=DEFAULT_SERVICE_QUEUE, cache=None):
+    """Serve the playlist job API until interrupted."""
+    service = PlaylistJobService(workers, queue_size, cache)
+    server = ThreadingHTTPServer((host, port), PlaylistServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    print(f"Playlist service listening on http://{host}:{server.server_port}/ ({workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping service...")
+    finally:
+        server.server_close()
+        service.close()
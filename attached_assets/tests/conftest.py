@@ -0,0 +1,80 @@
+"""Shared fixtures: the modules next to this folder on sys.path, a private app data
+folder per test, and a small autoindex server whose tree and answers a test can change."""
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import quote, unquote, urlparse
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def app_data(tmp_path, monkeypatch):
+    # get_app_data_dir() lives under APPDATA (or HOME), so caches and indexes stay in tmp_path
+    monkeypatch.setenv("APPDATA", str(tmp_path))
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
+
+class ListingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        path = unquote(urlparse(self.path).path)
+        with server.lock:
+            server.requests.append(path)
+            scripted = server.script.pop(0) if server.script else None
+        if scripted is not None:
+            status, headers = scripted
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        names = server.tree.get(path)
+        if names is None:
+            body = b"not found"
+            self.send_response(404)
+        else:
+            links = "".join(f'<a href="{quote(name)}">{name}</a>\n' for name in names)
+            body = (f"<html><head><title>Index of {path}</title></head><body><h1>Index of {path}</h1>"
+                    f'<pre><a href="../">../</a>\n{links}</pre></body></html>').encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ListingServer(ThreadingHTTPServer):
+    """Serves tree ({folder path: [entry names, folders ending in /]}) as autoindex pages.
+
+    Requests answer the (status, headers) pairs queued in script first, one each.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ListingHandler)
+        self.tree = {}
+        self.script = []
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def url(self, path="/"):
+        return f"http://127.0.0.1:{self.server_port}{quote(path)}"
+
+@pytest.fixture
+def listing_server():
+    server = ListingServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,31 @@
+import pytest
+
+from ftp_m3u_generator import CategoryIndex, CrawlSession, HostHealth, HostLimiter, index_category, refresh_category
+
+def episodes(*numbers):
+    return [f"Quiet.Harbor.S01E{number:02d}.mkv" for number in numbers]
+
+@pytest.fixture
+def session():
+    session = CrawlSession(health=HostHealth(), limiter=HostLimiter())
+    yield session
+    session.close()
+
+def test_refresh_keeps_search_rows_in_step_with_files(listing_server, session, tmp_path):
+    listing_server.tree = {"/TV/": ["Quiet Harbor/"], "/TV/Quiet Harbor/": episodes(1, 2, 3)}
+    category = listing_server.url("/TV/")
+    index = CategoryIndex(str(tmp_path / "index.sqlite3"))
+    try:
+        assert index_category(category, index, session) == 3
+
+        # Files still listed are stored again under new ids on every refresh of their folder
+        for current in (episodes(1, 2, 4), episodes(1, 4, 5)):
+            listing_server.tree["/TV/Quiet Harbor/"] = current
+            refresh_category(category, index, session)
+
+            files = index._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            search_rows = index._conn.execute("SELECT COUNT(*) FROM files_fts").fetchone()[0]
+            assert files == search_rows == len(current)
+            assert sorted(f['name'] for f in index.search(category, "Quiet Harbor", [".mkv"])) == current
+    finally:
+        index.close()
@@ -0,0 +1,25 @@
+import builtins
+import sys
+
+import ftp_m3u_gui
+from ftp_m3u_generator import main
+
+EPISODES = ["Quiet.Harbor.S01E01.mkv", "Quiet.Harbor.S01E02.mkv"]
+
+def test_streamed_cli_playlist_lists_each_file_once(listing_server, tmp_path, monkeypatch):
+    # The folder search returns the show folder and its season folder, whose scans overlap
+    listing_server.tree = {
+        "/TV/": ["Quiet Harbor/"],
+        "/TV/Quiet Harbor/": ["Quiet Harbor S01/"],
+        "/TV/Quiet Harbor/Quiet Harbor S01/": EPISODES,
+    }
+    answers = iter([listing_server.url("/TV/"), "Quiet Harbor"])
+    monkeypatch.setattr(builtins, "input", lambda prompt="": next(answers))
+    monkeypatch.setattr(ftp_m3u_gui, "open_save_dialog", lambda: str(tmp_path))
+    monkeypatch.setattr(sys, "argv", ["ftp_m3u_generator.py", "--cli", "--stream"])
+
+    main()
+
+    [playlist] = tmp_path.glob("*.m3u")
+    urls = [line for line in playlist.read_text(encoding="utf-8").splitlines() if line.startswith("http")]
+    assert sorted(url.rsplit("/", 1)[1] for url in urls) == EPISODES
@@ -0,0 +1,35 @@
+import pytest
+
+from ftp_m3u_benchmark import BenchmarkServer, SyntheticTree
+from ftp_m3u_generator import (
+    AsyncCrawler, CrawlFrontier, CrawlSession, HostHealth, HostLimiter, get_folders_recursive, scan_folders,
+)
+
+EXTENSIONS = [".mkv", ".mp4"]
+
+def threads_search(url, term):
+    session = CrawlSession(health=HostHealth(), limiter=HostLimiter())
+    frontier = CrawlFrontier()
+    try:
+        folders = get_folders_recursive(url, term, session, frontier)
+        return [f for _, _, files in scan_folders(folders, term, EXTENSIONS, session=session, frontier=frontier)
+                for f in files]
+    finally:
+        session.close()
+
+def asyncio_search(url, term):
+    crawler = AsyncCrawler(health=HostHealth(), limiter=HostLimiter())
+    return [f for _, _, files in crawler.search(url, term, EXTENSIONS, frontier=CrawlFrontier()) for f in files]
+
+@pytest.mark.parametrize("layout", ["series", "movies"])
+def test_engines_find_the_same_files(layout):
+    tree = SyntheticTree(layout, fanout=4, depth=3, entries=6)
+    with BenchmarkServer(tree, latency_ms=0, jitter_ms=0) as server:
+        threads_files = threads_search(server.url, tree.target)
+        asyncio_files = asyncio_search(server.url, tree.target)
+
+    assert threads_files
+    assert {f['url'] for f in asyncio_files} == {f['url'] for f in threads_files}
+    by_url = {f['url']: f for f in threads_files}
+    for file_info in asyncio_files:
+        assert file_info == by_url[file_info['url']]
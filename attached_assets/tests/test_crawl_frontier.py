@@ -0,0 +1,46 @@
+import pytest
+
+from ftp_m3u_generator import CrawlFrontier, CrawlSession, HostHealth, HostLimiter, get_file_links
+
+EPISODES = ["Quiet.Harbor.S01E01.mkv", "Quiet.Harbor.S01E02.mkv"]
+
+@pytest.fixture
+def session():
+    session = CrawlSession(health=HostHealth(), limiter=HostLimiter())
+    yield session
+    session.close()
+
+def test_folder_reached_closer_to_the_start_is_scanned_again(listing_server, session):
+    listing_server.tree = {
+        "/TV/": ["Quiet Harbor/"],
+        "/TV/Quiet Harbor/": ["Quiet Harbor S01/"],
+        "/TV/Quiet Harbor/Quiet Harbor S01/": EPISODES,
+    }
+    frontier = CrawlFrontier(max_depth=1)
+
+    # From /TV/ the show folder is at the depth limit, so its season folder is left out
+    assert get_file_links(listing_server.url("/TV/"), "Quiet Harbor", [".mkv"], session, frontier=frontier) == []
+    # As a folder of its own it starts at depth 0 and may descend into the season
+    files = get_file_links(listing_server.url("/TV/Quiet Harbor/"), "Quiet Harbor", [".mkv"], session,
+                           frontier=frontier)
+
+    assert sorted(f['name'] for f in files) == EPISODES
+    assert listing_server.requests.count("/TV/Quiet Harbor/") == 1
+
+def test_deeper_scan_does_not_replace_a_shallower_one():
+    frontier = CrawlFrontier(max_depth=2)
+    frontier.record_scan("http://host/TV/Show/", ["shallow"], depth=0)
+    frontier.record_scan("http://host/TV/Show/", [], depth=2)
+
+    assert frontier.scanned("http://host/TV/Show/", depth=1) == ["shallow"]
+    assert frontier.scanned("http://host/TV/Show/", depth=0) == ["shallow"]
+
+def test_deeper_scan_is_reused_when_the_depth_limit_did_not_stop_it():
+    frontier = CrawlFrontier(max_depth=2)
+    frontier.record_scan("http://host/TV/Show/", ["episode"], depth=2)
+    frontier.record_depth_limit("http://host/TV/Other/")
+
+    assert frontier.scanned("http://host/TV/Show/", depth=0) == ["episode"]
+    frontier.record_depth_limit("http://host/TV/Show/Season 1/")
+    assert frontier.scanned("http://host/TV/Show/", depth=0) is None
+    assert frontier.export_scans() == []
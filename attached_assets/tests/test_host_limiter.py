@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ftp_m3u_generator import HEALTH_MAX_FAILURES, AsyncCrawler, CrawlSession, HostHealth, HostLimiter
+
+# More 503s in a row than HostHealth allows failures, each asking for a retry right away
+BUSY = [(503, {'Retry-After': "0"})] * HEALTH_MAX_FAILURES
+
+@pytest.fixture
+def show_tree(listing_server):
+    listing_server.tree = {"/TV/": ["Quiet Harbor S01E01.mkv", "Quiet Harbor S01E02.mkv"]}
+    return listing_server
+
+def test_session_retries_503_after_retry_after_without_marking_host_down(show_tree):
+    show_tree.script = list(BUSY)
+    health = HostHealth()
+    limiter = HostLimiter()
+    session = CrawlSession(retries=len(BUSY), health=health, limiter=limiter)
+    try:
+        status, entries = session.get_listing(show_tree.url("/TV/"), 5)
+    finally:
+        session.close()
+
+    host = f"127.0.0.1:{show_tree.server_port}"
+    assert status == 200
+    assert len([entry for entry in entries if not entry.is_dir]) == 2
+    assert len(show_tree.requests) == len(BUSY) + 1
+    assert not health.is_down(host)
+    assert limiter.snapshot()[host]['throttled'] == len(BUSY)
+
+def test_async_crawler_retries_503_after_retry_after_without_marking_host_down(show_tree):
+    show_tree.script = list(BUSY)
+    health = HostHealth()
+    crawler = AsyncCrawler(retries=len(BUSY), health=health, limiter=HostLimiter(), backoff=0)
+
+    results = crawler.search(show_tree.url("/TV/"), "Quiet Harbor", [".mkv"])
+
+    assert sorted(f['name'] for _, _, files in results for f in files) == [
+        "Quiet Harbor S01E01.mkv", "Quiet Harbor S01E02.mkv"]
+    assert not health.is_down(f"127.0.0.1:{show_tree.server_port}")
+
+def test_cancel_stops_a_session_waiting_out_a_long_retry_after(show_tree):
+    show_tree.script = [(503, {'Retry-After': "300"})]
+    session = CrawlSession(health=HostHealth(), limiter=HostLimiter())
+    timer = threading.Timer(0.2, session.cancel)
+    timer.start()
+    started = time.monotonic()
+    try:
+        with pytest.raises(asyncio.CancelledError):
+            session.get_listing(show_tree.url("/TV/"), 5)
+    finally:
+        timer.cancel()
+        session.close()
+
+    assert time.monotonic() - started < 5
+    assert len(show_tree.requests) == 1
+
+@pytest.mark.parametrize("fetch", ["get_listing", "get_listing_conditional"])
+def test_session_timeout_overrides_the_limiter_timeout(show_tree, monkeypatch, fetch):
+    session = CrawlSession(health=HostHealth(), limiter=HostLimiter(), timeout=7)
+    timeouts = []
+    get = session.get
+
+    def recording_get(url, timeout, **kwargs):
+        timeouts.append(timeout)
+        return get(url, timeout, **kwargs)
+
+    monkeypatch.setattr(session, "get", recording_get)
+    try:
+        assert getattr(session, fetch)(show_tree.url("/TV/"), 30)[0] == 200
+    finally:
+        session.close()
+    assert timeouts == [7]
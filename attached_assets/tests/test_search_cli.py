@@ -0,0 +1,18 @@
+import pytest
+
+from ftp_m3u_generator import CRAWL_ENGINES, EXIT_ERROR, EXIT_NO_RESULTS, run_search_cli
+
+def search(listing_server, tmp_path, engine):
+    return run_search_cli(["--url", listing_server.url("/TV/"), "--term", "Quiet Harbor", "--engine", engine,
+                           "--no-cache", "--quiet", "-o", str(tmp_path / "out.m3u")])
+
+@pytest.mark.parametrize("engine", CRAWL_ENGINES)
+def test_unreadable_subfolder_without_matches_is_no_results(listing_server, tmp_path, engine):
+    # The show folder is listed but answers 404
+    listing_server.tree = {"/TV/": ["Quiet Harbor/", "Other Show/"], "/TV/Other Show/": []}
+    assert search(listing_server, tmp_path, engine) == EXIT_NO_RESULTS
+
+@pytest.mark.parametrize("engine", CRAWL_ENGINES)
+def test_unreadable_base_listing_is_an_error(listing_server, tmp_path, engine):
+    listing_server.tree = {}
+    assert search(listing_server, tmp_path, engine) == EXIT_ERROR
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from ftp_m3u_generator import parse_season_episode, parse_season_episode_batch
+
+CORPUS = [
+    "Show.S01E02.1080p.mkv",
+    "show s1e2.mp4",
+    "Show 1x02.avi",
+    "Show 10X120 Finale.mkv",
+    "Show Season 3 Episode 4.mkv",
+    "Show season3episode04.mkv",
+    "Show Ep 7.mkv",
+    "Show Episode12.mkv",
+    "Show ep.7.mkv",
+    "Show Season 2 Ep 5.mkv",
+    "Show Season 2 Disc 1.mkv",
+    "Movie 2001 1080p.mkv",
+    "Movie 1920x1080.mkv",
+    "S01 Extras E02.mkv",
+    "Deep.S1.Episode.3.mkv",
+    "Sleepers 1996.mkv",
+    "Step Brothers.mkv",
+    "Episode 1x03 S02E04.mkv",
+    "line\nbreak S01E02.mkv",
+    "",
+]
+
+# Fragments the patterns care about, in the spellings and separators real names use
+TOKENS = ["S", "s", "E", "e", "x", "X", "Season", "season", "Episode", "episode", "Ep", "ep", "EP",
+          "1", "02", "10", "123", "2019", " ", ".", "_", "-", "\n", "Show", "p", "1080p", "mkv"]
+
+def random_names(count, seed=8):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(TOKENS) for _ in range(rng.randint(1, 12))) for _ in range(count)]
+
+@pytest.mark.parametrize("filename", CORPUS)
+def test_batch_parser_matches_parse_season_episode(filename):
+    seasons, episodes = parse_season_episode_batch([filename])
+    assert (seasons[0], episodes[0]) == parse_season_episode(filename)
+
+def test_batch_parser_matches_parse_season_episode_on_random_names():
+    names = random_names(20000)
+    seasons, episodes = parse_season_episode_batch(names)
+    mismatches = [(name, (season, episode), parse_season_episode(name))
+                  for name, season, episode in zip(names, seasons, episodes)
+                  if (season, episode) != parse_season_episode(name)]
+    assert mismatches == []
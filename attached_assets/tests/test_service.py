@@ -0,0 +1,34 @@
+import os
+import time
+
+import pytest
+
+from ftp_m3u_service import PlaylistJobService
+
+@pytest.fixture
+def service(tmp_path):
+    service = PlaylistJobService(workers=1, jobs_dir=str(tmp_path / "jobs"), keep_jobs=1)
+    yield service
+    service.close()
+
+def run_job(service, url, term):
+    job, _ = service.submit(url, term, [".mkv"])
+    deadline = time.monotonic() + 10
+    while service.status(job['id'])['status'] not in ("done", "failed"):
+        assert time.monotonic() < deadline, "the job never finished"
+        time.sleep(0.05)
+    return service.status(job['id'])
+
+def test_worker_survives_a_job_folder_it_cannot_clean_up(listing_server, service):
+    listing_server.tree = {"/TV/": ["Quiet.Harbor.S01E01.mkv", "Long.Road.S01E01.mkv", "Red.Sky.S01E01.mkv"]}
+    url = listing_server.url("/TV/")
+
+    first = run_job(service, url, "Quiet Harbor")
+    # Something else wrote into the job folder, so it is not empty when the job is forgotten
+    with open(os.path.join(os.path.dirname(first['playlist']), "notes.txt"), "w") as f:
+        f.write("kept by hand")
+
+    assert run_job(service, url, "Long Road")['status'] == "done"
+    assert service.status(first['id']) is None
+    assert not os.path.exists(os.path.dirname(first['playlist']))
+    assert run_job(service, url, "Red Sky")['status'] == "done"
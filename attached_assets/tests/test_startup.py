@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ftp_m3u_generator import STARTUP_BUDGET_MS, STARTUP_LAZY_MODULES, check_startup
+
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_import_stays_within_the_startup_budget():
+    ok, import_ms, eager = check_startup()
+    assert eager == []
+    assert ok, f"importing took {import_ms:.1f} ms, over the {STARTUP_BUDGET_MS} ms budget"
+
+def eagerly_imported(module, lazy_modules):
+    code = (f"import sys, {module}\n"
+            f"print(' '.join(name for name in {tuple(lazy_modules)!r} if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=MODULE_DIR,
+                            capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+def test_import_leaves_lazy_modules_out_of_sys_modules():
+    assert eagerly_imported("ftp_m3u_generator", STARTUP_LAZY_MODULES) == []
+
+def test_gui_import_leaves_crawl_modules_out_of_sys_modules():
+    pytest.importorskip("tkinter")
+    lazy_modules = [name for name in STARTUP_LAZY_MODULES if not name.startswith("tkinter")]
+    assert eagerly_imported("ftp_m3u_gui", lazy_modules) == []